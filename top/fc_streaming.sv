@@ -3,7 +3,8 @@ module fc_streaming #(
     parameter NUM_OUTPUTS = 120,
     parameter WEIGHT_FILE = "top/weights_generator/fc_weights/c5_weights_flattened.hex",
     parameter ENABLE_RELU = 1,
-    parameter SHIFT = 10
+    parameter SHIFT = 10,
+    parameter ACC_WIDTH = 32   // proven per layer by acc_width.py, see lenet_params_pkg.sv
 ) (
     input logic clk, rst,
     input logic signed [7:0] data_in,
@@ -41,7 +42,7 @@ module fc_streaming #(
     logic pipeline_valid;
 
     // 4. ACCUMULATION & COUNTERS
-    logic signed [31:0] accumulator;
+    logic signed [ACC_WIDTH-1:0] accumulator;
     logic layer_done_reg;
     logic [$clog2(NUM_INPUTS):0] acc_counter;
     logic signed [31:0] scaled_acc_wire;
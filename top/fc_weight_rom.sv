@@ -1,15 +1,16 @@
 module fc_weight_rom #(
     parameter NUM_WORDS = 48000,
-    parameter WEIGHT_FILE = "c5_weights_flattened.hex"
+    parameter WEIGHT_FILE = "c5_weights_flattened.hex",
+    parameter WIDTH = 8    // lanes x 8 for the banked files of rom_layout.py
 )(
     input logic clk,
     input logic [$clog2(NUM_WORDS)-1:0] addr,
-    output logic signed [7:0] q
+    output logic signed [WIDTH-1:0] q
 );
 
     // Force M10K Block RAM
     (* ramstyle = "logic" *)
-    logic signed [7:0] mem [0:NUM_WORDS-1];
+    logic signed [WIDTH-1:0] mem [0:NUM_WORDS-1];
 
     // Initialize from file
     initial begin
@@ -123,13 +123,13 @@ module fpga_top_layer1 (
     logic signed [7:0] c5_out_pixel, f6_out_pixel, out_out_pixel;
     logic c5_done, f6_done, out_done;
 
-    fc_streaming #(.NUM_INPUTS(400), .NUM_OUTPUTS(120), .WEIGHT_FILE("/home/bany/personal/fpga-dnn-accelerator/top/weights_generator/fc_weights/c5_weights_flattened.hex"), .SHIFT(10)) c5_DUT (
+    fc_streaming #(.NUM_INPUTS(400), .NUM_OUTPUTS(120), .WEIGHT_FILE("/home/bany/personal/fpga-dnn-accelerator/top/weights_generator/fc_weights/c5_weights_flattened.hex"), .SHIFT(lenet_params_pkg::C5_SHIFT), .ACC_WIDTH(lenet_params_pkg::C5_ACC_WIDTH)) c5_DUT (
         .clk(clk), .rst(rst), .data_in(c5_input_pixel), .data_valid_in(c5_input_valid), .data_out(c5_out_pixel), .data_valid_out(c5_out_valid), .done(c5_done));
 
-    fc_streaming #(.NUM_INPUTS(120), .NUM_OUTPUTS(84), .WEIGHT_FILE("/home/bany/personal/fpga-dnn-accelerator/top/weights_generator/fc_weights/f6_weights_flattened.hex"), .SHIFT(7)) f6_DUT (
+    fc_streaming #(.NUM_INPUTS(120), .NUM_OUTPUTS(84), .WEIGHT_FILE("/home/bany/personal/fpga-dnn-accelerator/top/weights_generator/fc_weights/f6_weights_flattened.hex"), .SHIFT(lenet_params_pkg::F6_SHIFT), .ACC_WIDTH(lenet_params_pkg::F6_ACC_WIDTH)) f6_DUT (
         .clk(clk), .rst(rst), .data_in(c5_out_pixel), .data_valid_in(c5_out_valid), .data_out(f6_out_pixel), .data_valid_out(f6_out_valid), .done(f6_done));
 
-    fc_streaming #(.NUM_INPUTS(84), .NUM_OUTPUTS(10), .WEIGHT_FILE("/home/bany/personal/fpga-dnn-accelerator/top/weights_generator/fc_weights/out_weights_flattened.hex"), .ENABLE_RELU(0), .SHIFT(7)) out_DUT (
+    fc_streaming #(.NUM_INPUTS(84), .NUM_OUTPUTS(10), .WEIGHT_FILE("/home/bany/personal/fpga-dnn-accelerator/top/weights_generator/fc_weights/out_weights_flattened.hex"), .ENABLE_RELU(0), .SHIFT(lenet_params_pkg::OUT_SHIFT), .ACC_WIDTH(lenet_params_pkg::OUT_ACC_WIDTH)) out_DUT (
         .clk(clk), .rst(rst), .data_in(f6_out_pixel), .data_valid_in(f6_out_valid), .data_out(out_out_pixel), .data_valid_out(out_out_valid), .done(out_done));
 
     // PREDICTION LOGIC
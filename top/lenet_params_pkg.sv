@@ -0,0 +1,13 @@
+// Generated by top/weights_generator/calibrate.py -- do not edit by hand.
+package lenet_params_pkg;
+    localparam int C1_SHIFT       = 10;
+    localparam int C2_SHIFT       = 10;
+    localparam int C5_SHIFT       = 10;
+    localparam int F6_SHIFT       = 7;
+    localparam int OUT_SHIFT      = 7;
+    localparam int C1_ACC_WIDTH   = 19;
+    localparam int C2_ACC_WIDTH   = 20;
+    localparam int C5_ACC_WIDTH   = 21;
+    localparam int F6_ACC_WIDTH   = 19;
+    localparam int OUT_ACC_WIDTH  = 19;
+endpackage
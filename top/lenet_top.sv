@@ -14,7 +14,8 @@ module lenet_channel #(parameter CHANNEL_ID = 0 // to distinguish top level chan
 );
 
     localparam MAPSIZE = 32;     
-    localparam OUTPUT_SHIFT = 10;  //log2(weights max scale)
+    localparam OUTPUT_SHIFT = lenet_params_pkg::C1_SHIFT;  // calibrated, see lenet_params_pkg.sv
+    localparam ACC_WIDTH = lenet_params_pkg::C1_ACC_WIDTH;  // proven accumulator range
     // 1. WEIGHT LOADING LOGIC
     // ---------------------------------------------------------
     logic signed [7:0] weights [4:0][4:0]; // The storage for the engine
@@ -88,10 +89,14 @@ module lenet_channel #(parameter CHANNEL_ID = 0 // to distinguish top level chan
     );
 
     // 3. QUANTIZATION LOGIC (Combinational)
+    // Only the low ACC_WIDTH bits are used, so synthesis trims the upper
+    // bits of the adder tree (two's complement: they never affect these)
+    logic signed [ACC_WIDTH-1:0] conv_acc;
     logic signed [31:0] scaled_data;
     logic signed [7:0] relu_pixel_comb;
     
-    assign scaled_data = conv_data_out >>> OUTPUT_SHIFT; 
+    assign conv_acc = conv_data_out[ACC_WIDTH-1:0];
+    assign scaled_data = conv_acc >>> OUTPUT_SHIFT; 
 
     always_comb begin
         if (scaled_data < 0) 
@@ -13,7 +13,8 @@ module lenet_channel_layer2 #(parameter CHANNEL_ID = 0)(
     output logic loading_done
 );
     localparam MAPSIZE = 14;     
-    localparam OUTPUT_SHIFT = 10;  
+    localparam OUTPUT_SHIFT = lenet_params_pkg::C2_SHIFT;  // calibrated, see lenet_params_pkg.sv
+    localparam ACC_WIDTH = lenet_params_pkg::C2_ACC_WIDTH;  // proven accumulator range
 
     // 1. WEIGHT STORAGE
     logic signed [7:0] weights [5:0][4:0][4:0]; 
@@ -118,16 +119,21 @@ module lenet_channel_layer2 #(parameter CHANNEL_ID = 0)(
     endgenerate
 
     // 4. ACCUMULATION
-    logic signed [31:0] channel_sum;
+    // Only the low ACC_WIDTH bits are used, so synthesis trims the upper
+    // bits of the conv and channel adders (two's complement: they never
+    // affect these)
+    logic signed [31:0] channel_sum_full;
+    logic signed [ACC_WIDTH-1:0] channel_sum;
     logic sum_valid;
     logic conv_valid_out;
 
     assign sum_valid = internal_valid[0]; 
     assign conv_valid_out = sum_valid;    
 
-    assign channel_sum = internal_data[0] + internal_data[1] + 
-                         internal_data[2] + internal_data[3] + 
-                         internal_data[4] + internal_data[5];
+    assign channel_sum = channel_sum_full[ACC_WIDTH-1:0];
+    assign channel_sum_full = internal_data[0] + internal_data[1] + 
+                              internal_data[2] + internal_data[3] + 
+                              internal_data[4] + internal_data[5];
 
     // 5. QUANTIZATION
     logic signed [31:0] scaled_data;
@@ -0,0 +1,172 @@
+import re
+import sys
+import argparse
+import numpy as np
+import golden_model
+
+# --- CONFIGURATION ---
+ACC_WIDTH = 32           # what conv_pipelined / fc_streaming were written with
+MARGIN_BITS = 0          # extra bits on top of the proven bound
+DATA_ROOT = "./data"
+
+# Input range each layer multiplies with: C1 sees whatever byte is on the
+# signed pixel bus, every later layer a ReLU'd, saturated activation
+PIXEL_RANGE = (-128, 127)
+ACT_RANGE = golden_model.act_range(golden_model.ACT_BITS, relu=True)
+
+# --- WIDTHS ---
+def width_for(lo, hi):
+    """Smallest two's-complement width holding every value in [lo, hi]."""
+    return int(max(bits_needed(np.array([lo, hi]))))
+
+def bits_needed(values):
+    """Per-value signed width: 0 -> 1, 127 -> 8, -128 -> 8, 128 -> 9."""
+    v = np.asarray(values, dtype=np.int64)
+    mag = np.where(v < 0, ~v, v).astype(np.float64)   # ~v = -v - 1; exact below 2^53
+    return np.frexp(mag)[1] + 1
+
+def layer_products(weights):
+    """{layer: (outputs, products)} weight matrix of every layer, as the RTL accumulates it."""
+    mats = {l: np.asarray(weights[l], dtype=np.int64).reshape(len(weights[l]), -1) for l in golden_model.LAYERS}
+    if golden_model.FC_DROP_LAST_PRODUCT:
+        for l in ("c5", "f6", "out"):
+            mats[l] = mats[l][:, :-1]
+    return mats
+
+def static_bounds(weights):
+    """
+    Worst-case accumulator range of every layer over all inputs the bus can
+    carry: per output, each product at whichever input extreme maximizes
+    (minimizes) it. The datapath adds in two's complement, so partial sums
+    may wrap freely; only the final sum has to fit. Returns
+    {layer: {"min", "max", "width", "products"}}.
+    """
+    bounds = {}
+    for layer, w in layer_products(weights).items():
+        lo, hi = PIXEL_RANGE if layer == "c1" else ACT_RANGE
+        top = np.where(w > 0, w * hi, w * lo).sum(axis=1)
+        bottom = np.where(w > 0, w * lo, w * hi).sum(axis=1)
+        bounds[layer] = {"min": int(bottom.min()), "max": int(top.max()),
+                         "width": width_for(bottom.min(), top.max()), "products": w.shape[1]}
+    return bounds
+
+def recommend(weights, margin=MARGIN_BITS):
+    """{layer: accumulator width} proven safe for these weights (static bound + margin)."""
+    return {l: b["width"] + margin for l, b in static_bounds(weights).items()}
+
+def package_widths(path):
+    """{layer: <LAYER>_ACC_WIDTH} of a generated lenet_params_pkg.sv; layers it lacks keep ACC_WIDTH."""
+    widths = dict.fromkeys(golden_model.LAYERS, ACC_WIDTH)
+    with open(path) as f:
+        for name, value in re.findall(r"localparam\s+int\s+(\w+)_ACC_WIDTH\s*=\s*(\d+)\s*;", f.read()):
+            if name.lower() in widths:
+                widths[name.lower()] = int(value)
+    return widths
+
+def check(weights, sv_package):
+    """
+    Layers whose accumulator in the RTL package is narrower than the static
+    bound of `weights`: {layer: (package width, needed width)}. Non-empty
+    means the hardware can overflow where the golden model does not.
+    """
+    have = package_widths(sv_package)
+    need = recommend(weights, margin=0)
+    return {l: (have[l], need[l]) for l in golden_model.LAYERS if have[l] < need[l]}
+
+def print_check(short, sv_package):
+    for layer, (have, need) in short.items():
+        print(f"TOO NARROW {layer.upper()}_ACC_WIDTH = {have} in {sv_package}, the ROMs need {need}")
+    if not short:
+        print(f"{sv_package}: every accumulator covers the static bound of the ROMs")
+
+def empirical(images, weights, shifts=None, batch_size=golden_model.BATCH_SIZE):
+    """
+    Accumulator statistics over a dataset: min, max and a histogram of the
+    signed width each accumulator value needs (index = bits, up to 64).
+    """
+    stats = {l: {"min": 0, "max": 0, "hist": np.zeros(65, np.int64)} for l in golden_model.LAYERS}
+    for i in range(0, len(images), batch_size):
+        out = golden_model.run_layers(images[i:i + batch_size], weights, shifts, keep_acc=True)
+        for layer, s in stats.items():
+            acc = out[layer + "_acc"]
+            s["min"] = min(s["min"], int(acc.min()))
+            s["max"] = max(s["max"], int(acc.max()))
+            s["hist"] += np.bincount(bits_needed(acc).ravel(), minlength=65)
+    for s in stats.values():
+        s["width"] = width_for(s["min"], s["max"])
+    return stats
+
+# --- REPORTS ---
+def _span(r):
+    return f"[{r['min']}, {r['max']}]"
+
+def print_report(bounds, stats=None, widths=None):
+    widths = widths or {l: b["width"] for l, b in bounds.items()}
+    print(f"{'Layer':<6}{'Products':>9}{'Static range':>26}{'Bits':>6}"
+          + (f"{'Observed range':>26}{'Bits':>6}" if stats else "") + f"{'Use':>6}")
+    for layer in golden_model.LAYERS:
+        b = bounds[layer]
+        row = f"{layer.upper():<6}{b['products']:>9}{_span(b):>26}{b['width']:>6}"
+        if stats:
+            row += f"{_span(stats[layer]):>26}{stats[layer]['width']:>6}"
+        print(row + f"{widths[layer]:>6}")
+        if b["width"] > ACC_WIDTH:
+            print(f"  WARNING: {layer.upper()} can overflow the {ACC_WIDTH}-bit accumulator")
+    saved = sum(ACC_WIDTH - w for w in widths.values())
+    print(f"\n{saved} accumulator bits below {ACC_WIDTH} across the {len(widths)} layers")
+
+def print_histograms(stats, total):
+    """Share of accumulator values needing each width (the bars are log-scaled)."""
+    for layer in golden_model.LAYERS:
+        hist = stats[layer]["hist"]
+        print(f"\n{layer.upper()} accumulators by signed width ({hist.sum()} values over {total} images)")
+        for bits in np.nonzero(hist)[0]:
+            bar = "#" * max(1, int(np.log10(hist[bits]) * 4))
+            print(f"  {bits:>3} bits {100 * hist[bits] / hist.sum():>8.4f}%  {bar}")
+
+def main(argv=None):
+    import calibrate
+    import hw_eval
+    parser = argparse.ArgumentParser(description="Accumulator range analysis: minimal safe accumulator width per layer")
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--data", default=DATA_ROOT)
+    parser.add_argument("--train", action="store_true", help="also run the training set (default: test set only)")
+    parser.add_argument("--static-only", action="store_true", help="skip the dataset pass")
+    parser.add_argument("--margin", type=int, default=MARGIN_BITS, help="bits added to the proven width")
+    parser.add_argument("--histogram", action="store_true", help="print per-layer width histograms")
+    parser.add_argument("--write", action="store_true",
+                        help="emit the widths into lenet_params.json / lenet_params_pkg.sv")
+    parser.add_argument("--sv-package", default=calibrate.SV_PACKAGE_FILE,
+                        help="SystemVerilog parameter package to write / check")
+    parser.add_argument("--check", action="store_true",
+                        help="only check the package widths against the ROMs on disk; exit 1 when one is too narrow")
+    args = parser.parse_args(argv)
+
+    weights = golden_model.load_weights(args.weights)
+    if args.check:
+        short = check(weights, args.sv_package)
+        print_check(short, args.sv_package)
+        return 1 if short else 0
+    shifts = calibrate.load_shifts(args.weights)
+    bounds = static_bounds(weights)
+    widths = recommend(weights, args.margin)
+
+    stats = None
+    if not args.static_only:
+        images, _ = hw_eval.load_mnist(args.data, train=False)
+        if args.train:
+            images = np.concatenate([images, hw_eval.load_mnist(args.data, train=True)[0]])
+        stats = empirical(images, weights, shifts)
+    print_report(bounds, stats, widths)
+    if stats and args.histogram:
+        print_histograms(stats, len(images))
+
+    if args.write:
+        params = calibrate.load_params(args.weights)
+        calibrate.write_params(shifts, params.get("weight_scales"), params.get("stats"),
+                               root=args.weights, acc_widths=widths,
+                               sv_package=args.sv_package)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
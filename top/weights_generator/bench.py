@@ -0,0 +1,288 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import golden_model
+import golden_batch
+import calibrate
+import memfmt
+import mnist_idx
+import dataset_cache
+import hw_eval
+import tracing
+
+# --- CONFIGURATION ---
+HISTORY_FILE = "bench_history.json"
+THRESHOLD = 0.15         # fail when a benchmark is this much slower than its baseline
+RSS_THRESHOLD = 0.25     # ... or its peak RSS this much larger
+BASELINE_RUNS = 5        # baseline = best of the last N recorded runs on this host
+REPEAT = 3               # timed calls per benchmark, the fastest one counts
+DATA_ROOT = "./data"
+SINGLE_IMAGE_CALLS = 100
+GOLDEN_IMAGES = 500
+MIF_IMAGES = 100
+
+# --- BENCHMARKS ---
+# Each one does its untimed setup and returns (fn, items, unit): fn is the
+# timed call, items what one call processes (for the throughput column)
+def _test_set(ctx):
+    """The test split as FPGA pixels; FileNotFoundError (skip) instead of a download when it is missing."""
+    if not os.path.exists(dataset_cache.cache_paths(ctx["data"], train=False)[0]):
+        mnist_idx.raw_path(ctx["data"], mnist_idx.FILES[False][0])
+    return hw_eval.load_test_set(ctx["data"])
+
+def bench_load_hex(ctx):
+    """Every weight ROM parsed from its .hex file (no bundle)."""
+    weights = golden_model.load_weights(ctx["weights"], prefer_bundle=False)
+    items = sum(w.size for w in weights.values())
+    return (lambda: golden_model.load_weights(ctx["weights"], prefer_bundle=False)), items, "weights"
+
+def bench_golden_vectors(ctx):
+    """golden_batch.generate end to end: integer model plus one .hex per tensor and image."""
+    images, labels = _test_set(ctx)
+    images, labels = np.ascontiguousarray(images[:GOLDEN_IMAGES]), labels[:GOLDEN_IMAGES]
+    shifts = calibrate.load_shifts(ctx["weights"])
+
+    def run():
+        out = os.path.join(ctx["tmp"], "golden_vectors")
+        shutil.rmtree(out, ignore_errors=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            golden_batch.generate(images, labels, out, ctx["weights"], shifts, workers=1)
+    return run, len(images), "images"
+
+def _golden_layer(layer):
+    def bench(ctx):
+        images, _ = _test_set(ctx)
+        acts = golden_model.run_lenet(images[:GOLDEN_IMAGES], golden_model.load_weights(ctx["weights"]),
+                                      calibrate.load_shifts(ctx["weights"]))[layer]
+        names = [os.path.join(ctx["tmp"], f"golden_{layer}_{i:04d}.hex") for i in range(len(acts))]
+        return (lambda: memfmt.write_hex_batch(names, acts)), len(acts), "images"
+    bench.__doc__ = f"Writing the {layer.upper()} golden vectors of {GOLDEN_IMAGES} images (model run untimed)."
+    return bench
+
+def bench_infer_single(ctx):
+    """Integer model on one image, SINGLE_IMAGE_CALLS times (per-call overhead)."""
+    images, _ = _test_set(ctx)
+    weights = golden_model.load_weights(ctx["weights"])
+    shifts = calibrate.load_shifts(ctx["weights"])
+    image = images[:1]
+
+    def run():
+        for _ in range(SINGLE_IMAGE_CALLS):
+            golden_model.predict(image, weights, shifts)
+    return run, SINGLE_IMAGE_CALLS, "images"
+
+def bench_infer_10k(ctx):
+    """Integer model on the whole test set."""
+    images, _ = _test_set(ctx)
+    weights = golden_model.load_weights(ctx["weights"])
+    shifts = calibrate.load_shifts(ctx["weights"])
+    return (lambda: golden_model.predict(images, weights, shifts)), len(images), "images"
+
+def bench_write_hex(ctx):
+    """Every weight ROM written as .hex."""
+    weights = golden_model.load_weights(ctx["weights"])
+    files = [(os.path.join(ctx["tmp"], os.path.basename(name)), row)
+             for layer, names in golden_model.WEIGHT_FILES.items()
+             for name, row in zip(names, weights[layer].reshape(len(names), -1))]
+
+    def run():
+        for name, row in files:
+            memfmt.write_hex(name, row)
+    return run, sum(row.size for _, row in files), "words"
+
+def bench_write_mif(ctx):
+    """MIF_IMAGES test images written as one .mif."""
+    images, _ = _test_set(ctx)
+    pixels = images[:MIF_IMAGES].reshape(-1)
+    path = os.path.join(ctx["tmp"], "images.mif")
+    return (lambda: memfmt.write_mif(path, pixels)), pixels.size, "words"
+
+def bench_dataset_resize(ctx):
+    """Raw 28x28 test split -> 32x32, what dataset_cache.build does once."""
+    raw = mnist_idx.MnistIdx(ctx["data"], train=False).images
+    return (lambda: mnist_idx.resize(raw)), len(raw), "images"
+
+def bench_dataset_load(ctx):
+    """Cached 32x32 test split -> FPGA pixels in RAM, the start of every tool."""
+    images, _ = _test_set(ctx)      # builds the cache outside the timing
+    return (lambda: hw_eval.load_test_set(ctx["data"])), len(images), "images"
+
+BENCHMARKS = {
+    "load_hex": bench_load_hex,
+    "golden_vectors": bench_golden_vectors,
+    **{f"golden_{l}": _golden_layer(l) for l in golden_batch.GOLDEN_LAYERS},
+    "infer_single": bench_infer_single,
+    "infer_10k": bench_infer_10k,
+    "write_hex": bench_write_hex,
+    "write_mif": bench_write_mif,
+    "dataset_resize": bench_dataset_resize,
+    "dataset_load": bench_dataset_load,
+}
+
+# --- RUNNER ---
+def run_benchmark(name, weights=".", data=DATA_ROOT, repeat=REPEAT):
+    """
+    Setup, then `repeat` timed calls. Returns the fastest wall time, the
+    throughput at that time and the process peak RSS, or {"skipped": why}
+    when the ROM files or the dataset are missing.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = {"weights": weights, "data": data, "tmp": tmp}
+        try:
+            fn, items, unit = BENCHMARKS[name](ctx)
+        except FileNotFoundError as e:
+            return {"skipped": str(e)}
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    best = min(times)
+    return {"seconds": best, "throughput": items / best, "items": items, "unit": unit,
+            "peak_rss_mb": tracing.peak_rss_mb(), "runs": times}
+
+def run_all(names, weights=".", data=DATA_ROOT, repeat=REPEAT, isolate=True):
+    """
+    Runs each benchmark in a fresh spawned process, so its peak RSS is its
+    own and no benchmark warms caches for the next (isolate=False: all in
+    this process, RSS is then cumulative).
+    """
+    results = {}
+    for name in names:
+        if isolate:
+            with ProcessPoolExecutor(1, mp_context=mp.get_context("spawn")) as pool:
+                results[name] = pool.submit(run_benchmark, name, weights, data, repeat).result()
+        else:
+            results[name] = run_benchmark(name, weights, data, repeat)
+        print(f"  {name:<16} {_describe(results[name])}", flush=True)
+    return results
+
+def _describe(r):
+    if "skipped" in r:
+        return f"skipped ({r['skipped']})"
+    return f"{1000 * r['seconds']:.1f} ms, {r['throughput']:.0f} {r['unit']}/s, {r['peak_rss_mb']:.0f} MB"
+
+# --- HISTORY ---
+def load_history(path=HISTORY_FILE):
+    if not os.path.exists(path):
+        return {"runs": []}
+    with open(path) as f:
+        return json.load(f)
+
+def save_history(history, path=HISTORY_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp, path)
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+def baseline(history, host=None, runs=BASELINE_RUNS):
+    """
+    {benchmark: {"seconds", "peak_rss_mb"}}: the best of the last `runs`
+    recorded runs of each benchmark on this host (timings from another
+    machine say nothing about this one).
+    """
+    host = host or platform.node()
+    best = {}
+    seen = {}
+    for run in reversed(history["runs"]):
+        if run.get("host") != host:
+            continue
+        for name, r in run["results"].items():
+            if "skipped" in r or seen.get(name, 0) >= runs:
+                continue
+            seen[name] = seen.get(name, 0) + 1
+            b = best.setdefault(name, {"seconds": r["seconds"], "peak_rss_mb": r["peak_rss_mb"]})
+            b["seconds"] = min(b["seconds"], r["seconds"])
+            b["peak_rss_mb"] = min(b["peak_rss_mb"], r["peak_rss_mb"])
+    return best
+
+def compare(results, base, threshold=THRESHOLD, rss_threshold=RSS_THRESHOLD):
+    """Adds time / RSS change vs. the baseline to every result. Returns the regressed names."""
+    regressed = []
+    for name, r in results.items():
+        if "skipped" in r or name not in base:
+            continue
+        r["time_change"] = r["seconds"] / base[name]["seconds"] - 1
+        r["rss_change"] = r["peak_rss_mb"] / base[name]["peak_rss_mb"] - 1
+        r["regressed"] = r["time_change"] > threshold or r["rss_change"] > rss_threshold
+        if r["regressed"]:
+            regressed.append(name)
+    return regressed
+
+def print_table(results):
+    print(f"{'Benchmark':<16}{'Time ms':>10}{'Throughput':>14}{'Unit':>8}{'RSS MB':>8}{'vs. base':>10}{'RSS':>8}")
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"{name:<16}{'skipped':>10}")
+            continue
+        change = (f"{100 * r['time_change']:>+9.1f}%{100 * r['rss_change']:>+7.1f}%" if "time_change" in r
+                  else f"{'new':>10}{'':>8}")
+        print(f"{name:<16}{1000 * r['seconds']:>10.1f}{r['throughput']:>14.0f}{r['unit']:>8}"
+              f"{r['peak_rss_mb']:>8.0f}{change}" + ("  REGRESSED" if r.get("regressed") else ""))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the weight-generator toolchain and track regressions")
+    parser.add_argument("only", nargs="*", metavar="BENCHMARK", help="run only these (default: all)")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--data", default=DATA_ROOT)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown (0.15 = 15%%)")
+    parser.add_argument("--rss-threshold", type=float, default=RSS_THRESHOLD, help="allowed peak RSS growth")
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--no-record", action="store_true", help="compare only, do not append to the history")
+    parser.add_argument("--accept", action="store_true", help="record the run even if it regressed (new baseline)")
+    parser.add_argument("--inline", action="store_true", help="run in this process instead of one process per benchmark")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, fn in BENCHMARKS.items():
+            print(f"{name:<16} {(fn.__doc__ or '').strip()}")
+        return 0
+    unknown = [n for n in args.only if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)} (see --list)")
+
+    names = args.only or list(BENCHMARKS)
+    print(f"Running {len(names)} benchmarks, best of {args.repeat}")
+    results = run_all(names, args.weights, args.data, args.repeat, isolate=not args.inline)
+    history = load_history(args.history)
+    regressed = compare(results, baseline(history), args.threshold, args.rss_threshold)
+    print()
+    print_table(results)
+
+    # A regressed run is not recorded unless accepted, so re-running a slow
+    # change can never turn it into the baseline
+    if not args.no_record and (not regressed or args.accept):
+        history["runs"].append({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(),
+                                "host": platform.node(), "python": platform.python_version(),
+                                "numpy": np.__version__, "results": results})
+        save_history(history, args.history)
+        print(f"\nRecorded in {args.history} ({len(history['runs'])} runs)")
+    if regressed:
+        print(f"\nFAIL: {', '.join(regressed)} regressed beyond {100 * args.threshold:.0f}% time "
+              f"/ {100 * args.rss_threshold:.0f}% RSS")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
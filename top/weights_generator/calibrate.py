@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import golden_model
+import rom_manifest
+import acc_width
+
+# --- CONFIGURATION ---
+CALIB_IMAGES = 500
+PARAMS_FILE = "lenet_params.json"
+# top/lenet_params_pkg.sv, next to the RTL, wherever the ROMs are written
+SV_PACKAGE_FILE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lenet_params_pkg.sv"))
+MAX_SHIFT = 24
+WEIGHT_BITS = 8      # ROM word width
+
+# --- WEIGHT SCALING ---
+def _qmax(bits, layer):
+    """Largest magnitude of a layer's signed weight (127 for the int8 ROMs)."""
+    return (1 << ((bits or {}).get(layer, WEIGHT_BITS) - 1)) - 1
+
+def layer_scales(float_weights, bits=None):
+    """Per-layer scale so each layer's own largest weight maps to +/-127 (+/-qmax of `bits`)."""
+    scales = {}
+    for layer in golden_model.LAYERS:
+        max_val = float(np.abs(float_weights[layer]).max())
+        scales[layer] = _qmax(bits, layer) / max_val if max_val > 0 else 1.0
+    return scales
+
+def quantize_weights(float_weights, scales, bits=None, rounding="trunc"):
+    """
+    The ROM export rule on float32 weights: scale, truncate toward zero
+    (int()), clamp to int8. bits ({layer: bits}) clamps a layer to a
+    narrower signed range; rounding="nearest" rounds instead of truncating.
+    """
+    rnd = np.trunc if rounding == "trunc" else np.rint
+    return {layer: np.clip(rnd(np.asarray(float_weights[layer], dtype=np.float32) * np.float32(scales[layer])),
+                           -_qmax(bits, layer) - 1, _qmax(bits, layer)).astype(np.int8)
+                   .reshape(golden_model.WEIGHT_SHAPES[layer])
+            for layer in golden_model.LAYERS}
+
+# --- SHIFT SELECTION ---
+def shift_stats(acc, shift, relu=True, bits=golden_model.ACT_BITS):
+    """Fraction of live accumulators that saturate at 127 / collapse to 0."""
+    live = acc[acc > 0] if relu else acc[acc != 0]
+    if live.size == 0:
+        return {"saturated": 0.0, "zeroed": 0.0}
+    scaled = live >> shift
+    lo, hi = golden_model.act_range(bits, relu=False)
+    return {"saturated": float((scaled > hi).mean() + (scaled < lo).mean()),
+            "zeroed": float((scaled == 0).mean())}
+
+def choose_shift(acc, relu=True, bits=golden_model.ACT_BITS):
+    """
+    Picks the shift whose (acc >>> shift) after saturation best reconstructs
+    the accumulator (least squared error, measured in accumulator units).
+    Large shifts zero out small activations, small shifts saturate large
+    ones; the error term trades the two off. Negative accumulators of ReLU
+    layers become 0 whatever the shift, so only positive ones count.
+    """
+    live = (acc[acc > 0] if relu else acc[acc != 0]).astype(np.int64)
+    if live.size == 0:
+        return 0
+    lo, hi = golden_model.act_range(bits, relu)
+    errors = []
+    for shift in range(MAX_SHIFT + 1):
+        recon = np.clip(live >> shift, lo, hi) << shift
+        errors.append(float(np.square((live - recon).astype(np.float64)).sum()))
+    return int(np.argmin(errors))
+
+def calibrate_shifts(images, weights, fixed=None, act_bits=None):
+    """
+    Runs the calibration images through the integer model layer by layer,
+    choosing each layer's shift from the accumulators it actually sees
+    (the inputs already quantized with the shifts chosen upstream).
+    Layers listed in `fixed` keep that shift and only get their stats.
+    act_bits ({layer: bits}) calibrates for narrower activations.
+    Returns (shifts, stats).
+    """
+    x = golden_model.as_images(images)[:, None]
+    fixed = fixed or {}
+    bits = dict(dict.fromkeys(golden_model.LAYERS, golden_model.ACT_BITS), **(act_bits or {}))
+    shifts, stats = {}, {}
+
+    def pick(layer, acc, relu=True):
+        shifts[layer] = fixed[layer] if layer in fixed else choose_shift(acc, relu, bits[layer])
+        stats[layer] = shift_stats(acc, shifts[layer], relu, bits[layer])
+        return golden_model.requantize(acc, shifts[layer], relu, bits[layer])
+
+    x = golden_model.maxpool2x2(pick("c1", golden_model.conv_acc(x, weights["c1"])))
+    x = golden_model.maxpool2x2(pick("c2", golden_model.conv_acc(x, weights["c2"])))
+    x = x.reshape(len(x), -1)
+    x = pick("c5", golden_model.fc_acc(x, weights["c5"]))
+    x = pick("f6", golden_model.fc_acc(x, weights["f6"]))
+    pick("out", golden_model.fc_acc(x, weights["out"]), relu=False)
+    return shifts, stats
+
+# --- PARAMETER FILES ---
+def load_shifts(root="."):
+    """Shifts from lenet_params.json, falling back to the RTL defaults."""
+    path = os.path.join(root, PARAMS_FILE)
+    if not os.path.exists(path):
+        return dict(golden_model.RTL_SHIFTS)
+    with open(path) as f:
+        return dict(golden_model.RTL_SHIFTS, **json.load(f)["shifts"])
+
+def load_params(root="."):
+    """The whole lenet_params.json ({} when there is none)."""
+    path = os.path.join(root, PARAMS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def write_params(shifts, scales=None, stats=None, root=".", acc_widths=None, sv_package=SV_PACKAGE_FILE):
+    """
+    Writes lenet_params.json under root and the matching SystemVerilog
+    package to sv_package (top/lenet_params_pkg.sv by default, independent
+    of root). Files whose content is unchanged are left alone, so the RTL
+    is not rebuilt for identical shifts. acc_widths (acc_width.recommend)
+    sizes the RTL accumulators; without it they stay at acc_width.ACC_WIDTH.
+    """
+    acc_widths = acc_widths or dict.fromkeys(golden_model.LAYERS, acc_width.ACC_WIDTH)
+    params = {"shifts": {l: int(shifts[l]) for l in golden_model.LAYERS},
+              "acc_widths": {l: int(acc_widths[l]) for l in golden_model.LAYERS}}
+    if scales:
+        params["weight_scales"] = {l: float(scales[l]) for l in golden_model.LAYERS}
+    if stats:
+        params["stats"] = stats
+    payload = (json.dumps(params, indent=2) + "\n").encode()
+    written = rom_manifest.write_if_changed(os.path.join(root, PARAMS_FILE), payload)
+    print(f"{'Generated' if written else 'Unchanged'} {PARAMS_FILE}")
+
+    lines = [
+        "// Generated by top/weights_generator/calibrate.py -- do not edit by hand.",
+        "package lenet_params_pkg;",
+    ]
+    for layer in golden_model.LAYERS:
+        lines.append(f"    localparam int {layer.upper() + '_SHIFT':<14} = {int(shifts[layer])};")
+    for layer in golden_model.LAYERS:
+        lines.append(f"    localparam int {layer.upper() + '_ACC_WIDTH':<14} = {int(acc_widths[layer])};")
+    lines.append("endpackage")
+    written = rom_manifest.write_if_changed(sv_package, ("\n".join(lines) + "\n").encode())
+    print(f"{'Generated' if written else 'Unchanged'} {os.path.relpath(sv_package)}")
+
+def print_table(shifts, stats, scales=None):
+    print(f"{'Layer':<6}{'Scale':>10}{'Shift':>7}{'Saturated':>11}{'Zeroed':>9}")
+    for layer in golden_model.LAYERS:
+        scale = f"{scales[layer]:.2f}" if scales else "-"
+        print(f"{layer.upper():<6}{scale:>10}{shifts[layer]:>7}"
+              f"{100 * stats[layer]['saturated']:>10.2f}%{100 * stats[layer]['zeroed']:>8.2f}%")
+
+def main(argv=None):
+    import hw_eval
+    parser = argparse.ArgumentParser(description="Calibrate per-layer output shifts for the exported .hex weights")
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--data", default=hw_eval.DATA_ROOT)
+    parser.add_argument("--images", type=int, default=CALIB_IMAGES, help="calibration images (from the training set)")
+    parser.add_argument("--sv-package", default=SV_PACKAGE_FILE, help="SystemVerilog parameter package to write")
+    args = parser.parse_args(argv)
+
+    images, _ = hw_eval.load_mnist(args.data, train=True, count=args.images)
+    weights = golden_model.load_weights(args.weights)
+    shifts, stats = calibrate_shifts(images, weights)
+    print_table(shifts, stats)
+    write_params(shifts, stats=stats, root=args.weights, acc_widths=acc_width.recommend(weights),
+                 sv_package=args.sv_package)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,548 @@
+"""
+NumPy port of c/camera.cpp's digit normalization (grayscale, 5x5 blur,
+inverse threshold, dilation, largest blob outline, INTER_AREA resize,
+centre-of-mass shift, pad, /2 scaling), run as capture -> preprocess ->
+infer -> render threads. No OpenCV is needed except for live capture.
+The final 32x32 FPGA pixels match OpenCV running the camera.cpp sequence;
+the thresholded intermediates (binary map, outline canvas) can differ by
+a pixel where the blur lands exactly on the threshold, since
+gaussian_blur5 does not round exactly like cv::GaussianBlur there.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import threading
+import collections
+import numpy as np
+
+# --- CONFIGURATION ---
+# Same tuning as c/camera.cpp
+TARGET_BOX = (220, 140, 200, 200)   # x, y, w, h of the crop in the 640x480 frame
+THRESH_VAL = 85
+GLUE_AMOUNT = 4                     # dilation kernel that glues broken strokes
+MIN_AREA = 50                       # smaller blobs are noise
+OUTLINE_THICKNESS = 8               # drawContours thickness of the kept blob
+DIGIT_BOX = 20                      # longest side after the resize, MNIST style
+DIGIT_SIZE = 28
+PAD = 2                             # 28x28 -> 32x32 FPGA input
+
+QUEUE_DEPTH = 2                     # frames buffered between stages before the oldest is dropped
+REPLAY_FPS = 30.0                   # pace of recorded input (0 = as fast as the pipeline goes, nothing dropped)
+HIST_EDGES_MS = np.geomspace(0.05, 2000, 47)   # log-spaced latency buckets, ~25% wide
+DASHBOARD_SIZE = (480, 640)
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".pgm", ".ppm")
+
+# --- PREPROCESSING (NumPy port of the camera.cpp loop) ---
+def bgr_to_gray(frame):
+    """cv::COLOR_BGR2GRAY for 8-bit input (14-bit fixed-point coefficients)."""
+    if frame.ndim == 2:
+        return frame.astype(np.uint8)
+    b, g, r = (frame[..., c].astype(np.int32) for c in range(3))
+    return ((b * 1868 + g * 9617 + r * 4899 + (1 << 13)) >> 14).astype(np.uint8)
+
+def gaussian_blur5(gray):
+    """
+    cv::GaussianBlur(5x5, sigma 0): the fixed [1 4 6 4 1]/16 kernel,
+    BORDER_REFLECT_101. Rounding can differ from OpenCV's by one on a few
+    pixels, enough to flip a pixel sitting right on THRESH_VAL.
+    """
+    x = np.pad(gray.astype(np.int32), 2, mode='reflect')   # reflect == BORDER_REFLECT_101
+    k = (1, 4, 6, 4, 1)
+    h, w = gray.shape
+    rows = sum(k[i] * x[:, i:i + w] for i in range(5))
+    out = sum(k[i] * rows[i:i + h] for i in range(5))
+    return ((out + 128) >> 8).astype(np.uint8)
+
+def dilate_rect(mask, size):
+    """cv::dilate with a size x size rectangle, anchor at the kernel centre (size // 2)."""
+    a = size // 2
+    h, w = mask.shape
+    x = np.pad(mask, ((a, size - 1 - a), (a, size - 1 - a)))
+    out = np.zeros_like(mask)
+    for dy in range(size):
+        for dx in range(size):
+            out |= x[dy:dy + h, dx:dx + w]
+    return out
+
+def label_components(mask, connectivity=8):
+    """
+    Connected components of a boolean image via union-find over horizontal
+    runs, so the Python work scales with the number of runs, not pixels.
+    Returns (labels, count); labels is 0 for background, 1..count otherwise.
+    """
+    h, w = mask.shape
+    edges = np.diff(np.pad(mask, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    row, start = np.nonzero(edges == 1)
+    stop = np.nonzero(edges == -1)[1]
+    n = len(row)
+    labels = np.zeros((h, w), dtype=np.int32)
+    if n == 0:
+        return labels, 0
+
+    parent = list(range(n))
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    reach = 1 if connectivity == 8 else 0
+    row_first = np.searchsorted(row, np.arange(h + 1))
+    for y in range(1, h):
+        i, i_end = row_first[y - 1], row_first[y]
+        for j in range(row_first[y], row_first[y + 1]):
+            while i < i_end and stop[i] + reach <= start[j]:
+                i += 1
+            k = i
+            while k < i_end and start[k] < stop[j] + reach:
+                a, b = find(j), find(k)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+                k += 1
+
+    roots = np.array([find(i) for i in range(n)])
+    uniq, run_label = np.unique(roots, return_inverse=True)
+    lengths = stop - start
+    offsets = np.repeat(row * w + start - np.cumsum(lengths) + lengths, lengths)
+    labels.reshape(-1)[offsets + np.arange(lengths.sum())] = np.repeat(run_label + 1, lengths)
+    return labels, len(uniq)
+
+def fill_holes(mask):
+    """Foreground plus every background region not 4-connected to the image border."""
+    labels, _ = label_components(~mask, connectivity=4)
+    outside = np.unique(np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]]))
+    return ~np.isin(labels, outside[outside > 0])
+
+def _boundary(mask):
+    """Foreground pixels with a 4-neighbour outside the mask (the traced contour)."""
+    x = np.pad(mask, 1)
+    inner = x[:-2, 1:-1] & x[2:, 1:-1] & x[1:-1, :-2] & x[1:-1, 2:]
+    return mask & ~inner
+
+def largest_blob(binary, min_area=MIN_AREA):
+    """
+    Mask of the external contour with the largest area, or None when it is
+    not above min_area (the findContours/contourArea step). Contours are
+    traced through boundary pixel centres, so by Pick's theorem their area
+    is pixels - boundary / 2 - 1 of the hole-filled blob.
+    """
+    labels, count = label_components(fill_holes(binary), connectivity=8)
+    if count == 0:
+        return None
+    pixels = np.bincount(labels.ravel(), minlength=count + 1)
+    edge = np.bincount(labels[_boundary(labels > 0)], minlength=count + 1)
+    area = pixels - edge / 2 - 1
+    area[0] = 0
+    best = int(area.argmax())
+    if area[best] <= min_area:
+        return None
+    return labels == best
+
+def draw_outline(blob, thickness=OUTLINE_THICKNESS):
+    """
+    cv::drawContours(canvas, ..., thickness) of the blob's outer contour:
+    a filled disc of radius thickness / 2 on every contour pixel, plus the
+    two pixels the thick-line polygon adds either side of a diagonal step.
+    """
+    r = thickness // 2
+    h, w = blob.shape
+    p = r + 1
+    edge = np.pad(_boundary(blob), p)
+    at = lambda img, dy, dx: img[p + dy:p + dy + h, p + dx:p + dx + w]   # img shifted by (-dy, -dx)
+
+    canvas = np.zeros_like(blob)
+    yy, xx = np.mgrid[-r:r + 1, -r:r + 1]
+    for dy, dx in zip(*np.nonzero(yy ** 2 + xx ** 2 <= r * r)):
+        canvas |= at(edge, dy - r, dx - r)
+    # Diagonal steps: contour pixels touching only by a corner
+    for sx in (1, -1):
+        step = np.zeros_like(edge)
+        step[p:p + h, p:p + w] = at(edge, 0, 0) & at(edge, 1, sx) & ~at(edge, 1, 0) & ~at(edge, 0, sx)
+        ends = step.copy()
+        ends[p:p + h, p:p + w] |= at(step, -1, -sx)
+        k = r - 1
+        canvas |= at(ends, -k, sx * k) | at(ends, k, -sx * k)
+    return canvas
+
+def _area_weights(in_size, out_size):
+    """
+    (out_size, in_size) matrix of cv::INTER_AREA: each output pixel averages
+    the source interval it covers, weighted by overlap. For upscaling this
+    is OpenCV's sharp linear variant (only the straddled pixel pair mixes).
+    """
+    scale = in_size / out_size
+    lo = np.arange(out_size)[:, None] * scale
+    src = np.arange(in_size)[None, :]
+    overlap = np.clip(np.minimum(lo + scale, src + 1) - np.maximum(lo, src), 0, None)
+    return overlap / overlap.sum(axis=1, keepdims=True)
+
+def resize_area(img, width, height):
+    out = _area_weights(img.shape[0], height) @ img.astype(np.float64) @ _area_weights(img.shape[1], width).T
+    return np.clip(np.rint(out), 0, 255).astype(np.uint8)
+
+def shift_to_center_of_mass(img):
+    """
+    Translates the digit so its binary centre of mass lands on (14, 14):
+    cv::warpAffine with the float32 matrix of camera.cpp, bilinear, zero border.
+    """
+    ys, xs = np.nonzero(img)
+    if len(xs) == 0:
+        return img
+    h, w = img.shape
+    # camera.cpp builds the matrix in float32; output (x, y) samples (x + sx, y + sy)
+    sx, sy = (-float(np.float32(DIGIT_SIZE / 2 - c.mean())) for c in (xs, ys))
+    ox, oy = int(np.floor(sx)), int(np.floor(sy))
+    fx, fy = sx - ox, sy - oy
+    p = max(h, w)
+    x = np.pad(img.astype(np.float64), p)
+    out = np.zeros((h, w))
+    for dy, wy in ((oy, 1 - fy), (oy + 1, fy)):
+        for dx, wx in ((ox, 1 - fx), (ox + 1, fx)):
+            out += wy * wx * x[p + dy:p + dy + h, p + dx:p + dx + w]
+    return np.clip(np.rint(out), 0, 255).astype(np.uint8)
+
+def normalize_digit(frame, box=TARGET_BOX):
+    """
+    One camera frame (H, W, 3) BGR or (H, W) gray, uint8 -> dict with the
+    camera.cpp intermediates: binary (dilated threshold), canvas (outline
+    of the kept blob), digit (28x28 0/255) and pixels (32x32 FPGA input).
+    """
+    x, y, w, h = box
+    if frame.shape[0] < y + h or frame.shape[1] < x + w:
+        raise ValueError(f"frame {frame.shape[1]}x{frame.shape[0]} does not contain the target box {box}")
+    gray = bgr_to_gray(frame[y:y + h, x:x + w])
+    binary = gaussian_blur5(gray) <= THRESH_VAL                  # THRESH_BINARY_INV
+    binary = dilate_rect(binary, max(1, GLUE_AMOUNT))
+
+    blob = largest_blob(binary)
+    canvas = draw_outline(blob) if blob is not None else np.zeros_like(binary)
+
+    digit = np.zeros((DIGIT_SIZE, DIGIT_SIZE), dtype=np.uint8)
+    if canvas.any():
+        rows, cols = np.nonzero(canvas.any(axis=1))[0], np.nonzero(canvas.any(axis=0))[0]
+        roi = canvas[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1].astype(np.uint8) * 255
+        scale = np.float32(DIGIT_BOX) / max(roi.shape)
+        new_w = max(1, int(roi.shape[1] * scale))
+        new_h = max(1, int(roi.shape[0] * scale))
+        dx, dy = (DIGIT_SIZE - new_w) // 2, (DIGIT_SIZE - new_h) // 2
+        digit[dy:dy + new_h, dx:dx + new_w] = resize_area(roi, new_w, new_h)
+        digit = shift_to_center_of_mass(digit)
+    digit = np.where(digit > 127, 255, 0).astype(np.uint8)
+
+    pixels = np.pad(digit, PAD) // 2
+    return {"binary": binary, "canvas": canvas, "digit": digit, "pixels": pixels}
+
+# --- FRAME SOURCES ---
+def recorded_frames(path):
+    """
+    Frames of a recording, uint8 BGR (or gray): an .npy stack (memory-mapped),
+    an .npz with a "frames" array, a directory of images (sorted by name) or
+    a single image.
+    """
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTS))
+        paths = [os.path.join(path, n) for n in names]
+    elif path.endswith(".npy"):
+        yield from np.load(path, mmap_mode='r')
+        return
+    elif path.endswith(".npz"):
+        with np.load(path) as npz:
+            yield from npz["frames"]
+        return
+    else:
+        paths = [path]
+    from PIL import Image
+    for p in paths:
+        with Image.open(p) as im:
+            rgb = np.asarray(im.convert("L" if im.mode in ("L", "1") else "RGB"))
+        yield rgb if rgb.ndim == 2 else rgb[..., ::-1]
+
+def camera_frames(index=0, width=640, height=480):
+    """Live frames from a V4L2 camera. Needs OpenCV; recordings do not."""
+    import cv2
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        raise RuntimeError(f"cannot open camera {index}")
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                return
+            yield frame
+    finally:
+        cap.release()
+
+# --- DASHBOARD ---
+def _resize_nearest(img, height, width):
+    ys = np.arange(height) * img.shape[0] // height
+    xs = np.arange(width) * img.shape[1] // width
+    out = img[ys[:, None], xs]
+    return out if out.ndim == 3 else np.repeat(out[..., None], 3, axis=2)
+
+def render_dashboard(frame, pre, prediction, box=TARGET_BOX):
+    """The 2x2 camera.cpp dashboard (frame, binary, canvas, digit) as a BGR array."""
+    h, w = DASHBOARD_SIZE
+    dash = np.zeros((h, w, 3), dtype=np.uint8)
+    tiles = (frame, pre["binary"].astype(np.uint8) * 255, pre["canvas"].astype(np.uint8) * 255, pre["digit"])
+    for k, tile in enumerate(tiles):
+        y, x = (k // 2) * h // 2, (k % 2) * w // 2
+        dash[y:y + h // 2, x:x + w // 2] = _resize_nearest(tile, h // 2, w // 2)
+    dash[:60] = 0
+    bx, by, bw, bh = (v // 2 for v in box)
+    green = (0, 255, 0)
+    dash[by:by + 2, bx:bx + bw] = dash[by + bh - 2:by + bh, bx:bx + bw] = green
+    dash[by:by + bh, bx:bx + 2] = dash[by:by + bh, bx + bw - 2:bx + bw] = green
+
+    from PIL import Image, ImageDraw
+    im = Image.fromarray(dash[..., ::-1])
+    ImageDraw.Draw(im).text((20, 15), f"FPGA Prediction: {prediction}", fill=green, font_size=36)
+    return np.asarray(im)[..., ::-1]
+
+# --- PIPELINE ---
+class DropOldestQueue:
+    """
+    Bounded hand-off between two stages. When full, put() discards the oldest
+    item instead of blocking (drop=True), so a slow consumer only ever sees
+    the freshest frames and never back-pressures its producer. With
+    drop=False it blocks like queue.Queue (lossless replay).
+    """
+    def __init__(self, maxsize=QUEUE_DEPTH, drop=True):
+        self.maxsize = maxsize
+        self.drop = drop
+        self.items = collections.deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self.cond:
+            while not self.drop and len(self.items) >= self.maxsize and not self.closed:
+                self.cond.wait()
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify_all()
+
+    def get(self):
+        """Next item, or None once the queue is closed and drained."""
+        with self.cond:
+            while not self.items and not self.closed:
+                self.cond.wait()
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram; percentiles read back as bucket upper edges."""
+    def __init__(self, edges_ms=HIST_EDGES_MS):
+        self.edges = np.asarray(edges_ms, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1e3
+        self.counts[np.searchsorted(self.edges, ms)] += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def percentile(self, q):
+        if self.count == 0:
+            return 0.0
+        k = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.count))
+        return float(min(self.edges[k], self.max_ms)) if k < len(self.edges) else self.max_ms
+
+    def summary(self):
+        n = self.count
+        return {"count": n, "mean_ms": self.total_ms / n if n else 0.0,
+                "p50_ms": self.percentile(50), "p95_ms": self.percentile(95),
+                "p99_ms": self.percentile(99), "max_ms": self.max_ms,
+                "buckets": [[float(e), int(c)] for e, c in zip(np.append(self.edges, np.inf), self.counts) if c]}
+
+STAGES = ("capture", "preprocess", "infer", "render", "decision", "end_to_end")
+
+class CameraPipeline:
+    """
+    capture -> preprocess -> infer -> render, one thread per stage joined
+    by DropOldestQueues. A stalled renderer loses dashboard frames, never
+    inference throughput. fps paces a recording like a camera would;
+    lossless makes the capture/preprocess hand-offs block instead of drop
+    (offline evaluation). "decision" is capture to prediction,
+    "end_to_end" capture to rendered dashboard.
+    """
+    def __init__(self, frames, infer, sink=None, depth=QUEUE_DEPTH, fps=0.0, lossless=False):
+        self.frames = frames
+        self.infer_fn = infer
+        self.sink = sink
+        self.fps = fps
+        self.queues = {"preprocess": DropOldestQueue(depth, drop=not lossless),
+                       "infer": DropOldestQueue(depth, drop=not lossless),
+                       "render": DropOldestQueue(depth)}
+        self.hist = {s: LatencyHistogram() for s in STAGES}
+        self.results = []
+        self.captured = 0
+
+    def _capture(self):
+        out = self.queues["preprocess"]
+        t_next = time.perf_counter()
+        frames = iter(self.frames)
+        while True:
+            t0 = time.perf_counter()
+            frame = next(frames, None)
+            if frame is None:
+                break
+            frame = np.asarray(frame)
+            t1 = time.perf_counter()
+            self.hist["capture"].add(t1 - t0)
+            out.put({"index": self.captured, "t_capture": t1, "frame": frame})
+            self.captured += 1
+            if self.fps > 0:
+                t_next += 1.0 / self.fps
+                time.sleep(max(0.0, t_next - time.perf_counter()))
+        out.close()
+
+    def _stage(self, name, work, dst):
+        src = self.queues[name]
+        while (item := src.get()) is not None:
+            t0 = time.perf_counter()
+            work(item)
+            self.hist[name].add(time.perf_counter() - t0)
+            if dst is not None:
+                dst.put(item)
+        if dst is not None:
+            dst.close()
+
+    def _preprocess(self, item):
+        item["pre"] = normalize_digit(item["frame"])
+
+    def _infer(self, item):
+        item["prediction"] = int(self.infer_fn(item["pre"]["pixels"]))
+        self.hist["decision"].add(time.perf_counter() - item["t_capture"])
+        self.results.append((item["index"], item["prediction"]))
+
+    def _render(self, item):
+        dash = render_dashboard(item["frame"], item["pre"], item["prediction"])
+        if self.sink is not None:
+            self.sink(item["index"], dash)
+        self.hist["end_to_end"].add(time.perf_counter() - item["t_capture"])
+
+    def run(self):
+        """Runs until the source is exhausted. Returns [(frame_index, prediction)]."""
+        threads = [threading.Thread(target=self._capture, daemon=True),
+                   threading.Thread(target=self._stage, args=("preprocess", self._preprocess, self.queues["infer"]), daemon=True),
+                   threading.Thread(target=self._stage, args=("infer", self._infer, self.queues["render"]), daemon=True),
+                   threading.Thread(target=self._stage, args=("render", self._render, None), daemon=True)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return self.results
+
+    def stats(self):
+        return {"frames": self.captured, "inferred": len(self.results),
+                "dropped": {k: q.dropped for k, q in self.queues.items()},
+                "latency": {s: h.summary() for s, h in self.hist.items()}}
+
+# --- INFERENCE ---
+def golden_infer(weights_dir="."):
+    """Integer reference model as the inference stage (no board needed)."""
+    import golden_model
+    import calibrate
+    weights = golden_model.load_weights(weights_dir)
+    shifts = calibrate.load_shifts(weights_dir)
+    return lambda pixels: golden_model.predict(pixels.reshape(1, 32, 32), weights, shifts)[0]
+
+def print_report(stats):
+    print(f"Frames: {stats['frames']}  inferred: {stats['inferred']}  "
+          f"dropped: " + ", ".join(f"{k} {v}" for k, v in stats["dropped"].items()))
+    print(f"{'Stage':<12} {'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for stage, s in stats["latency"].items():
+        print(f"{stage:<12} {s['count']:>6} {s['mean_ms']:>8.2f} {s['p50_ms']:>8.2f} "
+              f"{s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Camera digit preprocessing + inference pipeline (camera.cpp in NumPy)")
+    parser.add_argument("source", help="recording (.npy/.npz stack, image directory or image) or 'camera'")
+    parser.add_argument("--camera-index", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=None,
+                        help=f"replay pace of recordings (default {REPLAY_FPS:g}; 0 = as fast as possible, lossless)")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many frames")
+    parser.add_argument("--infer", choices=["golden", "file", "devmem"], default="golden",
+                        help="golden model, or the FPGA through an fpga_host backend")
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--done-bit", type=int, default=None,
+                        help="dipsw done bit (default: the backend's, see fpga_host.regs.DONE_BIT)")
+    parser.add_argument("--timed-wait", action="store_true",
+                        help="devmem without a done bit: wait the modeled latency instead of polling")
+    parser.add_argument("--depth", type=int, default=QUEUE_DEPTH)
+    parser.add_argument("--out-dir", default=None, help="write every rendered dashboard here as PNG")
+    parser.add_argument("--predictions", default=None, help="write frame,prediction CSV")
+    parser.add_argument("--stats", default=None, help="write the latency histograms as JSON")
+    args = parser.parse_args(argv)
+
+    if args.source == "camera":
+        # A live camera paces itself; stale frames are dropped, never queued
+        frames, fps, lossless = camera_frames(args.camera_index), 0.0, False
+    else:
+        frames = recorded_frames(args.source)
+        fps = REPLAY_FPS if args.fps is None else args.fps
+        lossless = fps <= 0
+    if args.limit is not None:
+        frames = itertools.islice(frames, args.limit)
+
+    backend = None
+    if args.infer == "golden":
+        infer = golden_infer(args.weights)
+    else:
+        from fpga_host import BACKENDS, FpgaRuntime, DONE_BIT
+        if args.infer == "file":
+            backend = BACKENDS["file"](weights_dir=args.weights,
+                                       done_bit=DONE_BIT if args.done_bit is None else args.done_bit)
+        else:
+            backend = BACKENDS["devmem"]()
+        infer = FpgaRuntime(backend, done_bit=args.done_bit, timed_wait=args.timed_wait).infer
+
+    sink = None
+    if args.out_dir:
+        from PIL import Image
+        os.makedirs(args.out_dir, exist_ok=True)
+        sink = lambda i, dash: Image.fromarray(dash[..., ::-1]).save(os.path.join(args.out_dir, f"frame_{i:05d}.png"))
+
+    pipeline = CameraPipeline(frames, infer, sink, depth=args.depth, fps=fps, lossless=lossless)
+    try:
+        results = pipeline.run()
+    finally:
+        if backend is not None:
+            backend.close()
+
+    stats = pipeline.stats()
+    print_report(stats)
+    if args.predictions:
+        with open(args.predictions, 'w') as f:
+            f.write("frame,prediction\n")
+            f.writelines(f"{i},{p}\n" for i, p in results)
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            json.dump(stats, f, indent=2)
+        print(f"Wrote {args.stats}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
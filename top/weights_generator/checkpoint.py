@@ -0,0 +1,103 @@
+import os
+import re
+import json
+import random
+import numpy as np
+import golden_model
+
+# --- CONFIGURATION ---
+CHECKPOINT_DIR = "checkpoints"
+SEED = 0
+CHECKPOINT_EVERY = 1     # epochs between checkpoints (the last epoch is always saved)
+
+# LeNet5 parameter of every exported layer (same module names in both trainers)
+PARAM_NAMES = {"c1": "conv1.weight", "c2": "conv2.weight",
+               "c5": "fc1.weight", "f6": "fc2.weight", "out": "fc3.weight"}
+
+# --- SEEDING ---
+def seed_everything(seed=SEED):
+    """Seeds Python, NumPy and torch; with the torch-RNG shuffling of BatchLoader a run is reproducible."""
+    import torch
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+# --- SAVE / RESUME ---
+def float_weights(model):
+    """{layer: float32 array} of a LeNet5 model or state_dict."""
+    state = model.state_dict() if hasattr(model, "state_dict") else model
+    return {layer: state[name].detach().cpu().numpy().astype(np.float32) for layer, name in PARAM_NAMES.items()}
+
+def path_for(name, epoch=None, directory=CHECKPOINT_DIR):
+    """checkpoints/<name>_epochNN (no extension) or checkpoints/<name> for epoch=None."""
+    return os.path.join(directory, name if epoch is None else f"{name}_epoch{epoch:02d}")
+
+def save_export(path, weights, **meta):
+    """
+    <path>.npz: the float weights plus whatever export_weights needs to turn
+    them into ROM files (scales, fixed shifts, scale scheme). No torch needed
+    to read it back.
+    """
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, meta=np.array(json.dumps(meta)), **{l: weights[l] for l in golden_model.LAYERS})
+    os.replace(tmp, path + ".npz")
+    return path + ".npz"
+
+def load_export(path):
+    """(float_weights, meta) from a .npz written by save_export."""
+    with np.load(path) as npz:
+        weights = {l: npz[l] for l in golden_model.LAYERS}
+        meta = json.loads(str(npz["meta"])) if "meta" in npz.files else {}
+    return weights, meta
+
+def save(path, model, optimizer, epoch, seed, **meta):
+    """
+    Writes <path>.pt (model, optimizer and RNG state: enough to resume
+    bit-exactly after `epoch` completed epochs) and the <path>.npz export.
+    Both are written under temporary names and renamed.
+    """
+    import torch
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    state = {"model": model.state_dict(), "optimizer": optimizer.state_dict(),
+             "epoch": epoch, "seed": seed, "meta": meta,
+             "rng": {"torch": torch.get_rng_state(), "numpy": np.random.get_state(),
+                     "python": random.getstate()}}
+    tmp = path + ".tmp.pt"
+    torch.save(state, tmp)
+    os.replace(tmp, path + ".pt")
+    save_export(path, float_weights(model), epoch=epoch, seed=seed, **meta)
+    print(f"Checkpoint: {path}.pt (epoch {epoch})")
+    return path + ".pt"
+
+def latest(name, directory=CHECKPOINT_DIR):
+    """Path of the highest-epoch <name>_epochNN.pt, or None."""
+    if not os.path.isdir(directory):
+        return None
+    pattern = re.compile(re.escape(name) + r"_epoch(\d+)\.pt$")
+    found = [(int(m.group(1)), f) for f in os.listdir(directory) if (m := pattern.match(f))]
+    return os.path.join(directory, max(found)[1]) if found else None
+
+def resume(path, model, optimizer=None):
+    """
+    Restores model, optimizer and RNG state from a .pt checkpoint.
+    Returns the checkpoint dict; its "epoch" is the number of epochs done.
+    """
+    import torch
+    state = torch.load(path, weights_only=False)
+    model.load_state_dict(state["model"])
+    if optimizer is not None:
+        optimizer.load_state_dict(state["optimizer"])
+    torch.set_rng_state(state["rng"]["torch"])
+    np.random.set_state(state["rng"]["numpy"])
+    random.setstate(state["rng"]["python"])
+    print(f"Resumed from {path} (epoch {state['epoch']}, seed {state['seed']})")
+    return state
+
+def resolve(resume_arg, name, directory=CHECKPOINT_DIR):
+    """--resume value -> checkpoint path: 'latest' picks the newest <name> checkpoint."""
+    if resume_arg != "latest":
+        return resume_arg
+    path = latest(name, directory)
+    if path is None:
+        raise FileNotFoundError(f"no {name}_epochNN.pt checkpoint in {directory}")
+    return path
@@ -0,0 +1,77 @@
+"""
+weights-generator <command> [options]: one entry point for the tools in
+this directory. Only the chosen command's module is imported, so nothing
+but the training commands pays for torch, and the command list and
+`weights-generator` without a command import nothing at all.
+`weights-generator --trace run.json <command> ...` records the command's
+phases (tracing.py) and prints where the time went.
+"""
+import sys
+import importlib
+
+PROG = "weights-generator"
+
+# --- COMMANDS ---
+# name -> (module with main(argv), one-line help). Training first, then
+# the numpy-only tools simulation scripts call in loops.
+COMMANDS = {
+    "train":       ("weights_generator_fc", "train LeNet-5 (per-layer scales, --qat, --prune) and export the ROMs"),
+    "train-global": ("weights_generator", "train LeNet-5 with one global weight scale and export the ROMs"),
+    "export":      ("export_weights", "regenerate every ROM file from a checkpoint, no retraining"),
+    "calibrate":   ("calibrate", "calibrate the per-layer output shifts of the exported weights"),
+    "golden":      ("golden_batch", "sharded golden vectors over the MNIST test set"),
+    "golden-fc":   ("mif_golden_f6", "golden C5/F6/OUT .mif files for the gradient test image"),
+    "eval":        ("hw_eval", "int8 hardware accuracy of the exported ROMs"),
+    "image":       ("mnist_hex", "write one MNIST test digit as image.hex / image.mif"),
+    "diff":        ("golden_diff", "diff RTL simulation dumps against the golden model"),
+    "mem":         ("memfmt", "inspect, compare or convert .mif / .hex / .mem files"),
+    "bundle":      ("weight_bundle", "build or check the binary weight bundle"),
+    "manifest":    ("rom_manifest", "query the ROM manifest (changed / verify / show)"),
+    "layout":      ("rom_layout", "banked / interleaved weight ROMs for parallel MAC engines"),
+    "sparse":      ("sparse_fc", "zero-skip FC weight streams and their cycle savings"),
+    "acc-width":   ("acc_width", "minimal safe accumulator width per layer"),
+    "perf":        ("perf_model", "cycle-level throughput / latency / resource model"),
+    "sweep":       ("precision_sweep", "accuracy vs. weight/activation precision vs. resources"),
+    "cache":       ("dataset_cache", "build the pre-resized 32x32 MNIST cache"),
+    "layer-cache": ("layer_cache", "on-disk per-layer golden cache: stats / clear / shift sweep"),
+    "camera":      ("camera_pipeline", "camera preprocessing + inference pipeline"),
+    "detect":      ("sliding_window", "multi-digit sliding-window inference over the camera crop"),
+    "rtl-model":   ("rtl_model", "clock-stepped fc_streaming / maxpool_buffer models, checked against golden"),
+    "bench":       ("bench", "benchmark the toolchain and track regressions"),
+}
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = [f"usage: {PROG} [--trace FILE] <command> [options]   ({PROG} <command> -h for its options)", "",
+             "commands:"]
+    lines += [f"  {name:<{width}}  {help_text}" for name, (_, help_text) in COMMANDS.items()]
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    import tracing
+    if argv[0] == "--trace":
+        if len(argv) < 3:
+            print(f"usage: {PROG} --trace FILE <command> [options]", file=sys.stderr)
+            return 2
+        tracing.enable(argv[1])
+        argv = argv[2:]
+    name, rest = argv[0], argv[1:]
+    if name not in COMMANDS:
+        import difflib
+        close = difflib.get_close_matches(name, COMMANDS, n=1)
+        print(f"{PROG}: unknown command '{name}'" + (f", did you mean '{close[0]}'?" if close else ""),
+              file=sys.stderr)
+        print(usage(), file=sys.stderr)
+        return 2
+    module = importlib.import_module(COMMANDS[name][0])
+    # Each tool parses its own options; argparse takes its prog from argv[0]
+    sys.argv[0] = f"{PROG} {name}"
+    with tracing.span(name):
+        return module.main(rest) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
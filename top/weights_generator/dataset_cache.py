@@ -0,0 +1,126 @@
+import os
+import sys
+import argparse
+import numpy as np
+import mnist_idx
+import tracing
+
+# --- CONFIGURATION ---
+DATA_ROOT = mnist_idx.DATA_ROOT
+CACHE_DIR = "cache"          # under the data root, next to MNIST/
+CACHE_NAMES = {True: "mnist32_train", False: "mnist32_test"}
+BUILD_CHUNK = 10000          # images resized per vectorized pass while building
+
+# --- CACHE ---
+def _open_split(root, train):
+    """MnistIdx of the split; torchvision is only imported to download missing files."""
+    try:
+        return mnist_idx.MnistIdx(root, train)
+    except FileNotFoundError:
+        from torchvision import datasets
+        with tracing.span("download"):
+            datasets.MNIST(root=root, train=train, download=True)
+        return mnist_idx.MnistIdx(root, train)
+
+def cache_paths(root=DATA_ROOT, train=True):
+    base = os.path.join(root, CACHE_DIR, CACHE_NAMES[train])
+    return base + "_images.npy", base + "_labels.npy"
+
+def _is_stale(root, train):
+    images_path, labels_path = cache_paths(root, train)
+    if not (os.path.exists(images_path) and os.path.exists(labels_path)):
+        return True
+    # Rebuild when the raw IDX file is newer than the cache (re-downloaded)
+    source = os.path.join(root, mnist_idx.RAW_DIR, mnist_idx.FILES[train][0])
+    return os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(images_path)
+
+@tracing.traced("dataset_cache.build")
+def build(root=DATA_ROOT, train=True):
+    """
+    Resizes a whole split to 32x32 once (Pillow-exact bilinear, the
+    transforms.Resize((32, 32)) of the trainers) and stores it as uint8
+    .npy files. Written to temporary names and renamed, so an interrupted
+    build never leaves a cache that looks valid.
+    """
+    with tracing.span("decode_idx"):
+        dataset = _open_split(root, train)
+    images_path, labels_path = cache_paths(root, train)
+    os.makedirs(os.path.dirname(images_path), exist_ok=True)
+    n = len(dataset)
+
+    tmp = images_path[:-4] + ".tmp.npy"
+    out = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.uint8,
+                                    shape=(n, mnist_idx.MAPSIZE, mnist_idx.MAPSIZE))
+    with tracing.span("resize", items=n):
+        for start in range(0, n, BUILD_CHUNK):
+            out[start:start + BUILD_CHUNK] = mnist_idx.resize(dataset.images[start:start + BUILD_CHUNK])
+    out.flush()
+    del out
+    tmp_labels = labels_path[:-4] + ".tmp.npy"
+    np.save(tmp_labels, np.asarray(dataset.labels, dtype=np.uint8))
+    os.replace(tmp_labels, labels_path)
+    os.replace(tmp, images_path)
+    print(f"Cached {n} {'train' if train else 'test'} images -> {images_path}")
+
+def load(root=DATA_ROOT, train=True, rebuild=False):
+    """
+    (images, labels) of a split from the 32x32 cache, building it on first
+    use. images is a read-only (N, 32, 32) uint8 memmap (the 8-bit image
+    ToTensor() sees), labels an int64 array.
+    """
+    if rebuild or _is_stale(root, train):
+        build(root, train)
+    images_path, labels_path = cache_paths(root, train)
+    with tracing.span("dataset_cache.load", split="train" if train else "test"):
+        return np.load(images_path, mmap_mode='r'), np.load(labels_path).astype(np.int64)
+
+# --- LOADER ---
+class BatchLoader:
+    """
+    In-memory stand-in for DataLoader(dataset, batch_size, shuffle) over a
+    cached split. Yields (data, target) tensors, data (B, 1, 32, 32) float32
+    equal to ToTensor() (and Normalize(mean, std) when given) of the cached
+    images. Each batch is one fancy-indexed gather from RAM, so there is no
+    PIL, no per-sample Python and no need for worker processes. Shuffling
+    draws from the torch RNG like DataLoader does, so torch.manual_seed
+    still controls the order.
+    """
+    def __init__(self, images, labels, batch_size=64, shuffle=False, normalize=None):
+        self.images = np.array(images, dtype=np.uint8)   # reads a memmap into memory once (~60 MB for train)
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.normalize = normalize
+
+    def __len__(self):
+        return -(-len(self.labels) // self.batch_size)
+
+    def __iter__(self):
+        import torch
+        n = len(self.labels)
+        order = torch.randperm(n).numpy() if self.shuffle else None
+        for start in range(0, n, self.batch_size):
+            idx = order[start:start + self.batch_size] if self.shuffle else slice(start, start + self.batch_size)
+            data = torch.from_numpy(self.images[idx]).unsqueeze(1).float().div_(255)
+            if self.normalize is not None:
+                mean, std = self.normalize
+                data.sub_(mean).div_(std)
+            yield data, torch.from_numpy(self.labels[idx])
+
+def loaders(root=DATA_ROOT, batch_size=64, test_batch_size=1000, normalize=None):
+    """(train_loader, test_loader) over the cached splits, shuffled / in order."""
+    train = BatchLoader(*load(root, train=True), batch_size, shuffle=True, normalize=normalize)
+    test = BatchLoader(*load(root, train=False), test_batch_size, normalize=normalize)
+    return train, test
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the pre-resized 32x32 MNIST cache")
+    parser.add_argument("--data", default=DATA_ROOT)
+    parser.add_argument("--split", choices=["train", "test", "both"], default="both")
+    args = parser.parse_args(argv)
+    for train in {"train": [True], "test": [False], "both": [True, False]}[args.split]:
+        build(args.data, train)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
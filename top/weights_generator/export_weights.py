@@ -0,0 +1,155 @@
+import os
+import sys
+import argparse
+import numpy as np
+import golden_model
+import calibrate
+import weight_bundle
+import checkpoint
+import memfmt
+import rom_manifest
+import acc_width
+import rom_layout
+import sparse_fc
+import tracing
+
+# --- CONFIGURATION ---
+DATA_ROOT = "./data"
+
+# --- ROM FILES ---
+@tracing.traced("global_scales")
+def global_scales(float_weights):
+    """weights_generator.py's scheme: one scale, the largest weight of the whole net -> 127."""
+    max_val = max(float(np.abs(float_weights[l]).max()) for l in golden_model.LAYERS)
+    scale = 127.0 / max_val if max_val > 0 else 1.0
+    return {l: scale for l in golden_model.LAYERS}
+
+@tracing.traced()
+def write_weight_files(weights, root=".", layouts=None, sparse=False):
+    """
+    Writes the int8 weights as the .hex ROM files of golden_model.WEIGHT_FILES
+    (one file per C1/C2 filter, C2 channel-major, FC layers flattened),
+    lower-case two-digit words as the trainers have always written them.
+    Only files whose bytes change are rewritten (atomically); every file's
+    hash goes into rom_manifest.json. layouts ({layer: (banks, lanes)})
+    adds rom_layout's banked files (those of earlier exports are always
+    regenerated), sparse the zero-skip FC streams of
+    sparse_fc. Returns the ROM files that changed.
+    """
+    manifest = rom_manifest.Manifest(root)
+    for layer in golden_model.LAYERS:
+        files = golden_model.WEIGHT_FILES[layer]
+        os.makedirs(os.path.join(root, os.path.dirname(files[0])), exist_ok=True)
+        rows = np.asarray(weights[layer]).reshape(len(files), -1)
+        with tracing.span(f"write_hex.{layer}", items=rows.size, files=len(files)):
+            for name, row in zip(files, rows):
+                manifest.write(name, memfmt.encode_hex(row, upper=False), layer)
+    # Always: layouts of earlier exports are regenerated for the new weights
+    with tracing.span("write_layouts"):
+        rom_layout.write_layouts(weights, layouts or {}, manifest)
+    if sparse:
+        with tracing.span("write_sparse"):
+            sparse_fc.write_sparse(weights, manifest)
+    with tracing.span("manifest"):
+        return manifest.save()
+
+@tracing.traced("export")
+def export(float_weights, scales, calib_pixels=None, fixed_shifts=None, shifts=None, root=".", layouts=None,
+           sparse=False, sv_package=calibrate.SV_PACKAGE_FILE):
+    """
+    Float weights -> ROM files, shift parameters and the weight bundle.
+    With `shifts` the shifts are taken as given (weights_generator.py uses
+    the RTL defaults); otherwise they are calibrated on `calib_pixels`,
+    keeping the layers in `fixed_shifts` (QAT). Either way
+    lenet_params.json / lenet_params_pkg.sv are rewritten with the proven
+    accumulator widths of the new weights, which the RTL truncates to.
+    Returns (int8 weights, shifts).
+    """
+    with tracing.span("quantize", items=sum(np.size(float_weights[l]) for l in golden_model.LAYERS)):
+        weights = calibrate.quantize_weights(float_weights, scales)
+    changed = write_weight_files(weights, root, layouts, sparse)
+    total = sum(len(f) for f in golden_model.WEIGHT_FILES.values())
+    total += sum(len(d["files"]) for d in rom_layout.load(root).values())
+    total += len(sparse_fc.SPARSE_FILES) if sparse else 0
+    print(f"{len(changed)} of {total} .hex ROM files changed ({rom_manifest.MANIFEST_FILE}: python rom_manifest.py changed)")
+
+    stats = None
+    if shifts is None:
+        with tracing.span("calibrate_shifts", items=len(calib_pixels)):
+            shifts, stats = calibrate.calibrate_shifts(calib_pixels, weights, fixed=fixed_shifts)
+        calibrate.print_table(shifts, stats, scales)
+    with tracing.span("write_params"):
+        calibrate.write_params(shifts, scales, stats, root=root, acc_widths=acc_width.recommend(weights),
+                               sv_package=sv_package)
+
+    with tracing.span("write_bundle"):
+        weight_bundle.write_bundle(os.path.normpath(os.path.join(root, weight_bundle.BUNDLE_FILE)), weights, shifts)
+    return weights, shifts
+
+def calibration_pixels(data_root=DATA_ROOT, count=calibrate.CALIB_IMAGES, pixels="mnist"):
+    """
+    The trainers' calibration set: the first `count` training images as
+    FPGA pixels, mapped like MNIST (p * 127) or like camera.cpp (v / 2).
+    """
+    import dataset_cache
+    import mnist_idx
+    images, _ = dataset_cache.load(data_root, train=True)
+    to_pixels = mnist_idx.to_camera_pixels if pixels == "camera" else mnist_idx.to_fpga_pixels
+    return to_pixels(images[:count])
+
+def export_checkpoint(path, data_root=DATA_ROOT, root=".", layouts=None, sparse=None,
+                      sv_package=calibrate.SV_PACKAGE_FILE):
+    """
+    Regenerates every ROM file from a checkpoint, no retraining: a .npz
+    export (torch-free) or a .pt checkpoint (needs torch). Pruned
+    checkpoints also get their zero-skip streams unless sparse=False.
+    """
+    if path.endswith(".pt"):
+        import torch
+        state = torch.load(path, weights_only=False)
+        float_weights, meta = checkpoint.float_weights(state["model"]), state.get("meta", {})
+    else:
+        float_weights, meta = checkpoint.load_export(path)
+
+    if sparse is None:
+        sparse = bool(meta.get("sparsity"))
+    if meta.get("scheme") == "global":
+        return export(float_weights, global_scales(float_weights),
+                      shifts=dict(golden_model.RTL_SHIFTS), root=root, layouts=layouts, sparse=sparse,
+                      sv_package=sv_package)
+    scales = meta.get("scales") or calibrate.layer_scales(float_weights)
+    return export(float_weights, scales, calibration_pixels(data_root, pixels=meta.get("pixels", "mnist")),
+                  fixed_shifts=meta.get("fixed_shifts") or {}, root=root, layouts=layouts, sparse=sparse,
+                  sv_package=sv_package)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the FPGA weight ROMs from a training checkpoint")
+    parser.add_argument("checkpoint", help="checkpoints/<run>.npz (fast, torch-free) or .pt")
+    parser.add_argument("--data", default=DATA_ROOT, help="MNIST root for shift calibration")
+    parser.add_argument("--out", default=".", help="directory that receives c1_weights/ c2_weights/ fc_weights/")
+    parser.add_argument("--sv-package", default=calibrate.SV_PACKAGE_FILE,
+                        help="SystemVerilog parameter package to write (default: top/lenet_params_pkg.sv)")
+    parser.add_argument("--layout", action="append", default=[], metavar="LAYER=BANKSxLANES",
+                        help="also emit banked ROMs for a parallel MAC engine (rom_layout.py), e.g. c5=4x2")
+    parser.add_argument("--sparse", action="store_true", default=None,
+                        help="also emit the zero-skip FC streams (default: only for pruned checkpoints)")
+    parser.add_argument("--eval", action="store_true", help="run the hardware accuracy check afterwards")
+    args = parser.parse_args(argv)
+
+    layouts = {}
+    for item in args.layout:
+        layer, _, spec = item.partition("=")
+        if layer not in golden_model.LAYERS:
+            parser.error(f"unknown layer '{layer}'")
+        layouts[layer] = rom_layout.parse(spec)
+    weights, shifts = export_checkpoint(args.checkpoint, args.data, args.out, layouts, args.sparse,
+                                        args.sv_package)
+    if args.eval:
+        import hw_eval
+        images, labels = hw_eval.load_test_set(args.data)
+        report = hw_eval.evaluate(images, labels, weights, shifts)
+        hw_eval.print_report(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
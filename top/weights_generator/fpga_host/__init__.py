@@ -0,0 +1,9 @@
+"""
+Host runtime for the LeNet-5 accelerator: packs images, drives the start
+trigger and reads the prediction through the HPS-to-FPGA register window.
+DevMemBackend talks to the board; FileBackend emulates it on a dev box.
+Benchmark: python -m fpga_host.bench (from top/weights_generator).
+"""
+from .regs import RegisterWindow, DONE_BIT, BOARD_DONE_BIT
+from .backends import DevMemBackend, FileBackend, BACKENDS, modeled_timing
+from .runtime import FpgaRuntime, pack_images, camera_pixels
@@ -0,0 +1,125 @@
+import os
+import mmap
+import time
+import multiprocessing as mp
+import numpy as np
+from . import regs
+
+# --- DEVICE TIMING ---
+def modeled_timing(fmax_mhz=None):
+    """
+    (conv_s, total_s) of one image from perf_model: the conv block is the
+    part that keeps re-reading the image RAM, total is trigger -> OUT done.
+    """
+    import perf_model
+    report = perf_model.estimate(fmax_mhz=fmax_mhz or perf_model.FMAX_MHZ)
+    conv_cycles = report["layers"][0]["cycles"]
+    return conv_cycles / (report["fmax_mhz"] * 1e6), report["latency_cycles"] / (report["fmax_mhz"] * 1e6)
+
+# --- BACKENDS ---
+class DevMemBackend:
+    """
+    The real board: /dev/mem mapped at HW_REGS_BASE (run as root on the
+    HPS). done_bit is None while the bitstream exports no done flag.
+    """
+    name = "devmem"
+
+    def __init__(self, base=regs.HW_REGS_BASE, span=regs.HW_REGS_SPAN, device="/dev/mem",
+                 done_bit=regs.BOARD_DONE_BIT):
+        self.done_bit = done_bit
+        self.fd = os.open(device, os.O_RDWR | os.O_SYNC)
+        try:
+            self.mm = mmap.mmap(self.fd, span, mmap.MAP_SHARED,
+                                mmap.PROT_READ | mmap.PROT_WRITE, offset=base)
+        except Exception:
+            os.close(self.fd)
+            raise
+        self.window = regs.RegisterWindow(self.mm)
+
+    def close(self):
+        self.window.release()
+        self.mm.close()
+        os.close(self.fd)
+
+def _emulate(path, span, weights_dir, shifts, total_s, done_bit, ready, stop, poll_s):
+    """
+    Device process of FileBackend. Follows fpga_top_layer1's handshake: a
+    rising edge on led_dummy[0] starts an image, the prediction appears on
+    the dipsw word once OUT has finished, and a new start needs the trigger
+    to have gone low again (S_BRIDGE_FINISH). The image is latched when the
+    edge is seen: the host's clock is not visible here, so a snapshot at
+    the emulated conv end would blame the host for this process's polling
+    lag. Early overwrites are the RTL testbench's job, not this stand-in's.
+    """
+    import golden_model
+    weights = golden_model.load_weights(weights_dir)
+    golden_model.predict(np.zeros(regs.TOTAL_PIXELS, np.uint8), weights, shifts)   # warm up before the first edge
+    with open(path, 'r+b') as f:
+        mm = mmap.mmap(f.fileno(), span)
+    window = regs.RegisterWindow(mm)
+    done = 1 << done_bit
+    armed = True
+    ready.set()
+    while not stop.is_set():
+        trigger = int(window.led[0]) & 1
+        if not trigger:
+            armed = True
+        if not (trigger and armed):
+            time.sleep(poll_s)
+            continue
+        armed = False
+        t0 = time.perf_counter()
+        pixels = window.ram.copy().view(np.uint8)
+        window.sw[0] = int(window.sw[0]) & ~done
+        pred = int(golden_model.predict(pixels, weights, shifts)[0])
+        time.sleep(max(0.0, t0 + total_s - time.perf_counter()))
+        window.sw[0] = (pred & regs.RESULT_MASK) | done
+    window.release()
+    mm.close()
+
+class FileBackend:
+    """
+    Dev-box stand-in: a sparse file the size of the register span, mapped
+    the same way as /dev/mem, with a separate process playing the FPGA via
+    the integer reference model and the perf_model timing. The emulated
+    device always raises done_bit when a result is ready.
+    """
+    name = "file"
+
+    def __init__(self, path="fpga_regs.bin", weights_dir=".", shifts=None, done_bit=regs.DONE_BIT,
+                 timing=None, span=regs.HW_REGS_SPAN, poll_s=20e-6):
+        import calibrate
+        if done_bit is None:
+            raise ValueError("the file backend always emulates a done bit")
+        self.done_bit = done_bit
+        with open(path, 'a+b') as f:
+            f.truncate(span)
+        self.path = path
+        self.f = open(path, 'r+b')
+        self.mm = mmap.mmap(self.f.fileno(), span)
+        self.window = regs.RegisterWindow(self.mm)
+        self.window.led[0] = 0
+        self.window.sw[0] = 0
+
+        total_s = (timing or modeled_timing())[1]
+        ctx = mp.get_context("spawn")
+        ready, self.stop = ctx.Event(), ctx.Event()
+        self.device = ctx.Process(
+            target=_emulate, daemon=True,
+            args=(path, span, weights_dir, shifts or calibrate.load_shifts(weights_dir),
+                  total_s, done_bit, ready, self.stop, poll_s))
+        self.device.start()
+        if not ready.wait(timeout=60):
+            self.close()
+            raise TimeoutError("file-backed device did not start")
+
+    def close(self):
+        self.stop.set()
+        self.device.join(timeout=5)
+        if self.device.is_alive():
+            self.device.terminate()
+        self.window.release()
+        self.mm.close()
+        self.f.close()
+
+BACKENDS = {"devmem": DevMemBackend, "file": FileBackend}
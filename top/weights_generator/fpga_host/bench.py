@@ -0,0 +1,64 @@
+import sys
+import argparse
+import numpy as np
+from . import regs
+from .backends import BACKENDS
+from .runtime import FpgaRuntime, TIMEOUT_S
+
+# --- CONFIGURATION ---
+BENCH_IMAGES = 200
+
+def latency_stats(lat):
+    lat = np.asarray(lat) * 1e3
+    return {"mean_ms": float(lat.mean()), "p50_ms": float(np.percentile(lat, 50)),
+            "p95_ms": float(np.percentile(lat, 95)), "p99_ms": float(np.percentile(lat, 99)),
+            "max_ms": float(lat.max())}
+
+def main(argv=None):
+    import time
+    import golden_model
+    import calibrate
+    import hw_eval
+    parser = argparse.ArgumentParser(description="Benchmark the host inference path (board or file-backed stand-in)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="file")
+    parser.add_argument("--count", type=int, default=BENCH_IMAGES, help="MNIST test images to run")
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--data", default=hw_eval.DATA_ROOT)
+    parser.add_argument("--done-bit", type=int, default=None,
+                        help=f"dipsw bit carrying out_done_latched (default: the backend's, {regs.DONE_BIT} for file)")
+    parser.add_argument("--timed-wait", action="store_true",
+                        help="devmem without a done bit: wait the modeled latency instead of polling")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_S)
+    parser.add_argument("--regs-file", default="fpga_regs.bin", help="file backend: register image file")
+    args = parser.parse_args(argv)
+
+    images, labels = hw_eval.load_mnist(args.data, count=args.count)
+    if args.backend == "file":
+        backend = BACKENDS["file"](args.regs_file, args.weights,
+                                   done_bit=regs.DONE_BIT if args.done_bit is None else args.done_bit)
+    else:
+        backend = BACKENDS["devmem"]()
+    try:
+        runtime = FpgaRuntime(backend, done_bit=args.done_bit, timeout=args.timeout, timed_wait=args.timed_wait)
+        t0 = time.perf_counter()
+        preds, lat = runtime.run_batch(images)
+        elapsed = time.perf_counter() - t0
+    finally:
+        backend.close()
+
+    golden = golden_model.predict(images, golden_model.load_weights(args.weights),
+                                  calibrate.load_shifts(args.weights))
+    stats = latency_stats(lat)
+    wait = f"done bit {runtime.done_bit}" if runtime.done_bit is not None else "modeled latency wait"
+    print(f"Backend:           {backend.name} ({wait})")
+    print(f"Images:            {len(preds)}")
+    print(f"Throughput:        {len(preds) / elapsed:.1f} images/s")
+    print(f"Latency (ms):      mean {stats['mean_ms']:.3f}  p50 {stats['p50_ms']:.3f}  "
+          f"p95 {stats['p95_ms']:.3f}  p99 {stats['p99_ms']:.3f}  max {stats['max_ms']:.3f}")
+    print(f"Accuracy:          {100 * (preds == labels).mean():.2f}%")
+    mismatch = int((preds != golden).sum())
+    print(f"Golden mismatches: {mismatch}")
+    return 1 if mismatch else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import numpy as np
+
+# --- CONFIGURATION ---
+# Lightweight HPS-to-FPGA bridge window, same values as c/camera.cpp
+HW_REGS_BASE = 0xFF200000
+HW_REGS_SPAN = 0x00200000
+RAM_OFFSET = 0x00040000   # image RAM, 4 pixels per 32-bit word, little endian
+SW_OFFSET = 0x00004000    # dipsw_pio: w_nn_result[3:0] (board switches SW[2:0] must be 000)
+LED_OFFSET = 0x00003000   # led_pio: bit 0 is led_dummy[0], the start trigger
+
+TOTAL_PIXELS = 1024
+IMAGE_WORDS = TOTAL_PIXELS // 4
+RESULT_MASK = 0x0F
+
+# dipsw bit carrying out_done_latched (cleared by start, set when OUT
+# finishes; fpga_top_layer1 drives it on led[7]). FileBackend always raises
+# it. The board's dipsw PIO only carries the 4-bit prediction today, so
+# DevMemBackend has no done bit until the signal is wired into the PIO: set
+# BOARD_DONE_BIT to DONE_BIT then.
+DONE_BIT = 7
+BOARD_DONE_BIT = None
+
+class RegisterWindow:
+    """
+    Zero-copy NumPy views over a mapped register window (mmap or any
+    writable buffer laid out like HW_REGS_BASE .. + HW_REGS_SPAN).
+    All accesses are 32-bit words, as on the Avalon side of the bridge.
+    """
+    def __init__(self, buf):
+        self.buf = buf
+        self.ram = np.frombuffer(buf, dtype="<u4", count=IMAGE_WORDS, offset=RAM_OFFSET)
+        self.sw = np.frombuffer(buf, dtype="<u4", count=1, offset=SW_OFFSET)
+        self.led = np.frombuffer(buf, dtype="<u4", count=1, offset=LED_OFFSET)
+
+    def release(self):
+        # The views pin the mmap; drop them before it is closed
+        self.ram = self.sw = self.led = None
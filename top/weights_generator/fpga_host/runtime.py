@@ -0,0 +1,118 @@
+import time
+import numpy as np
+from . import regs
+from .backends import modeled_timing
+
+# --- CONFIGURATION ---
+TIMEOUT_S = 0.05        # per image, far above the ~1.6 ms the RTL needs at 50 MHz
+SETTLE_MARGIN = 1.25    # wait this x the modeled conv time / latency before trusting the device
+POLL_S = 50e-6          # sleep between polls; 0 = spin (only with a core to spare)
+
+# --- PACKING ---
+def camera_pixels(images):
+    """8-bit camera / PNG pixels -> FPGA range, the '/ 2' of camera.cpp and feeder_file.c."""
+    return np.asarray(images, dtype=np.uint8) // 2
+
+def pack_images(images):
+    """
+    (N, 32, 32) FPGA pixels (0..127) -> (N, 256) little-endian words, four
+    pixels per word with pixel 4k in bits 7:0 exactly like the C packers.
+    One vectorized pass for the whole batch, no per-pixel shifting.
+    """
+    pixels = np.clip(np.asarray(images), 0, 127).astype(np.uint8)
+    return np.ascontiguousarray(pixels.reshape(-1, regs.TOTAL_PIXELS)).view("<u4")
+
+# --- RUNTIME ---
+class FpgaRuntime:
+    """
+    Drives fpga_top_layer1 through a backend's register window.
+    The image RAM is re-read by all 16 C2 passes, so it is only free once the
+    conv block is done; the next image is uploaded then, while C5/F6/OUT of
+    the current one still run (double buffering: host staging buffer ->
+    device RAM). Completion is polled on the backend's done bit (done_bit
+    overrides it). Waiting out the modeled latency plus margin instead is
+    only an explicit fallback (timed_wait=True) for a board that exports no
+    done flag yet.
+    """
+    def __init__(self, backend, done_bit=None, timeout=TIMEOUT_S,
+                 timing=None, settle_margin=SETTLE_MARGIN, poll_s=POLL_S, timed_wait=False):
+        self.backend = backend
+        self.window = backend.window
+        self.done_bit = done_bit if done_bit is not None else backend.done_bit
+        if self.done_bit is None and not timed_wait:
+            raise ValueError(f"the {backend.name} backend exports no done bit: pass done_bit, "
+                             "or timed_wait=True to wait out the modeled latency")
+        self.timeout = timeout
+        conv_s, total_s = timing or modeled_timing()
+        self.conv_s = conv_s * settle_margin
+        self.settle_s = total_s * settle_margin
+        self.poll_s = poll_s
+
+    # --- register level ---
+    def upload(self, words):
+        """Copies one packed image (256 words) into the image RAM."""
+        self.window.ram[:] = words
+
+    def trigger(self, level):
+        self.window.led[0] = 1 if level else 0
+
+    def read_result(self):
+        return int(self.window.sw[0]) & regs.RESULT_MASK
+
+    def _sleep_until(self, deadline):
+        while True:
+            left = deadline - time.perf_counter()
+            if left <= 0:
+                return
+            if self.poll_s:
+                time.sleep(min(left, self.poll_s))
+            else:
+                time.sleep(0)
+
+    def wait_done(self, t_start):
+        """
+        Blocks until the image started at t_start has a result. The done bit
+        is only trusted after the conv block time: it is still set from the
+        previous image until the controller's internal start pulse clears it.
+        """
+        if self.done_bit is None:
+            self._sleep_until(t_start + self.settle_s)
+            return
+        self._sleep_until(t_start + self.conv_s)
+        mask = 1 << self.done_bit
+        deadline = t_start + self.timeout
+        while not int(self.window.sw[0]) & mask:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"no done bit after {1e3 * self.timeout:.1f} ms")
+            time.sleep(self.poll_s)
+
+    # --- inference ---
+    def infer(self, image):
+        """One image (FPGA pixels) -> predicted digit."""
+        return int(self.run_batch(np.asarray(image).reshape(1, -1))[0][0])
+
+    def run_batch(self, images):
+        """
+        Runs a batch back to back. Returns (predictions, latencies_s), the
+        latency of each image measured from its trigger to its result.
+        """
+        words = pack_images(images)
+        n = len(words)
+        preds = np.zeros(n, dtype=np.int64)
+        lat = np.zeros(n)
+        if n == 0:
+            return preds, lat
+        self.upload(words[0])
+        for k in range(n):
+            t0 = time.perf_counter()
+            self.trigger(1)
+            # Conv block done -> image RAM free: release the trigger so the
+            # controller can leave S_BRIDGE_FINISH, and stage the next image
+            self._sleep_until(t0 + self.conv_s)
+            self.trigger(0)
+            if k + 1 < n:
+                self.upload(words[k + 1])
+            self.wait_done(t0)
+            preds[k] = self.read_result()
+            lat[k] = time.perf_counter() - t0
+        return preds, lat
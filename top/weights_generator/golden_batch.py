@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import golden_model
+import hw_eval
+import calibrate
+import memfmt
+import layer_cache
+import tracing
+
+# --- CONFIGURATION ---
+OUT_DIR = "golden_vectors"
+SHARD_SIZE = 250
+# Every tensor written per image, in pipeline order
+GOLDEN_LAYERS = ("c1", "s2", "c2", "s4", "c5", "f6", "out")
+
+def shard_marker(out_dir, shard_id):
+    return os.path.join(out_dir, "shards", f"shard_{shard_id:04d}.json")
+
+def config_hash(weights, shifts, first_index, shard_size, images, labels):
+    """Everything a shard's vectors depend on; a marker written under another config is stale."""
+    h = hashlib.sha256()
+    # The inputs themselves: another --data root or a rebuilt cache gives other vectors
+    h.update(np.ascontiguousarray(images).tobytes())
+    h.update(np.ascontiguousarray(labels).tobytes())
+    for layer in golden_model.LAYERS:
+        h.update(layer.encode() + b"\0" + golden_model.to_int32(weights[layer]).tobytes())
+    h.update(json.dumps({"shifts": {l: int(v) for l, v in sorted(shifts.items())}, "first_index": first_index,
+                         "shard_size": shard_size, "count": len(images), "layers": GOLDEN_LAYERS,
+                         "drop_last": golden_model.FC_DROP_LAST_PRODUCT}, sort_keys=True).encode())
+    return h.hexdigest()
+
+def read_marker(out_dir, shard_id, config):
+    """The shard's entries when its marker exists and was written under `config`, else None."""
+    try:
+        with open(shard_marker(out_dir, shard_id)) as f:
+            marker = json.load(f)
+    except FileNotFoundError:
+        return None
+    if not isinstance(marker, dict) or marker.get("config") != config:
+        return None
+    return marker["entries"]
+
+# --- WORKER ---
+def run_shard(shard_id, ids, images, labels, weights_dir, shifts, out_dir, width, first_index, config,
+              cache_dir=None):
+    """
+    Computes and writes one shard, then drops a marker so reruns skip it.
+    With cache_dir, layers whose inputs, weights and shift are unchanged
+    come from the layer_cache instead of being recomputed.
+    """
+    with tracing.span("shard", items=len(ids), shard=shard_id):
+        with tracing.span("load_weights"):
+            weights = golden_model.load_weights(weights_dir)
+        if cache_dir:
+            layers = layer_cache.run_lenet(images, weights, shifts, layer_cache.LayerCache(cache_dir))
+        else:
+            layers = golden_model.run_lenet(images, weights, shifts)
+
+        # One vectorized encode per tensor for the whole shard
+        names = [f"{vec_id:0{width}d}" for vec_id in ids]
+        with tracing.span("write_hex", items=len(ids) * (len(GOLDEN_LAYERS) + 1)):
+            memfmt.write_hex_batch([os.path.join(out_dir, f"image_{n}.hex") for n in names], images)
+            for layer in GOLDEN_LAYERS:
+                memfmt.write_hex_batch([os.path.join(out_dir, f"golden_{layer}_{n}.hex") for n in names],
+                                       layers[layer])
+
+    entries = [{"id": int(vec_id), "index": first_index + int(vec_id), "label": int(labels[k]), "pred": int(layers["pred"][k])}
+               for k, vec_id in enumerate(ids)]
+
+    # Write the marker last and atomically: it is the resume checkpoint
+    marker = shard_marker(out_dir, shard_id)
+    with open(marker + ".tmp", 'w') as f:
+        json.dump({"config": config, "entries": entries}, f)
+    os.replace(marker + ".tmp", marker)
+    # Pool workers never run atexit: hand this shard's spans to the parent now
+    tracing.flush()
+    return shard_id, len(entries)
+
+# --- DRIVER ---
+@tracing.traced("golden_batch.generate")
+def generate(images, labels, out_dir=OUT_DIR, weights_dir=".", shifts=None,
+             workers=None, shard_size=SHARD_SIZE, first_index=0, cache_dir=None):
+    """
+    Shards the images in order across a process pool. Vector N is always image
+    N of the input, whatever the worker count, and shards whose marker was
+    written under the same config (input images and labels, weights,
+    shifts, first_index, shard_size, count) are skipped, so an interrupted
+    run resumes where it stopped. Shards from a run with another config
+    are regenerated.
+    """
+    shifts = dict(golden_model.RTL_SHIFTS, **(shifts or {}))
+    config = config_hash(golden_model.load_weights(weights_dir), shifts, first_index, shard_size,
+                         images, labels)
+    os.makedirs(os.path.join(out_dir, "shards"), exist_ok=True)
+    count = len(images)
+    width = max(4, len(str(count - 1)))
+    shards = [(i // shard_size, range(i, min(i + shard_size, count)))
+              for i in range(0, count, shard_size)]
+    pending = [(sid, ids) for sid, ids in shards if read_marker(out_dir, sid, config) is None]
+    stale = sum(os.path.exists(shard_marker(out_dir, sid)) for sid, _ in pending)
+    print(f"{count} vectors in {len(shards)} shards, {len(shards) - len(pending)} already done"
+          + (f", {stale} from a different config regenerated." if stale else "."))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_shard, sid, list(ids), images[ids.start:ids.stop],
+                               labels[ids.start:ids.stop], weights_dir, shifts, out_dir, width,
+                               first_index, config, cache_dir)
+                   for sid, ids in pending]
+        for done, fut in enumerate(as_completed(futures), 1):
+            sid, n = fut.result()
+            print(f"  shard {sid:4d} ({n} vectors) done [{done}/{len(pending)}]")
+
+    entries = []
+    for sid, _ in shards:
+        entries.extend(read_marker(out_dir, sid, config))
+
+    manifest = {
+        "config": config,
+        "count": count,
+        "first_index": first_index,
+        "shard_size": shard_size,
+        "shifts": shifts,
+        "name_width": width,
+        "files": {"image": "image_{id}.hex", **{l: f"golden_{l}_{{id}}.hex" for l in GOLDEN_LAYERS}},
+        "entries": entries,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    correct = sum(e["label"] == e["pred"] for e in entries)
+    print(f"Wrote {out_dir}/manifest.json ({correct}/{count} predicted correctly).")
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded golden-vector generation over the MNIST test set")
+    parser.add_argument("--count", type=int, default=10000, help="number of test images (from index --start)")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--data", default=hw_eval.DATA_ROOT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--cache", default=None, metavar="DIR",
+                        help=f"memoize layer outputs on disk (e.g. {layer_cache.CACHE_DIR})")
+    args = parser.parse_args(argv)
+
+    with tracing.span("load_test_set"):
+        images, labels = hw_eval.load_test_set(args.data)
+    sel = slice(args.start, args.start + args.count)
+    generate(np.ascontiguousarray(images[sel]), labels[sel], args.out, args.weights,
+             calibrate.load_shifts(args.weights), workers=args.workers,
+             shard_size=args.shard_size, first_index=args.start, cache_dir=args.cache)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import os
+import re
+import sys
+import json
+import argparse
+import numpy as np
+import golden_model
+import calibrate
+import memfmt
+
+# --- CONFIGURATION ---
+DUMP_PATTERN = "sim_{layer}_{id}.hex"     # one simulator dump per stage per image
+IMAGE_PATTERN = "image_{id}.hex"           # golden_batch.py input vectors
+MAX_EXAMPLES = 5
+STREAM_SLIPS = (1, 2, 3, 4)                # valid-strobe misalignments to test
+
+# Stages in pipeline order. Accumulators are the 32-bit conv_engine /
+# fc_streaming sums before the shift; the rest are 8-bit streams. Every
+# tensor is flattened channel-major, the order golden_batch.py writes.
+DIFF_LAYERS = ("c1_acc", "c1", "s2", "c2_acc", "c2", "s4",
+               "c5_acc", "c5", "f6_acc", "f6", "out_acc", "out")
+LAYER_SHAPES = {
+    "c1": (6, 28, 28), "s2": (6, 14, 14), "c2": (16, 10, 10), "s4": (16, 5, 5),
+    "c5": (120,), "f6": (84,), "out": (10,),
+}
+FC_INPUTS = {"c5": "s4", "f6": "c5", "out": "f6"}
+MISSING = np.iinfo(np.int64).min           # placeholder for words a dump doesn't have
+
+def layer_shape(layer):
+    return LAYER_SHAPES[layer.replace("_acc", "")]
+
+def layer_width(layer):
+    return 32 if layer.endswith("_acc") else 8
+
+# --- LOADING ---
+def find_ids(vectors_dir, pattern=IMAGE_PATTERN):
+    """Vector ids (the {id} strings) of every input image in vectors_dir, sorted."""
+    regex = re.compile(re.escape(pattern).replace(re.escape("{id}"), r"(\d+)") + "$")
+    ids = [m.group(1) for m in map(regex.match, os.listdir(vectors_dir)) if m]
+    return sorted(ids, key=int)
+
+def load_stage(dump_dir, layer, ids, pattern=DUMP_PATTERN):
+    """
+    (N, size) int64 array of one stage's dumps, or None when no image has it.
+    Missing words (a dump cut short, or no file for that image) are left at
+    MISSING so they always count as a divergence.
+    """
+    size = int(np.prod(layer_shape(layer)))
+    got = np.full((len(ids), size), MISSING, dtype=np.int64)
+    found = False
+    for k, vec_id in enumerate(ids):
+        path = os.path.join(dump_dir, pattern.format(layer=layer, id=vec_id))
+        if not os.path.exists(path):
+            continue
+        found = True
+        words = memfmt.read_hex(path, layer_width(layer), signed=True)[:size]
+        got[k, :len(words)] = words
+    return got if found else None
+
+# --- SYSTEMATIC ERROR MODELS ---
+def _wrap8(x):
+    return ((np.asarray(x, dtype=np.int64) + 128) & 0xFF) - 128
+
+def _slips(ref):
+    """The stream arriving k words late / early (dropped or extra valid strobes)."""
+    out = {}
+    for k in STREAM_SLIPS:
+        late = np.full_like(ref, MISSING)
+        late[:, k:] = ref[:, :-k]
+        early = np.full_like(ref, MISSING)
+        early[:, :-k] = ref[:, k:]
+        out[f"stream {k} word(s) late"] = late
+        out[f"stream {k} word(s) early"] = early
+    return out
+
+def _orders(layer, ref):
+    shape = layer_shape(layer)
+    if len(shape) != 3:
+        return {}
+    t = ref.reshape((len(ref),) + shape)
+    return {
+        "pixel-major (HWC) flatten order": t.transpose(0, 2, 3, 1).reshape(len(ref), -1),
+        "rows and columns transposed": t.transpose(0, 1, 3, 2).reshape(len(ref), -1),
+    }
+
+def candidates(layer, ref, weights, shifts):
+    """
+    Tensors the stage would produce under each known RTL / export mistake,
+    computed from the reference inputs (valid because every earlier stage
+    matched for the images being classified).
+    """
+    base = layer.replace("_acc", "")
+    cands = {}
+    if base in FC_INPUTS:
+        x, w = ref[FC_INPUTS[base]].reshape(len(ref[layer]), -1), weights[base]
+        other_acc = golden_model.fc_acc(x, w, drop_last=not golden_model.FC_DROP_LAST_PRODUCT)
+        what = "keeps" if golden_model.FC_DROP_LAST_PRODUCT else "drops"
+        if layer.endswith("_acc"):
+            cands[f"accumulator {what} the last product"] = other_acc
+        else:
+            cands[f"accumulator {what} the last product"] = golden_model.requantize(
+                other_acc, shifts[base], relu=base != "out")
+
+    if layer in ("c1", "c2", "c5", "f6", "out"):
+        acc = ref[layer + "_acc"].astype(np.int64)
+        relu, shift = layer != "out", shifts[layer]
+        for k in range(calibrate.MAX_SHIFT + 1):
+            if k != shift:
+                cands[f"shift {k} instead of {shift}"] = golden_model.requantize(acc, k, relu)
+        scaled = acc >> shift
+        if relu:
+            cands["missing ReLU"] = np.clip(scaled, -128, 127)
+            cands["missing saturation (8-bit wrap)"] = np.where(scaled < 0, 0, _wrap8(scaled))
+            cands["ReLU without saturation, then wrap"] = _wrap8(np.maximum(scaled, 0))
+        else:
+            cands["unexpected ReLU on the output layer"] = np.clip(scaled, 0, 127)
+            cands["missing saturation (8-bit wrap)"] = _wrap8(scaled)
+    if layer.endswith("_acc"):
+        cands["accumulator truncated to 16 bits"] = ((ref[layer].astype(np.int64) + (1 << 15)) & 0xFFFF) - (1 << 15)
+    cands.update(_orders(layer, ref[layer]))
+    cands.update(_slips(ref[layer]))
+    return {name: np.asarray(c, dtype=np.int64).reshape(len(ref[layer]), -1) for name, c in cands.items()}
+
+# --- DIFF ---
+def locate(layer, flat_index):
+    """Flat channel-major index -> readable position."""
+    shape = layer_shape(layer)
+    if len(shape) != 3:
+        return f"neuron {flat_index}"
+    ch, r, c = np.unravel_index(flat_index, shape)
+    prefix = f"s4_ram[{flat_index}] = " if layer == "s4" else ""
+    return f"{prefix}ch {ch} (row {r}, col {c})"
+
+def diff(images, dumps, weights, shifts=None, ids=None):
+    """
+    Compares simulator dumps against the integer reference engine.
+    dumps: {layer: (N, size) array or None}. Returns a report dict.
+    """
+    shifts = dict(golden_model.RTL_SHIFTS, **(shifts or {}))
+    ref = golden_model.run_lenet(images, weights, shifts, keep_acc=True)
+    ref = {k: v.reshape(len(v), -1).astype(np.int64) for k, v in ref.items() if k != "pred"}
+    n = len(images)
+    ids = list(ids) if ids is not None else [str(i) for i in range(n)]
+    present = [l for l in DIFF_LAYERS if dumps.get(l) is not None]
+
+    per_layer, mism = {}, {}
+    for layer in present:
+        bad = dumps[layer] != ref[layer]
+        mism[layer] = bad
+        per_layer[layer] = {"words": int(bad.sum()), "images": int(bad.any(axis=1).sum()),
+                            "missing": int((dumps[layer] == MISSING).sum())}
+
+    # First diverging stage per image; later stages are mostly fallout
+    first = np.full(n, -1)
+    for i, layer in reversed(list(enumerate(present))):
+        first[mism[layer].any(axis=1)] = i
+
+    causes, examples = {}, []
+    for i, layer in enumerate(present):
+        sel = np.flatnonzero(first == i)
+        if len(sel) == 0:
+            continue
+        got = dumps[layer][sel]
+        sub_ref = {k: v[sel] for k, v in ref.items()}
+        layer_causes = []
+        # A dump cut short (or absent) that matches as far as it goes
+        truncated = np.all((got == sub_ref[layer]) | (got == MISSING), axis=1)
+        if truncated.any():
+            layer_causes.append({"cause": "dump missing or cut short", "images": int(truncated.sum())})
+        unexplained = ~truncated
+        for name, cand in candidates(layer, sub_ref, weights, shifts).items():
+            valid = cand != MISSING
+            hit = np.all((got == cand) | ~valid, axis=1) & unexplained
+            if hit.any():
+                layer_causes.append({"cause": name, "images": int(hit.sum())})
+                unexplained &= ~hit
+        if unexplained.any():
+            layer_causes.append({"cause": "unexplained", "images": int(unexplained.sum())})
+        causes[layer] = {"images": int(len(sel)), "causes": layer_causes}
+
+        for k in sel[:MAX_EXAMPLES]:
+            j = int(np.argmax(mism[layer][k]))
+            exp, g = int(ref[layer][k, j]), int(dumps[layer][k, j])
+            examples.append({
+                "id": ids[k], "layer": layer, "index": j, "where": locate(layer, j),
+                "expected": exp, "got": None if g == MISSING else g,
+                "magnitude": None if g == MISSING else abs(g - exp),
+                "words_differing": int(mism[layer][k].sum()),
+            })
+
+    return {
+        "total": n,
+        "layers": present,
+        "matching": int((first == -1).sum()),
+        "per_layer": per_layer,
+        "first_divergence": causes,
+        "examples": examples,
+        "first_layer": {ids[k]: present[first[k]] for k in np.flatnonzero(first >= 0)},
+    }
+
+def print_report(report):
+    print(f"Images compared:  {report['total']}")
+    print(f"Stages dumped:    {', '.join(report['layers']) or 'none'}")
+    print(f"Matching images:  {report['matching']}")
+    if not report["layers"]:
+        return
+    print(f"\n{'Stage':<9}{'Bad words':>11}{'Images':>9}{'Missing':>9}")
+    for layer in report["layers"]:
+        s = report["per_layer"][layer]
+        print(f"{layer:<9}{s['words']:>11}{s['images']:>9}{s['missing']:>9}")
+
+    if report["first_divergence"]:
+        print("\nFirst diverging stage and likely cause:")
+        for layer, info in report["first_divergence"].items():
+            print(f"  {layer}: {info['images']} image(s)")
+            for c in info["causes"]:
+                print(f"      {c['images']:>6} x {c['cause']}")
+        print("\nExamples:")
+        for e in report["examples"]:
+            got = "missing" if e["got"] is None else f"{e['got']} (|diff| {e['magnitude']})"
+            print(f"  image {e['id']}: {e['layer']} {e['where']}: expected {e['expected']}, got {got}"
+                  f"; {e['words_differing']} word(s) differ")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff RTL simulation dumps against the integer golden model, stage by stage")
+    parser.add_argument("dumps", help="directory with the simulator dumps")
+    parser.add_argument("--vectors", help="directory with the input image_{id}.hex files (default: the dump directory)")
+    parser.add_argument("--pattern", default=DUMP_PATTERN, help="dump file name pattern, with {layer} and {id}")
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--count", type=int, help="only the first COUNT vectors")
+    parser.add_argument("--json", help="also write the full report (per-image first divergence) here")
+    args = parser.parse_args(argv)
+
+    vectors = args.vectors or args.dumps
+    ids = find_ids(vectors)[:args.count]
+    if not ids:
+        print(f"No {IMAGE_PATTERN} files in {vectors}")
+        return 1
+    images = np.stack([memfmt.read_hex(os.path.join(vectors, IMAGE_PATTERN.format(id=i)))
+                       for i in ids])
+    dumps = {layer: load_stage(args.dumps, layer, ids, args.pattern) for layer in DIFF_LAYERS}
+    report = diff(images, dumps, golden_model.load_weights(args.weights),
+                  calibrate.load_shifts(args.weights), ids)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json}")
+    return 0 if report["matching"] == report["total"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
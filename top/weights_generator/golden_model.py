@@ -0,0 +1,171 @@
+import os
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import weight_bundle
+import tracing
+
+# --- CONFIGURATION ---
+# Per-layer OUTPUT_SHIFT / SHIFT values, as instantiated in the RTL:
+#   C1 -> lenet_top.sv, C2 -> lenet_top2.sv, C5/F6/OUT -> fpga_top_layer1.sv
+RTL_SHIFTS = {"c1": 10, "c2": 10, "c5": 10, "f6": 7, "out": 7}
+
+LAYERS = ("c1", "c2", "c5", "f6", "out")
+WEIGHT_SHAPES = {
+    "c1": (6, 1, 5, 5),
+    "c2": (16, 6, 5, 5),
+    "c5": (120, 400),
+    "f6": (84, 120),
+    "out": (10, 84),
+}
+WEIGHT_FILES = {
+    "c1": [f"c1_weights/weights_c1_{i}.hex" for i in range(6)],
+    "c2": [f"c2_weights/weights_c2_{i}.hex" for i in range(16)],
+    "c5": ["fc_weights/c5_weights_flattened.hex"],
+    "f6": ["fc_weights/f6_weights_flattened.hex"],
+    "out": ["fc_weights/out_weights_flattened.hex"],
+}
+
+# fc_streaming.sv clears the accumulator on the same clock it would add the
+# last product of a neuron, so every neuron only sums its first NUM_INPUTS-1
+# products. Keep this True as long as the RTL behaves that way.
+FC_DROP_LAST_PRODUCT = True
+
+# Signed width of the activations between layers (logic signed [7:0])
+ACT_BITS = 8
+
+MAPSIZE = 32
+BATCH_SIZE = 1000  # images per chunk, bounds peak memory on the 10k test set
+
+
+# --- WEIGHT LOADING ---
+def load_hex(filename):
+    """Loads a one-value-per-line .hex file as signed 8-bit integers."""
+    with open(filename, 'r') as f:
+        vals = [int(tok, 16) for tok in f.read().split()]
+    return np.array(vals, dtype=np.uint8).view(np.int8)
+
+
+def load_weights(root=".", prefer_bundle=True):
+    """
+    Loads every layer's weights as int8 arrays shaped like WEIGHT_SHAPES.
+    Memory-maps the binary bundle when it is up to date with the .hex files,
+    otherwise parses the .hex files.
+    """
+    if prefer_bundle and weight_bundle.is_current(root):
+        tensors, _ = weight_bundle.load_bundle(os.path.join(root, weight_bundle.BUNDLE_FILE))
+        return {layer: tensors[layer].reshape(WEIGHT_SHAPES[layer]) for layer in LAYERS}
+
+    weights = {}
+    for layer in LAYERS:
+        parts = [load_hex(os.path.join(root, name)) for name in WEIGHT_FILES[layer]]
+        weights[layer] = np.concatenate(parts).reshape(WEIGHT_SHAPES[layer])
+    return weights
+
+
+# --- DATAPATH PRIMITIVES ---
+def to_int32(acc):
+    """Wraps an accumulator to the 32-bit signed register the RTL uses."""
+    return np.asarray(acc, dtype=np.int64).astype(np.int32)
+
+
+def conv_acc(x, w):
+    """
+    Valid 5x5 convolution summed over input channels (conv_engine + channel_sum).
+    x: (N, Cin, H, W) int, w: (Cout, Cin, 5, 5) int -> (N, Cout, H-4, W-4) int32.
+    Runs as a float64 GEMM: every partial sum is an integer far below 2^53,
+    so the result is exact.
+    """
+    n, cin, h, wd = x.shape
+    cout = w.shape[0]
+    win = sliding_window_view(x.astype(np.float64), (5, 5), axis=(2, 3))
+    # (N, Cin, Ho, Wo, 5, 5) -> (N, Ho, Wo, Cin*25)
+    win = win.transpose(0, 2, 3, 1, 4, 5).reshape(n, h - 4, wd - 4, cin * 25)
+    acc = win @ w.reshape(cout, cin * 25).T.astype(np.float64)
+    return to_int32(acc.transpose(0, 3, 1, 2))
+
+
+def fc_acc(x, w, drop_last=FC_DROP_LAST_PRODUCT):
+    """
+    fc_streaming dot products. x: (N, NUM_INPUTS), w: (NUM_OUTPUTS, NUM_INPUTS).
+    """
+    x = x.astype(np.float64)
+    w = w.astype(np.float64)
+    if drop_last:
+        x = x[:, :-1]
+        w = w[:, :-1]
+    return to_int32(x @ w.T)
+
+
+def act_range(bits=ACT_BITS, relu=True):
+    """Saturation bounds of a signed `bits`-wide activation, ReLU clamping the bottom at 0."""
+    hi = (1 << (bits - 1)) - 1
+    return (0 if relu else -hi - 1), hi
+
+
+def requantize(acc, shift, relu=True, bits=ACT_BITS):
+    """
+    acc >>> SHIFT, then ReLU + saturate to [0, 127] or saturate to [-128, 127]
+    (the ranges of a `bits`-wide activation for narrower datapaths).
+    """
+    lo, hi = act_range(bits, relu)
+    return np.clip(acc >> shift, lo, hi).astype(np.int8)
+
+
+def maxpool2x2(x):
+    """2x2 stride-2 max pool over the last two axes (maxpool_engine)."""
+    n, c, h, w = x.shape
+    return x.reshape(n, c, h // 2, 2, w // 2, 2).max(axis=(3, 5))
+
+
+# --- FULL NETWORK ---
+def as_images(images):
+    """Accepts a flat 1024 vector, a 32x32 image or an (N, 32, 32) batch."""
+    arr = np.asarray(images)
+    if arr.ndim == 1 or arr.ndim == 2 and arr.shape != (MAPSIZE, MAPSIZE):
+        arr = arr.reshape(-1, MAPSIZE, MAPSIZE)
+    elif arr.ndim == 2:
+        arr = arr[None]
+    # The pixel bus is signed 8-bit; wrap exactly like the hardware would
+    return arr.astype(np.int64).astype(np.int8)
+
+
+def run_layers(images, weights, shifts=None, keep_acc=False, act_bits=None):
+    """
+    Runs one batch C1 -> S2 -> C2 -> S4 -> C5 -> F6 -> OUT and returns every
+    intermediate tensor. Conv outputs are post shift/ReLU/saturation (the
+    stream entering maxpool_engine); S4 is flattened channel-major like s4_ram.
+    keep_acc adds the raw 32-bit accumulators as "<layer>_acc". act_bits
+    ({layer: bits}) narrows a layer's output below ACT_BITS.
+    """
+    shifts = dict(RTL_SHIFTS, **(shifts or {}))
+    bits = dict(dict.fromkeys(LAYERS, ACT_BITS), **(act_bits or {}))
+    x = as_images(images)[:, None]
+    out = {}
+
+    def layer(name, acc, relu=True):
+        if keep_acc:
+            out[name + "_acc"] = acc
+        out[name] = requantize(acc, shifts[name], relu, bits[name])
+        return out[name]
+
+    out["s2"] = maxpool2x2(layer("c1", conv_acc(x, weights["c1"])))
+    out["s4"] = maxpool2x2(layer("c2", conv_acc(out["s2"], weights["c2"]))).reshape(len(x), -1)
+    layer("c5", fc_acc(out["s4"], weights["c5"]))
+    layer("f6", fc_acc(out["c5"], weights["f6"]))
+    layer("out", fc_acc(out["f6"], weights["out"]), relu=False)
+    # output_max keeps the first index on ties, same as argmax
+    out["pred"] = out["out"].argmax(axis=1)
+    return out
+
+
+def run_lenet(images, weights, shifts=None, batch_size=BATCH_SIZE, keep_acc=False, act_bits=None):
+    """run_layers over an arbitrarily large batch, chunked to bound memory."""
+    x = as_images(images)
+    with tracing.span("golden_model.run_lenet", items=len(x)):
+        chunks = [run_layers(x[i:i + batch_size], weights, shifts, keep_acc, act_bits)
+                  for i in range(0, len(x), batch_size)]
+    return {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+
+
+def predict(images, weights, shifts=None, batch_size=BATCH_SIZE, act_bits=None):
+    return run_lenet(images, weights, shifts, batch_size, act_bits=act_bits)["pred"]
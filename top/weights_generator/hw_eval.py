@@ -0,0 +1,114 @@
+import sys
+import argparse
+import numpy as np
+import golden_model
+import calibrate
+import mnist_idx
+import dataset_cache
+import layer_cache
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --- CONFIGURATION ---
+MIN_HW_ACCURACY = 0.90   # Gate: exit non-zero below this hardware top-1
+DATA_ROOT = "./data"
+
+# --- DATA ---
+def load_mnist(root=DATA_ROOT, train=False, count=None):
+    """
+    Returns MNIST images as FPGA pixels (N, 32, 32) in [0, 127] plus their
+    labels. Reads the pre-resized dataset_cache split, which reproduces the
+    Resize -> ToTensor -> int(p * 127) path of mnist_mif.py / mnist_hex.py
+    bit for bit. torchvision is only imported to download missing files.
+    """
+    images, labels = dataset_cache.load(root, train)
+    return mnist_idx.to_fpga_pixels(images[:count]), labels[:count]
+
+def load_test_set(root=DATA_ROOT):
+    return load_mnist(root, train=False)
+
+# --- FLOAT REFERENCE ---
+def float_predict(images, weights, batch_size=golden_model.BATCH_SIZE):
+    """
+    Float forward pass of the same int8 weights (no shift/saturation).
+    ReLU and MaxPool are scale-invariant, so this is the PyTorch model with
+    quantized weights; comparing it to the integer model isolates the loss
+    caused by the activation datapath.
+    """
+    def conv(x, w):
+        n, cin, h, wd = x.shape
+        win = sliding_window_view(x, (5, 5), axis=(2, 3))
+        win = win.transpose(0, 2, 3, 1, 4, 5).reshape(n, h - 4, wd - 4, cin * 25)
+        return (win @ w.reshape(len(w), -1).T).transpose(0, 3, 1, 2)
+
+    w = {k: v.astype(np.float64) for k, v in weights.items()}
+    preds = []
+    for i in range(0, len(images), batch_size):
+        x = np.asarray(images[i:i + batch_size], dtype=np.float64).reshape(-1, 1, 32, 32)
+        x = golden_model.maxpool2x2(np.maximum(conv(x, w["c1"]), 0))
+        x = golden_model.maxpool2x2(np.maximum(conv(x, w["c2"]), 0))
+        x = np.maximum(x.reshape(len(x), -1) @ w["c5"].T, 0)
+        x = np.maximum(x @ w["f6"].T, 0)
+        preds.append((x @ w["out"].T).argmax(axis=1))
+    return np.concatenate(preds)
+
+# --- EVALUATION ---
+def evaluate(images, labels, weights, shifts=None, float_pred=None, cache=None):
+    """
+    Runs the whole batch through the bit-accurate integer pipeline.
+    float_pred: predictions of the float model on the same images; when
+    omitted the float forward pass of the int8 weights is used. cache (a
+    layer_cache.LayerCache) reuses every layer output whose inputs,
+    weights and shift are unchanged.
+    """
+    labels = np.asarray(labels)
+    if cache is not None:
+        hw_pred = layer_cache.predict(images, weights, shifts, cache)
+    else:
+        hw_pred = golden_model.predict(images, weights, shifts)
+    if float_pred is None:
+        float_pred = float_predict(images, weights)
+    float_pred = np.asarray(float_pred)
+    confusion = np.bincount(labels * 10 + hw_pred, minlength=100).reshape(10, 10)
+    return {
+        "total": len(labels),
+        "hw_accuracy": float((hw_pred == labels).mean()),
+        "float_accuracy": float((float_pred == labels).mean()),
+        "agreement": float((hw_pred == float_pred).mean()),
+        "confusion": confusion,
+        "hw_pred": hw_pred,
+    }
+
+def print_report(report):
+    print(f"Images:            {report['total']}")
+    print(f"Float Accuracy:    {100 * report['float_accuracy']:.2f}%")
+    print(f"Hardware Accuracy: {100 * report['hw_accuracy']:.2f}%")
+    print(f"Float/Int Agree:   {100 * report['agreement']:.2f}%")
+    print("\nConfusion Matrix (rows = label, cols = hardware prediction):")
+    print("      " + "".join(f"{c:>6}" for c in range(10)) + "  recall")
+    for r, row in enumerate(report["confusion"]):
+        recall = row[r] / max(1, row.sum())
+        print(f"{r:>6}" + "".join(f"{v:>6}" for v in row) + f"  {100 * recall:5.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hardware (int8) accuracy of the exported .hex weights on the MNIST test set")
+    parser.add_argument("--weights", default=".", help="directory holding c1_weights/, c2_weights/, fc_weights/")
+    parser.add_argument("--data", default=DATA_ROOT)
+    parser.add_argument("--min-accuracy", type=float, default=MIN_HW_ACCURACY)
+    parser.add_argument("--cache", default=None, metavar="DIR",
+                        help=f"memoize layer outputs on disk (e.g. {layer_cache.CACHE_DIR})")
+    args = parser.parse_args(argv)
+
+    print("--- Hardware Accuracy Evaluation ---")
+    images, labels = load_test_set(args.data)
+    report = evaluate(images, labels, golden_model.load_weights(args.weights),
+                      calibrate.load_shifts(args.weights),
+                      cache=layer_cache.LayerCache(args.cache) if args.cache else None)
+    print_report(report)
+
+    if report["hw_accuracy"] < args.min_accuracy:
+        print(f"\nFAIL: Hardware accuracy below {100 * args.min_accuracy:.2f}%")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import numpy as np
+import golden_model
+import tracing
+
+# --- CONFIGURATION ---
+CACHE_DIR = "golden_cache"
+MAX_BYTES = 2 << 30      # LRU eviction above this
+# Bump whenever the datapath model changes, so no old entry can match again
+KEY_VERSION = 1
+
+# Pipeline stages in order: (output, input, kind). conv / fc stages carry
+# their layer's weights and shift; pool stages only depend on their input.
+STAGES = (
+    ("c1", "image", "conv"),
+    ("s2", "c1", "pool"),
+    ("c2", "s2", "conv"),
+    ("s4", "c2", "pool"),
+    ("c5", "s4", "fc"),
+    ("f6", "c5", "fc"),
+    ("out", "f6", "fc"),
+)
+OUTPUTS = tuple(name for name, _, _ in STAGES) + ("pred",)
+
+# --- KEYS ---
+def _hash(*parts):
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else repr(p).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def stage_keys(images, weights, shifts, act_bits):
+    """
+    {stage: key}. A stage's key hashes its input's key, its own weights,
+    shift and activation width, so a change anywhere only invalidates the
+    stages downstream of it. Only the input images are hashed as data.
+    """
+    keys = {"image": _hash(KEY_VERSION, "image", images.shape, images.tobytes())}
+    for name, src, kind in STAGES:
+        parts = [KEY_VERSION, name, keys[src]]
+        if kind != "pool":
+            w = np.ascontiguousarray(weights[name], dtype=np.int64)
+            parts += [w.shape, w.tobytes(), int(shifts[name]), int(act_bits[name])]
+        if kind == "fc":
+            parts.append(golden_model.FC_DROP_LAST_PRODUCT)
+        keys[name] = _hash(*parts)
+    return keys
+
+# --- STORE ---
+class LayerCache:
+    """
+    One .npy per stage output under root/<key[:2]>/<key>.npy, written under
+    a temporary name and renamed. Hits refresh the file's mtime, and
+    eviction drops the least recently used files until the cache is back
+    under max_bytes.
+    """
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key + ".npy")
+
+    def has(self, key):
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        """The cached tensor (memory-mapped, read-only) or None."""
+        path = self.path(key)
+        try:
+            arr = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return arr
+
+    def put(self, key, arr):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp, np.ascontiguousarray(arr))
+        os.replace(tmp, path)
+        self.evict()
+
+    def entries(self):
+        """[(mtime, bytes, path)] of every cached tensor."""
+        found = []
+        if not os.path.isdir(self.root):
+            return found
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for f in os.scandir(sub.path):
+                if f.name.endswith(".npy") and ".tmp" not in f.name:
+                    try:
+                        st = f.stat()
+                    except FileNotFoundError:     # evicted by another process meanwhile
+                        continue
+                    found.append((st.st_mtime, st.st_size, f.path))
+        return found
+
+    def evict(self):
+        """Removes least recently used tensors until the total fits max_bytes. Returns the bytes freed."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, path in entries:
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            freed += size
+        return freed
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+# --- PIPELINE ---
+def _apply(name, kind, x, weights, shifts, act_bits):
+    if kind == "pool":
+        y = golden_model.maxpool2x2(x)
+        return y.reshape(len(y), -1) if name == "s4" else y
+    if kind == "conv":
+        acc = golden_model.conv_acc(x, weights[name])
+    else:
+        acc = golden_model.fc_acc(x, weights[name])
+    return golden_model.requantize(acc, shifts[name], relu=name != "out", bits=act_bits[name])
+
+def run_lenet(images, weights, shifts=None, cache=None, act_bits=None, outputs=OUTPUTS,
+              batch_size=golden_model.BATCH_SIZE):
+    """
+    golden_model.run_lenet with every stage output memoized in `cache`
+    (a LayerCache; None = the default directory). Only the requested
+    outputs and what they need are loaded or computed: after a change to
+    the F6 shift, C1..C5 come off disk and F6 / OUT are recomputed.
+    """
+    cache = cache if cache is not None else LayerCache()
+    shifts = dict(golden_model.RTL_SHIFTS, **(shifts or {}))
+    act_bits = dict(dict.fromkeys(golden_model.LAYERS, golden_model.ACT_BITS), **(act_bits or {}))
+    x = golden_model.as_images(images)
+    keys = stage_keys(x, weights, shifts, act_bits)
+    wanted = {"out" if o == "pred" else o for o in outputs}
+    last = max(i for i, (name, _, _) in enumerate(STAGES) if name in wanted)
+    stages = STAGES[:last + 1]
+
+    # Backwards: a stage that has to be computed needs its input, cached or not
+    needed = set(wanted)
+    cached = {}
+    for name, src, _ in reversed(stages):
+        if name in needed:
+            cached[name] = cache.get(keys[name])
+            if cached[name] is None:
+                needed.add(src)
+
+    tensors = {"image": x[:, None]}
+    for name, src, kind in stages:
+        if name not in needed:
+            continue
+        if cached[name] is not None:
+            tensors[name] = cached[name]
+            continue
+        inp = tensors[src]
+        with tracing.span(name, items=len(inp)):
+            tensors[name] = np.concatenate([_apply(name, kind, inp[i:i + batch_size], weights, shifts, act_bits)
+                                            for i in range(0, len(inp), batch_size)])
+        with tracing.span("cache.put", items=tensors[name].nbytes):
+            cache.put(keys[name], tensors[name])
+
+    out = {o: tensors[o] for o in outputs if o != "pred"}
+    if "pred" in outputs:
+        # output_max keeps the first index on ties, same as argmax
+        out["pred"] = np.asarray(tensors["out"]).argmax(axis=1)
+    return out
+
+def predict(images, weights, shifts=None, cache=None, act_bits=None):
+    return run_lenet(images, weights, shifts, cache, act_bits, outputs=("pred",))["pred"]
+
+# --- CLI ---
+def _parse_values(text):
+    """'5-9' or '6,7,8' -> list of ints."""
+    if "-" in text:
+        lo, hi = text.split("-")
+        return list(range(int(lo), int(hi) + 1))
+    return [int(v) for v in text.split(",")]
+
+def sweep(images, labels, weights, shifts, layer, values, cache):
+    """Accuracy for each shift of one layer; every run after the first only recomputes downstream of it."""
+    results = []
+    for value in values:
+        hits = cache.hits
+        t0 = time.perf_counter()
+        pred = predict(images, weights, dict(shifts, **{layer: value}), cache)
+        results.append({"shift": value, "accuracy": float((pred == labels).mean()),
+                        "seconds": time.perf_counter() - t0, "hits": cache.hits - hits})
+        r = results[-1]
+        print(f"  {layer.upper()} shift {value:>2}: {100 * r['accuracy']:6.2f}%  "
+              f"{1000 * r['seconds']:8.1f} ms  ({r['hits']} stages from cache)")
+    return results
+
+def main(argv=None):
+    import calibrate
+    import hw_eval
+    parser = argparse.ArgumentParser(description="On-disk per-layer cache of the golden pipeline")
+    parser.add_argument("action", choices=["stats", "clear", "sweep"])
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--max-mb", type=float, default=MAX_BYTES / (1 << 20))
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--data", default=hw_eval.DATA_ROOT)
+    parser.add_argument("--layer", choices=golden_model.LAYERS, default="f6", help="sweep: layer whose shift varies")
+    parser.add_argument("--shifts", type=_parse_values, default=None, metavar="5-9",
+                        help="sweep: shift values (default: the calibrated one +-2)")
+    args = parser.parse_args(argv)
+    cache = LayerCache(args.cache, int(args.max_mb * (1 << 20)))
+
+    if args.action == "clear":
+        cache.clear()
+        print(f"Cleared {args.cache}")
+    elif args.action == "sweep":
+        weights = golden_model.load_weights(args.weights)
+        shifts = dict(golden_model.RTL_SHIFTS, **calibrate.load_shifts(args.weights))
+        images, labels = hw_eval.load_test_set(args.data)
+        values = args.shifts or list(range(shifts[args.layer] - 2, shifts[args.layer] + 3))
+        print(f"Sweeping the {args.layer.upper()} shift over {len(labels)} images")
+        sweep(images, labels, weights, shifts, args.layer, values, cache)
+    entries = cache.entries()
+    print(f"{args.cache}: {len(entries)} tensors, {sum(e[1] for e in entries) / (1 << 20):.1f} MB "
+          f"(cap {cache.max_bytes / (1 << 20):.0f} MB)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
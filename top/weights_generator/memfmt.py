@@ -0,0 +1,224 @@
+import re
+import sys
+import argparse
+import numpy as np
+
+# --- CONFIGURATION ---
+WIDTH = 8
+_DIGITS_UPPER = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+_DIGITS_LOWER = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_RADIX = {"HEX": 16, "DEC": 10, "UNS": 10, "BIN": 2, "OCT": 8}
+
+# --- ENCODING ---
+def _digits(width):
+    return (width + 3) // 4
+
+def _words(data, width):
+    """Flattens to int64 and masks to `width` bits (two's complement for negatives)."""
+    return np.asarray(data).astype(np.int64).reshape(-1) & ((1 << width) - 1)
+
+def encode_words(data, width=WIDTH, upper=True, digits=None):
+    """(N, digits) ASCII matrix of fixed-width hex words, one row per value."""
+    digits = digits or _digits(width)
+    words = _words(data, width)
+    shifts = 4 * np.arange(digits - 1, -1, -1, dtype=np.int64)
+    table = _DIGITS_UPPER if upper else _DIGITS_LOWER
+    return table[(words[:, None] >> shifts) & 0xF]
+
+def _lines(*columns):
+    """Joins byte matrices / constant byte strings column-wise into one buffer."""
+    n = next(len(c) for c in columns if isinstance(c, np.ndarray))
+    parts = [c if isinstance(c, np.ndarray) else np.tile(np.frombuffer(c, dtype=np.uint8), (n, 1))
+             for c in columns]
+    return np.hstack(parts).tobytes()
+
+def encode_hex(data, width=WIDTH, upper=True):
+    """$readmemh text: one fixed-width hex word per line (the .hex / .mem files)."""
+    words = encode_words(data, width, upper)
+    if len(words) == 0:
+        return b""
+    return _lines(words, b"\n")
+
+def mif_header(depth, width=WIDTH):
+    return (f"DEPTH = {depth};\nWIDTH = {width};\n"
+            "ADDRESS_RADIX = HEX;\nDATA_RADIX = HEX;\n"
+            "CONTENT\nBEGIN\n").encode()
+
+def encode_mif(data, width=WIDTH, depth=None):
+    """
+    Quartus .mif text, byte for byte what the old per-script writers made:
+    "{addr:X} : {value:02X};" per word. Addresses have no leading zeros, so
+    they are encoded in runs of equal digit count.
+    """
+    words = _words(data, width)
+    depth = len(words) if depth is None else depth
+    if depth < len(words):
+        raise ValueError(f"{len(words)} words do not fit DEPTH = {depth}")
+    values = encode_words(words, width)
+    body = []
+    start, n_digits = 0, 1
+    while start < len(words):
+        stop = min(len(words), 16 ** n_digits)
+        if stop > start:
+            addrs = encode_words(np.arange(start, stop), 4 * n_digits, digits=n_digits)
+            body.append(_lines(addrs, b" : ", values[start:stop], b";\n"))
+        start, n_digits = max(start, stop), n_digits + 1
+    return mif_header(depth, width) + b"".join(body) + b"END;\n"
+
+# --- WRITERS ---
+def _write(filename, payload):
+    with open(filename, 'wb') as f:
+        f.write(payload)
+
+def write_hex(filename, data, width=WIDTH, upper=True, verify=False):
+    """Writes a $readmemh file (.hex or .mem) in one buffered write."""
+    _write(filename, encode_hex(data, width, upper))
+    if verify:
+        check_roundtrip(filename, data, width)
+
+def write_mif(filename, data, width=WIDTH, depth=None, verify=False):
+    """Writes a Quartus .mif in one buffered write."""
+    _write(filename, encode_mif(data, width, depth))
+    if verify:
+        check_roundtrip(filename, data, width)
+
+def write_hex_batch(filenames, data, width=WIDTH, upper=True):
+    """
+    One $readmemh file per row of `data` (e.g. 10k images or golden vectors).
+    The whole batch is encoded in a single vectorized pass; each file is then
+    one write of its slice.
+    """
+    data = np.asarray(data)
+    rows = len(filenames)
+    if rows == 0:
+        return
+    per_row = data.size // rows
+    encoded = encode_hex(data.reshape(rows, per_row), width, upper)
+    line = _digits(width) + 1
+    for k, filename in enumerate(filenames):
+        _write(filename, encoded[k * per_row * line:(k + 1) * per_row * line])
+
+def write(filename, data, width=WIDTH, depth=None, verify=False):
+    """Picks the format from the extension: .mif, or $readmemh text for .hex/.mem."""
+    if filename.lower().endswith(".mif"):
+        write_mif(filename, data, width, depth, verify)
+    else:
+        write_hex(filename, data, width, verify=verify)
+
+# --- READERS ---
+def _to_signed(words, width):
+    sign = 1 << (width - 1)
+    return (words ^ sign) - sign
+
+def read_hex(filename, width=WIDTH, signed=False):
+    """
+    Parses a $readmemh file. Handles // and /* */ comments and @address
+    jumps; plain one-word-per-line files take a vectorized fast path.
+    """
+    with open(filename, 'rb') as f:
+        text = f.read()
+    tokens = text.split()
+    if tokens and b"@" not in text and b"/" not in text and len({len(t) for t in tokens}) == 1:
+        chars = np.frombuffer(b"".join(tokens), dtype=np.uint8).reshape(len(tokens), -1)
+        lut = np.full(256, 255, dtype=np.int64)
+        for i, c in enumerate(b"0123456789abcdef"):
+            lut[c] = lut[ord(chr(c).upper())] = i
+        nibbles = lut[chars]
+        if (nibbles == 255).any():
+            raise ValueError(f"{filename}: non-hex characters")
+        words = np.zeros(len(tokens), dtype=np.int64)
+        for col in range(chars.shape[1]):
+            words = (words << 4) | nibbles[:, col]
+    else:
+        text = re.sub(rb"//[^\n]*|/\*.*?\*/", b" ", text, flags=re.S)
+        values, addr = {}, 0
+        for tok in text.split():
+            if tok.startswith(b"@"):
+                addr = int(tok[1:], 16)
+            else:
+                values[addr] = int(tok.replace(b"_", b""), 16)
+                addr += 1
+        words = np.zeros(max(values, default=-1) + 1, dtype=np.int64)
+        for a, v in values.items():
+            words[a] = v
+    words &= (1 << width) - 1
+    return _to_signed(words, width) if signed else words
+
+def read_mif(filename, signed=False):
+    """
+    Parses a Quartus .mif. Returns (words, width); words has DEPTH entries,
+    with unspecified addresses left at 0. Handles "a : v;", "a : v1 v2 ...;"
+    and "[a..b] : v;" entries and the HEX/DEC/UNS/BIN/OCT radices.
+    """
+    with open(filename) as f:
+        text = re.sub(r"--[^\n]*|%[^%]*%", " ", f.read())
+    header = dict((k.upper(), v.strip().upper())
+                  for k, v in re.findall(r"(\w+)\s*=\s*([^;]+);", text.split("BEGIN")[0]))
+    depth, width = int(header["DEPTH"]), int(header["WIDTH"])
+    addr_radix = _RADIX[header.get("ADDRESS_RADIX", "HEX")]
+    data_radix = _RADIX[header.get("DATA_RADIX", "HEX")]
+    body = re.search(r"CONTENT\s+BEGIN(.*?)END\s*;", text, flags=re.S | re.I)
+    if body is None:
+        raise ValueError(f"{filename}: no CONTENT BEGIN ... END; block")
+
+    words = np.zeros(depth, dtype=np.int64)
+    for addr, vals in re.findall(r"([^:;]+):([^;]+);", body.group(1)):
+        addr = addr.strip()
+        vals = [int(v, data_radix) for v in vals.split()]
+        if addr.startswith("["):
+            lo, hi = (int(a, addr_radix) for a in addr.strip("[]").split(".."))
+            words[lo:hi + 1] = np.resize(vals, hi + 1 - lo)
+        else:
+            start = int(addr, addr_radix)
+            words[start:start + len(vals)] = vals
+    words &= (1 << width) - 1
+    return (_to_signed(words, width) if signed else words), width
+
+def read(filename, width=WIDTH, signed=False):
+    """Reads .mif or $readmemh (.hex/.mem) into an int64 array."""
+    if filename.lower().endswith(".mif"):
+        return read_mif(filename, signed)[0]
+    return read_hex(filename, width, signed)
+
+def check_roundtrip(filename, data, width=WIDTH):
+    """Reads `filename` back and raises ValueError if it differs from `data`."""
+    expected = _words(data, width)
+    got = read(filename, width)[:len(expected)]
+    if len(got) != len(expected) or not np.array_equal(got, expected):
+        bad = np.flatnonzero(got != expected[:len(got)]) if len(got) == len(expected) else []
+        where = f"first mismatch at word {bad[0]}" if len(bad) else f"{len(got)} of {len(expected)} words"
+        raise ValueError(f"{filename}: round-trip check failed ({where})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, compare or convert .mif / .hex / .mem memory files")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--width", type=int, default=WIDTH)
+    parser.add_argument("--signed", action="store_true")
+    parser.add_argument("--convert", metavar="OUT", help="write the (single) input to OUT, format from extension")
+    args = parser.parse_args(argv)
+
+    arrays = []
+    for name in args.files:
+        words = read(name, args.width, args.signed)
+        arrays.append(words)
+        lo, hi = (int(words.min()), int(words.max())) if len(words) else (0, 0)
+        print(f"{name}: {len(words)} words, min {lo}, max {hi}")
+
+    if args.convert:
+        write(args.convert, arrays[0], args.width, verify=True)
+        print(f"Generated {args.convert}")
+    elif len(arrays) > 1:
+        ref = arrays[0]
+        for name, words in zip(args.files[1:], arrays[1:]):
+            n = min(len(ref), len(words))
+            bad = np.flatnonzero(ref[:n] != words[:n])
+            if len(ref) != len(words) or len(bad):
+                print(f"DIFFER: {args.files[0]} vs {name}: {len(bad)} words differ"
+                      + (f", first at {bad[0]}" if len(bad) else "")
+                      + (f", lengths {len(ref)} / {len(words)}" if len(ref) != len(words) else ""))
+                return 1
+        print("Identical.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,51 +1,47 @@
-import torch
-from torchvision import datasets, transforms
-import os
+import sys
+import argparse
+import mnist_idx
+import memfmt
 
 # --- CONFIGURATION ---
 TARGET_DIGIT = 8   # Change this to test different digits
 FILENAME = "image.hex" # Changed extension to .hex for readmemh compatibility
+TARGET_INSTANCE = 0  # 0 = first one in the test set, 1 = second, ...
 MAPSIZE = 32       
 
-def write_hex(filename, data):
+def write_hex(filename, data, digit=TARGET_DIGIT):
     """
     Writes raw hex values to a file, one per line.
     This format is completely compatible with Verilog's $readmemh().
+    A .mif filename gets a Quartus MIF instead (what mnist_mif.py writes).
     """
-    with open(filename, 'w') as f:
-        for val in data:
-            # Mask to 8-bit to ensure clean hex (e.g., 255 -> FF)
-            val_8bit = val & 0xFF 
-            f.write(f"{val_8bit:02X}\n") # Write hex value followed by newline
-    print(f"Success! Generated {filename} with a handwritten '{TARGET_DIGIT}'.")
+    memfmt.write(filename, data)
+    print(f"Success! Generated {filename} with a handwritten '{digit}'.")
 
-def main():
-    print(f"Searching MNIST for a digit '{TARGET_DIGIT}'...")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write one MNIST test digit as the FPGA input image")
+    parser.add_argument("--digit", type=int, default=TARGET_DIGIT)
+    parser.add_argument("--instance", type=int, default=TARGET_INSTANCE, help="0 = first one in the test set")
+    parser.add_argument("--out", default=FILENAME, help="image.hex ($readmemh) or image.mif")
+    parser.add_argument("--data", default="./data")
+    args = parser.parse_args(argv)
+    print(f"Searching MNIST for a digit '{args.digit}'...")
     
-    # Standard load (0.0 to 1.0)
-    transform = transforms.Compose([
-        transforms.Resize((MAPSIZE, MAPSIZE)),
-        transforms.ToTensor()
-    ])
-    
-    # Download dataset if needed
+    # Memory-mapped IDX files + NumPy resize: same 32x32 pixels as
+    # transforms.Resize((32, 32)) without importing torch
     try:
-        dataset = datasets.MNIST(root='./data', train=False, download=True, transform=transform)
-    except Exception as e:
-        print(f"Error downloading dataset: {e}")
-        return
-    
-    found_img = None
-    for img, label in dataset:
-        if label == TARGET_DIGIT:
-            found_img = img
-            break
-            
-    if found_img is None:
-        print(f"Error: Could not find a {TARGET_DIGIT} in the dataset.")
-        return
+        dataset = mnist_idx.MnistIdx(root=args.data, train=False)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 1
+
+    index = dataset.find(args.digit, args.instance)
+    if index is None:
+        print(f"Error: Could not find a {args.digit} in the dataset.")
+        return 1
+    found_img = dataset.image(index, fpga=False)
 
-    pixels_float = found_img.flatten().tolist()
+    pixels_float = (found_img.flatten() / 255).tolist()
     pixels_int = []
     
     print("\n--- ASCII PREVIEW (Range 0 to 127) ---")
@@ -69,7 +65,8 @@ def main():
     print("\n-----------------------------------")
     
     # Use the new write_hex function
-    write_hex(FILENAME, pixels_int)
+    write_hex(args.out, pixels_int, args.digit)
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
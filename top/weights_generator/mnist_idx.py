@@ -0,0 +1,142 @@
+import os
+import gzip
+import shutil
+import numpy as np
+
+# --- CONFIGURATION ---
+DATA_ROOT = "./data"
+RAW_DIR = os.path.join("MNIST", "raw")   # where torchvision.datasets.MNIST puts the files
+MAPSIZE = 32
+FILES = {
+    True:  ("train-images-idx3-ubyte", "train-labels-idx1-ubyte"),
+    False: ("t10k-images-idx3-ubyte", "t10k-labels-idx1-ubyte"),
+}
+
+# IDX type byte -> big-endian NumPy dtype
+IDX_DTYPES = {0x08: ">u1", 0x09: ">i1", 0x0B: ">i2", 0x0C: ">i4", 0x0D: ">f4", 0x0E: ">f8"}
+
+# Pillow's fixed-point resampling precision for 8-bit images
+PRECISION_BITS = 32 - 8 - 2
+
+# --- IDX FILES ---
+def raw_path(root, name):
+    """
+    Path of the uncompressed IDX file. When only the .gz is on disk it is
+    decompressed once next to it, so later runs can memory-map it directly.
+    """
+    path = os.path.join(root, RAW_DIR, name)
+    if not os.path.exists(path):
+        if not os.path.exists(path + ".gz"):
+            raise FileNotFoundError(f"{path}(.gz) not found; run the trainer once to download MNIST")
+        tmp = path + ".tmp"
+        with gzip.open(path + ".gz", 'rb') as src, open(tmp, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp, path)
+    return path
+
+def read_idx(path):
+    """Memory-maps an IDX file. Returns a read-only array shaped like its header dims."""
+    with open(path, 'rb') as f:
+        header = f.read(4)
+        if len(header) != 4 or header[:2] != b"\0\0" or header[2] not in IDX_DTYPES:
+            raise ValueError(f"{path} is not an IDX file")
+        ndim = header[3]
+        dims = tuple(int(d) for d in np.frombuffer(f.read(4 * ndim), dtype=">u4"))
+    return np.memmap(path, dtype=IDX_DTYPES[header[2]], mode='r', offset=4 + 4 * ndim, shape=dims)
+
+# --- RESIZE ---
+def _resample_matrix(in_size, out_size):
+    """
+    Pillow's BILINEAR resampling coefficients (ImagingResample) as an
+    (out_size, in_size) integer matrix in PRECISION_BITS fixed point, so the
+    NumPy resize is bit-identical to transforms.Resize on a PIL image.
+    """
+    scale = in_size / out_size
+    filterscale = max(scale, 1.0)
+    support = 1.0 * filterscale
+    coeffs = np.zeros((out_size, in_size), dtype=np.int64)
+    for xx in range(out_size):
+        center = (xx + 0.5) * scale
+        xmin = max(int(center - support + 0.5), 0)
+        xmax = min(int(center + support + 0.5), in_size)
+        w = np.array([max(0.0, 1.0 - abs((x - center + 0.5) / filterscale))
+                      for x in range(xmin, xmax)])
+        w /= w.sum()
+        coeffs[xx, xmin:xmax] = np.where(w < 0, -0.5 + w * (1 << PRECISION_BITS),
+                                         0.5 + w * (1 << PRECISION_BITS)).astype(np.int64)
+    return coeffs
+
+def _resample(images, coeffs, axis):
+    # float64 GEMM: every sum is an integer below 2^53, so this is exact
+    x = np.moveaxis(images, axis, -1).astype(np.float64)
+    acc = (x @ coeffs.T.astype(np.float64)).astype(np.int64)
+    acc = np.moveaxis(acc, -1, axis)
+    return np.clip((acc + (1 << (PRECISION_BITS - 1))) >> PRECISION_BITS, 0, 255).astype(np.uint8)
+
+def resize(images, size=MAPSIZE):
+    """Bilinear resize of (..., H, W) uint8 images to size x size, horizontal pass first like Pillow."""
+    images = np.asarray(images, dtype=np.uint8)
+    h, w = images.shape[-2:]
+    if w != size:
+        images = _resample(images, _resample_matrix(w, size), images.ndim - 1)
+    if h != size:
+        images = _resample(images, _resample_matrix(h, size), images.ndim - 2)
+    return images
+
+def to_fpga_pixels(images):
+    """
+    uint8 -> 0..127, the same value as int(ToTensor() * 127): x * 127 / 255
+    is never within float error of the next integer, so integer division
+    reproduces the float path exactly.
+    """
+    return (np.asarray(images, dtype=np.int32) * 127 // 255).astype(np.uint8)
+
+def to_camera_pixels(images):
+    """uint8 -> 0..127 the way camera.cpp feeds the FPGA: padded_image.data[i] / 2."""
+    return (np.asarray(images, dtype=np.uint8) // 2).astype(np.uint8)
+
+# --- DATASET ---
+class MnistIdx:
+    """
+    Lazily decoded MNIST split. Images and labels stay memory-mapped; only
+    the images that are asked for get resized to 32x32.
+    """
+    def __init__(self, root=DATA_ROOT, train=False):
+        image_file, label_file = FILES[train]
+        self.images = read_idx(raw_path(root, image_file))
+        self.labels = read_idx(raw_path(root, label_file))
+        if len(self.images) != len(self.labels):
+            raise ValueError(f"{image_file}: {len(self.images)} images but {len(self.labels)} labels")
+        self._by_digit = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def digit_indices(self, digit):
+        """Dataset indices of every instance of `digit`, in file order."""
+        if self._by_digit is None:
+            order = np.argsort(self.labels, kind="stable")
+            bounds = np.searchsorted(self.labels[order], np.arange(11))
+            self._by_digit = [order[bounds[d]:bounds[d + 1]] for d in range(10)]
+        return self._by_digit[digit]
+
+    def find(self, digit, n=0):
+        """Index of the n-th (0-based) instance of `digit`, or None."""
+        indices = self.digit_indices(digit)
+        return int(indices[n]) if n < len(indices) else None
+
+    def image(self, index, fpga=True):
+        """One 32x32 image: FPGA pixels (0..127) or the resized uint8 image."""
+        img = resize(self.images[index])
+        return to_fpga_pixels(img) if fpga else img
+
+    def iter_digit(self, digit, fpga=True):
+        """Yields (index, image) for every instance of `digit`, decoding one at a time."""
+        for index in self.digit_indices(digit):
+            yield int(index), self.image(index, fpga)
+
+    def batch(self, start=0, count=None, fpga=True):
+        """(images, labels) for a contiguous range, resized in one vectorized pass."""
+        stop = len(self) if count is None else min(len(self), start + count)
+        images = resize(self.images[start:stop])
+        return (to_fpga_pixels(images) if fpga else images), np.array(self.labels[start:stop], dtype=np.int64)
@@ -1,46 +1,42 @@
-import torch
-from torchvision import datasets, transforms
-import os
+import sys
+import argparse
+import mnist_idx
+import memfmt
 
 # --- CONFIGURATION ---
 TARGET_DIGIT = 7   # Change this to test different digits
 FILENAME = "image.mif"
+TARGET_INSTANCE = 0  # 0 = first one in the test set, 1 = second, ...
 MAPSIZE = 32       
 
-def write_mif(filename, data):
-    with open(filename, 'w') as f:
-        f.write(f"DEPTH = {len(data)};\nWIDTH = 8;\n")
-        f.write("ADDRESS_RADIX = HEX;\nDATA_RADIX = HEX;\n")
-        f.write("CONTENT\nBEGIN\n")
-        for i, val in enumerate(data):
-            # Mask to 8-bit (handles 2's complement if you ever needed negatives)
-            val_8bit = val & 0xFF 
-            f.write(f"{i:X} : {val_8bit:02X};\n")
-        f.write("END;\n")
-    print(f"Success! Generated {filename} with a handwritten '{TARGET_DIGIT}'.")
+def write_mif(filename, data, digit=TARGET_DIGIT):
+    memfmt.write_mif(filename, data)
+    print(f"Success! Generated {filename} with a handwritten '{digit}'.")
 
-def main():
-    print(f"Searching MNIST for a digit '{TARGET_DIGIT}'...")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write one MNIST test digit as the FPGA input image (.mif)")
+    parser.add_argument("--digit", type=int, default=TARGET_DIGIT)
+    parser.add_argument("--instance", type=int, default=TARGET_INSTANCE, help="0 = first one in the test set")
+    parser.add_argument("--out", default=FILENAME, help="Quartus .mif to write")
+    parser.add_argument("--data", default="./data")
+    args = parser.parse_args(argv)
+    print(f"Searching MNIST for a digit '{args.digit}'...")
     
-    # Standard load (0.0 to 1.0)
-    transform = transforms.Compose([
-        transforms.Resize((MAPSIZE, MAPSIZE)),
-        transforms.ToTensor()
-    ])
-    
-    dataset = datasets.MNIST(root='./data', train=False, download=True, transform=transform)
-    
-    found_img = None
-    for img, label in dataset:
-        if label == TARGET_DIGIT:
-            found_img = img
-            break
-            
-    if found_img is None:
-        print(f"Error: Could not find a {TARGET_DIGIT} in the dataset.")
-        return
+    # Memory-mapped IDX files + NumPy resize: same 32x32 pixels as
+    # transforms.Resize((32, 32)) without importing torch
+    try:
+        dataset = mnist_idx.MnistIdx(root=args.data, train=False)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 1
+
+    index = dataset.find(args.digit, args.instance)
+    if index is None:
+        print(f"Error: Could not find a {args.digit} in the dataset.")
+        return 1
+    found_img = dataset.image(index, fpga=False)
 
-    pixels_float = found_img.flatten().tolist()
+    pixels_float = (found_img.flatten() / 255).tolist()
     pixels_int = []
     
     print("\n--- ASCII PREVIEW (Range 0 to 127) ---")
@@ -63,7 +59,8 @@ def main():
         
     print("\n-----------------------------------")
     
-    write_mif(FILENAME, pixels_int)
+    write_mif(args.out, pixels_int, args.digit)
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import sys
+import math
+import argparse
+import itertools
+from fractions import Fraction
+
+# --- CONFIGURATION ---
+FMAX_MHZ = 50.0          # fpga_top_layer1 runs on the 50 MHz fabric clock
+MAPSIZE = 32
+TOTAL_PIXELS = MAPSIZE * MAPSIZE
+
+# Cyclone V 5CSEBA6 (DE10-Nano) budget
+M10K_BLOCKS = 553
+DSP_BLOCKS = 112
+# Cyclone V DSP block modes: (multipliers per block, operand widths); 8x8
+# products take three 9x9 multipliers per block. Narrower products can
+# share one multiplier: k weights packed at a stride of product width + 1
+# guard bit against one activation (the sign borrow of the lower fields is
+# fixed up in logic). The fitter does not always reach the packing: the
+# baseline's 303 multipliers used all 112 blocks (output_files/*.fit.summary),
+# so treat estimates near the budget as tight
+DSP_MODES = ((3, 9, 9), (2, 19, 18), (1, 27, 27))
+PIXEL_BITS = 8           # C1 input: the signed 8-bit pixel bus
+
+# Cyclone V M10K aspect ratios (depth, width)
+M10K_CONFIGS = ((8192, 1), (4096, 2), (2048, 5), (1024, 10), (512, 20), (256, 40))
+
+# Pipeline latencies read off the RTL (cycles)
+CONV_LATENCY = 7         # row_buffer window + conv_pipelined (5) + mem_wr_en register
+QUANT_LATENCY = 1        # shift/ReLU register in front of maxpool_engine
+POOL_LATENCY = 2         # maxpool_engine stage 1 + stage 2
+CONV_BLOCK_LATENCY = CONV_LATENCY + QUANT_LATENCY + POOL_LATENCY
+PASS_OVERHEAD = 6        # S_RESET_L2, reset held, load detect, S_PRE_START, S_START_L2, S_NEXT
+LOAD_OVERHEAD = 2        # ROM read latency + loading_done flag
+
+# The network, as fpga_top_layer1 wires it
+LAYERS = ("c1", "c2", "c5", "f6", "out")
+C1 = {"maps": 6, "in_maps": 1, "size": 32}
+C2 = {"maps": 16, "in_maps": 6, "size": 14}
+FC_LAYERS = (("c5", 400, 120), ("f6", 120, 84), ("out", 84, 10))
+
+# The design that is on the board today
+BASELINE = {
+    "c1_channels": 6,        # lenet_top_parallel: all C1 maps in one pass over the image
+    "c2_channels": 1,        # lenet_channel_layer2 instances: C2 maps per pass
+    "c2_load_width": 1,      # weights per clock loaded from layer2_rom_banked
+    "s2_buffer": False,      # keep S2 in RAM instead of recomputing C1 on every C2 pass
+    "fc_macs": 1,            # MACs per clock in each fc_streaming
+    "fc_rom_style": "logic", # ramstyle of fc_weight_rom
+    "pipelined": False,      # next image's conv overlaps this image's FC layers
+    "weight_bits": 8,        # ROM word width: an int or {layer: bits}
+    "act_bits": 8,           # activation width: an int or {layer: bits}
+    "fc_sparse_words": None, # {layer: stream words} of a zero-skip FC engine (sparse_fc.py)
+}
+
+# Default design-space sweep
+SWEEP_GRID = {
+    "c2_channels": (1, 2, 4, 8, 16),
+    "c2_load_width": (1, 6),
+    "s2_buffer": (False, True),
+    "fc_macs": (1, 2, 4, 8, 16),
+    "pipelined": (False, True),
+}
+
+# --- RESOURCES ---
+def m10k_blocks(depth, width):
+    """M10K blocks for one depth x width memory, using the cheapest aspect ratio."""
+    return min(math.ceil(depth / d) * math.ceil(width / w) for d, w in M10K_CONFIGS)
+
+def layer_bits(cfg, key, layer):
+    bits = cfg.get(key, 8)
+    return bits.get(layer, 8) if isinstance(bits, dict) else bits
+
+def input_bits(cfg, layer):
+    """Width of the activations a layer multiplies with (the previous layer's output)."""
+    i = LAYERS.index(layer)
+    return PIXEL_BITS if i == 0 else layer_bits(cfg, "act_bits", LAYERS[i - 1])
+
+def products_per_dsp(w_bits, a_bits):
+    """w_bits x a_bits products one DSP block computes per clock, packing weights where they fit."""
+    best = 0
+    for mults, wide, narrow in DSP_MODES:
+        if a_bits > narrow or w_bits > wide:
+            continue
+        best = max(best, mults * (1 + (wide - w_bits) // (w_bits + a_bits + 1)))
+    return best
+
+def memories(cfg):
+    """(name, count, depth, width, style) for every on-chip memory the config needs."""
+    w, macs = cfg["c2_load_width"], cfg["fc_macs"]
+    wb = {l: layer_bits(cfg, "weight_bits", l) for l in LAYERS}
+    ab = {l: layer_bits(cfg, "act_bits", l) for l in LAYERS}
+    mems = [
+        ("c1 weight rom", C1["maps"], 32, wb["c1"], "logic"),
+        ("c2 weight banks", C2["maps"], math.ceil(150 / w), wb["c2"] * w, "M10K"),
+        ("s4_ram", 1, 400, ab["c2"], "logic"),
+    ]
+    if cfg["pipelined"]:
+        mems.append(("s4_ram (second buffer)", 1, 400, ab["c2"], "logic"))
+    if cfg["s2_buffer"]:
+        mems.append(("s2 buffer", C1["maps"], 196, ab["c1"], "M10K"))
+    for name, n_in, n_out in FC_LAYERS:
+        mems.append((f"{name} input_ram", 1, math.ceil(n_in / macs), input_bits(cfg, name) * macs, "M10K"))
+        mems.append((f"{name} weight rom", 1, math.ceil(n_in * n_out / macs), wb[name] * macs, cfg["fc_rom_style"]))
+    return mems
+
+def resources(cfg):
+    mults = {
+        "c1": cfg["c1_channels"] * 25,
+        "c2": cfg["c2_channels"] * C2["in_maps"] * 25,
+    }
+    mults.update({name: cfg["fc_macs"] for name, _, _ in FC_LAYERS})
+    dsp = math.ceil(sum(Fraction(n, products_per_dsp(layer_bits(cfg, "weight_bits", l), input_bits(cfg, l)))
+                        for l, n in mults.items()))
+    mems = memories(cfg)
+    m10k = sum(n * m10k_blocks(d, wd) for _, n, d, wd, style in mems if style == "M10K")
+    logic_bits = sum(n * d * wd for _, n, d, wd, style in mems if style != "M10K")
+    return {
+        "multipliers": sum(mults.values()),
+        "dsp": dsp,
+        "m10k": m10k,
+        "m10k_bits": sum(n * d * wd for _, n, d, wd, style in mems if style == "M10K"),
+        "logic_mem_bits": logic_bits,
+        "dsp_fits": dsp <= DSP_BLOCKS,
+        "m10k_fits": m10k <= M10K_BLOCKS,
+    }
+
+# --- CYCLES ---
+def conv_cycles(cfg):
+    """
+    C1 + S2 + C2 + S4: ceil(16 / c2_channels) passes of the fpga_top_layer1
+    S_RESET_L2 .. S_NEXT loop. Without an S2 buffer every pass re-streams the
+    1024-pixel image and recomputes C1; with one, only the first pass does
+    and the rest replay the 14x14 S2 maps.
+    """
+    passes = math.ceil(C2["maps"] / cfg["c2_channels"])
+    load = math.ceil(C2["in_maps"] * 25 / cfg["c2_load_width"]) + LOAD_OVERHEAD
+    full_pass = PASS_OVERHEAD + load + TOTAL_PIXELS + 1 + 2 * CONV_BLOCK_LATENCY + 1
+    if cfg["s2_buffer"]:
+        replay_pass = PASS_OVERHEAD + load + C2["size"] ** 2 + CONV_BLOCK_LATENCY + 1
+        total = full_pass + (passes - 1) * replay_pass
+    else:
+        total = passes * full_pass
+
+    c1_macs = C1["maps"] * 28 * 28 * 25
+    c2_macs = C2["maps"] * 10 * 10 * C2["in_maps"] * 25
+    units = resources(cfg)["multipliers"] - len(FC_LAYERS) * cfg["fc_macs"]
+    stalls = [("c2 weight reload", passes * load)]
+    if not cfg["s2_buffer"] and passes > 1:
+        stalls.append(("c1 recompute (image re-streamed per c2 pass)", (passes - 1) * TOTAL_PIXELS))
+    return {
+        "name": "conv (c1-s4)",
+        "cycles": total,
+        "macs": c1_macs + c2_macs,
+        "mac_units": units,
+        "passes": passes,
+        "stalls": stalls,
+    }
+
+def fc_cycles(cfg):
+    """
+    S_SEND_C5 streams s4_ram into C5 one byte per clock; each fc_streaming
+    fills its input_ram (LOAD) before computing, so F6 and OUT start only
+    after the previous layer's last neuron. A layer computes
+    NUM_OUTPUTS * ceil(NUM_INPUTS / fc_macs) cycles plus its pipeline and
+    DONE cycles. output_max adds one cycle. A layer in fc_sparse_words
+    streams only its nonzero weights, fc_macs of them per clock.
+    """
+    macs = cfg["fc_macs"]
+    stages = [{"name": "s4 -> c5 send", "cycles": 400 + 1, "macs": 0, "mac_units": 0,
+               "stalls": [("c5 input load (serial s4_ram read)", 401)]}]
+    for name, n_in, n_out in FC_LAYERS:
+        sparse = cfg.get("fc_sparse_words") or {}
+        compute = math.ceil(sparse[name] / macs) if name in sparse else n_out * math.ceil(n_in / macs)
+        prev = stages[-1]
+        stalls = []
+        if prev["mac_units"]:
+            stalls.append((f"{name} idle until {prev['name']} finishes", prev["cycles"]))
+        stages.append({
+            "name": name,
+            "cycles": compute + 2,
+            "macs": n_in * n_out,
+            "mac_units": macs,
+            "stalls": stalls,
+        })
+    stages.append({"name": "output_max", "cycles": 1, "macs": 0, "mac_units": 0, "stalls": []})
+    return stages
+
+def estimate(cfg=None, fmax_mhz=FMAX_MHZ):
+    """Per-layer cycles, latency, throughput and resource use of one configuration."""
+    cfg = dict(BASELINE, **(cfg or {}))
+    conv = conv_cycles(cfg)
+    fc = fc_cycles(cfg)
+    layers = [conv] + fc
+    for layer in layers:
+        busy = layer["mac_units"] * layer["cycles"]
+        layer["utilization"] = layer["macs"] / busy if busy else 0.0
+
+    latency = sum(l["cycles"] for l in layers)
+    fc_total = latency - conv["cycles"]
+    # Without pipelining the controller returns to S_IDLE only after the
+    # whole image; with it, the conv block and the FC chain form two stages
+    interval = max(conv["cycles"], fc_total) if cfg["pipelined"] else latency
+    return {
+        "config": cfg,
+        "layers": layers,
+        "latency_cycles": latency,
+        "interval_cycles": interval,
+        "bottleneck": "conv (c1-s4)" if conv["cycles"] >= fc_total else "fc (c5-out)",
+        "latency_us": latency / fmax_mhz,
+        "images_per_sec": fmax_mhz * 1e6 / interval,
+        "fmax_mhz": fmax_mhz,
+        "resources": resources(cfg),
+    }
+
+# --- REPORTS ---
+def print_report(report):
+    cfg, res = report["config"], report["resources"]
+    print("Config: " + ", ".join(f"{k}={v}" for k, v in cfg.items()))
+    print(f"\n{'Stage':<16}{'Cycles':>9}{'Share':>8}{'MAC units':>11}{'Util':>8}")
+    for l in report["layers"]:
+        share = 100 * l["cycles"] / report["latency_cycles"]
+        util = f"{100 * l['utilization']:.1f}%" if l["mac_units"] else "-"
+        print(f"{l['name']:<16}{l['cycles']:>9}{share:>7.1f}%{l['mac_units']:>11}{util:>8}")
+
+    print("\nStall points:")
+    for l in report["layers"]:
+        for what, cycles in l["stalls"]:
+            print(f"  {what:<48}{cycles:>8} cycles")
+
+    print(f"\nLatency:     {report['latency_cycles']} cycles = {report['latency_us']:.1f} us @ {report['fmax_mhz']:g} MHz")
+    print(f"Interval:    {report['interval_cycles']} cycles ({report['bottleneck']} bound)")
+    print(f"Throughput:  {report['images_per_sec']:.0f} images/s")
+    print(f"DSP blocks:  {res['dsp']} / {DSP_BLOCKS} ({res['multipliers']} multipliers)"
+          + ("" if res["dsp_fits"] else "  OVER BUDGET"))
+    print(f"M10K blocks: {res['m10k']} / {M10K_BLOCKS}" + ("" if res["m10k_fits"] else "  OVER BUDGET"))
+    print(f"Logic mem:   {res['logic_mem_bits']} bits (ramstyle \"logic\")")
+
+def sweep(grid=None, fmax_mhz=FMAX_MHZ, base=None):
+    """Estimates every combination of the grid. Returns reports, fastest first."""
+    grid = grid or SWEEP_GRID
+    keys = list(grid)
+    reports = [estimate(dict(base or {}, **dict(zip(keys, values))), fmax_mhz)
+               for values in itertools.product(*(grid[k] for k in keys))]
+    reports.sort(key=lambda r: (-r["images_per_sec"], r["resources"]["dsp"], r["resources"]["m10k"]))
+    return reports
+
+def print_sweep(reports, keys, top=20, fitting_only=True):
+    shown = [r for r in reports
+             if not fitting_only or (r["resources"]["dsp_fits"] and r["resources"]["m10k_fits"])]
+    print(f"{len(shown)} of {len(reports)} configurations"
+          + (" fit the 5CSEBA6" if fitting_only else ""))
+    header = "".join(f"{k:>15}" for k in keys)
+    print(f"{header}{'cycles/img':>12}{'img/s':>9}{'lat us':>9}{'DSP':>6}{'M10K':>6}")
+    for r in shown[:top]:
+        row = "".join(f"{str(r['config'][k]):>15}" for k in keys)
+        print(f"{row}{r['interval_cycles']:>12}{r['images_per_sec']:>9.0f}{r['latency_us']:>9.1f}"
+              f"{r['resources']['dsp']:>6}{r['resources']['m10k']:>6}")
+
+def _parse_value(text):
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cycle-level throughput / latency / resource model of the LeNet-5 RTL")
+    parser.add_argument("--fmax", type=float, default=FMAX_MHZ, help="clock in MHz")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help=f"override a design parameter ({', '.join(BASELINE)})")
+    parser.add_argument("--sweep", action="store_true", help="sweep SWEEP_GRID around the --set design")
+    parser.add_argument("--top", type=int, default=20, help="sweep rows to show")
+    parser.add_argument("--all", action="store_true", help="also show configurations over budget")
+    args = parser.parse_args(argv)
+
+    cfg = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        if key not in BASELINE:
+            parser.error(f"unknown parameter '{key}'")
+        cfg[key] = _parse_value(value)
+
+    if args.sweep:
+        print_sweep(sweep(fmax_mhz=args.fmax, base=cfg), list(SWEEP_GRID), args.top, not args.all)
+    else:
+        print_report(estimate(cfg, args.fmax))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
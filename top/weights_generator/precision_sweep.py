@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import argparse
+import itertools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import golden_model
+import calibrate
+import checkpoint
+import perf_model
+import hw_eval
+
+# --- CONFIGURATION ---
+DATA_ROOT = "./data"
+WEIGHT_BITS = (2, 3, 4, 5, 6, 7, 8)
+ACT_BITS = (4, 5, 6, 7, 8)
+ROUNDING = "nearest"     # truncation (the ROM export rule) wipes out most weights below ~4 bits
+MAX_FC_MACS = 64         # parallelism searched for the "fits" column
+# --per-layer: coordinate search from the best grouped config instead of the
+# full per-layer cross product (7^5 * 5^5 configs for the default widths)
+TOLERANCE = 0.005        # accuracy the search may give up against that config
+MAX_PASSES = 3
+
+# Layers that share one precision in the grid sweep (--per-layer then searches each on its own)
+WEIGHT_GROUPS = {"conv": ("c1", "c2"), "fc": ("c5", "f6", "out")}
+ACT_GROUPS = {"all": golden_model.LAYERS}
+
+# --- CONFIGS ---
+def configs(weight_groups=None, act_groups=None, weight_bits=WEIGHT_BITS, act_bits=ACT_BITS):
+    """Every (weight_bits, act_bits) pair of {layer: bits} dicts of the grid."""
+    weight_groups = weight_groups or WEIGHT_GROUPS
+    act_groups = act_groups or ACT_GROUPS
+
+    def expand(groups, choice):
+        return {l: b for layers, b in zip(groups.values(), choice) for l in layers}
+
+    for w in itertools.product(weight_bits, repeat=len(weight_groups)):
+        for a in itertools.product(act_bits, repeat=len(act_groups)):
+            yield expand(weight_groups, w), expand(act_groups, a)
+
+# --- EVALUATION ---
+_STATE = {}
+
+def _init(float_weights, calib_pixels, images, labels, rounding):
+    """Pool initializer: every worker keeps the dataset instead of receiving it per config."""
+    _STATE.update(float_weights=float_weights, calib_pixels=calib_pixels,
+                  images=images, labels=labels, rounding=rounding)
+
+def evaluate_config(config):
+    """
+    Re-quantizes the float weights to the config's widths (per-layer scale,
+    largest weight -> qmax), calibrates the shifts for its activation widths
+    and runs the test set through the integer model.
+    """
+    w_bits, a_bits = config
+    float_weights = _STATE["float_weights"]
+    scales = calibrate.layer_scales(float_weights, w_bits)
+    weights = calibrate.quantize_weights(float_weights, scales, w_bits, _STATE["rounding"])
+    shifts, _ = calibrate.calibrate_shifts(_STATE["calib_pixels"], weights, act_bits=a_bits)
+    pred = golden_model.predict(_STATE["images"], weights, shifts, act_bits=a_bits)
+    return {"weight_bits": w_bits, "act_bits": a_bits, "shifts": shifts,
+            "accuracy": float((pred == _STATE["labels"]).mean())}
+
+def max_fc_macs(cfg):
+    """Largest fc_macs whose DSP and M10K use still fit the device (0 if none)."""
+    best = 0
+    for macs in range(1, MAX_FC_MACS + 1):
+        res = perf_model.resources(dict(cfg, fc_macs=macs))
+        if not (res["dsp_fits"] and res["m10k_fits"]):
+            break
+        best = macs
+    return best
+
+def add_resources(result, design=None):
+    cfg = dict(perf_model.BASELINE, **(design or {}),
+               weight_bits=result["weight_bits"], act_bits=result["act_bits"])
+    res = perf_model.resources(cfg)
+    result.update(dsp=res["dsp"], m10k=res["m10k"],
+                  mem_bits=res["m10k_bits"] + res["logic_mem_bits"], max_fc_macs=max_fc_macs(cfg))
+    return result
+
+def mark_pareto(results):
+    """Flags the configs no other config beats on accuracy, memory bits and DSPs at once."""
+    def dominates(a, b):
+        no_worse = a["accuracy"] >= b["accuracy"] and a["mem_bits"] <= b["mem_bits"] and a["dsp"] <= b["dsp"]
+        better = a["accuracy"] > b["accuracy"] or a["mem_bits"] < b["mem_bits"] or a["dsp"] < b["dsp"]
+        return no_worse and better
+    for r in results:
+        r["pareto"] = not any(dominates(o, r) for o in results)
+    return results
+
+def _pool(float_weights, calib_pixels, images, labels, workers, rounding):
+    """A process pool holding the dataset, or None (evaluate in-process) for workers=1."""
+    initargs = (float_weights, calib_pixels, golden_model.as_images(images), np.asarray(labels), rounding)
+    if workers == 1:
+        _init(*initargs)
+        return contextlib.nullcontext()
+    return ProcessPoolExecutor(workers, initializer=_init, initargs=initargs)
+
+def _evaluate(pool, grid, design=None):
+    """Results of every config of `grid`, in grid order, with resources."""
+    results = [None] * len(grid)
+    if pool is None:
+        for i, config in enumerate(grid):
+            results[i] = evaluate_config(config)
+            _progress(i + 1, len(grid), results[i])
+    else:
+        futures = {pool.submit(evaluate_config, c): i for i, c in enumerate(grid)}
+        for done, future in enumerate(as_completed(futures)):
+            results[futures[future]] = future.result()
+            _progress(done + 1, len(grid), results[futures[future]])
+    return [add_resources(r, design) for r in results]
+
+def sweep(float_weights, calib_pixels, images, labels, grid, workers=None, rounding=ROUNDING, design=None):
+    """
+    Evaluates every config of `grid` in a process pool (workers=1 runs
+    in-process). Returns the results in grid order with resources and
+    Pareto flags.
+    """
+    grid = list(grid)
+    with _pool(float_weights, calib_pixels, images, labels, workers, rounding) as pool:
+        return mark_pareto(_evaluate(pool, grid, design))
+
+def _cost(result):
+    return result["mem_bits"], result["dsp"], -result["accuracy"]
+
+def per_layer_search(float_weights, calib_pixels, images, labels, start, weight_bits=WEIGHT_BITS,
+                     act_bits=ACT_BITS, tolerance=TOLERANCE, workers=None, rounding=ROUNDING, design=None):
+    """
+    Per-layer widths by coordinate descent: from `start` (a result, the
+    best grouped config), one layer's weight or activation width varies at
+    a time and the cheapest width (memory bits, then DSPs) that keeps the
+    accuracy within `tolerance` of the start is kept. Passes repeat until
+    nothing changes or MAX_PASSES. About (len(weight_bits) + len(act_bits))
+    * 5 evaluations per pass. Returns (chosen result, every result seen).
+    """
+    def key(w, a):
+        return tuple(w[l] for l in golden_model.LAYERS) + tuple(a[l] for l in golden_model.LAYERS)
+
+    target = start["accuracy"] - tolerance
+    seen = {key(start["weight_bits"], start["act_bits"]): start}
+    best = start
+    with _pool(float_weights, calib_pixels, images, labels, workers, rounding) as pool:
+        for n in range(MAX_PASSES):
+            moved = False
+            for kind, choices in (("weight_bits", weight_bits), ("act_bits", act_bits)):
+                for layer in golden_model.LAYERS:
+                    grid = []
+                    for b in choices:
+                        cfg = {"weight_bits": dict(best["weight_bits"]), "act_bits": dict(best["act_bits"])}
+                        cfg[kind][layer] = b
+                        grid.append((cfg["weight_bits"], cfg["act_bits"]))
+                    new = [c for c in grid if key(*c) not in seen]
+                    for r in _evaluate(pool, new, design):
+                        seen[key(r["weight_bits"], r["act_bits"])] = r
+                    ok = [seen[key(*c)] for c in grid if seen[key(*c)]["accuracy"] >= target]
+                    choice = min(ok + [best], key=_cost)
+                    if _cost(choice) < _cost(best):
+                        best, moved = choice, True
+            print(f"Pass {n + 1}: {_describe(best)}: {100 * best['accuracy']:.2f}%, "
+                  f"{best['mem_bits'] / 1024:.1f} kbit, {best['dsp']} DSP")
+            if not moved:
+                break
+    return best, mark_pareto(list(seen.values()))
+
+def _progress(done, total, result):
+    print(f"[{done}/{total}] {_describe(result)}: {100 * result['accuracy']:.2f}%", flush=True)
+
+def _describe(result):
+    w = ",".join(f"{l}={result['weight_bits'][l]}" for l in golden_model.LAYERS)
+    a = ",".join(f"{l}={result['act_bits'][l]}" for l in golden_model.LAYERS)
+    return f"w {w}  a {a}"
+
+# --- REPORTS ---
+def print_table(results, weight_groups=None, act_groups=None, pareto_only=True):
+    weight_groups = weight_groups or WEIGHT_GROUPS
+    act_groups = act_groups or ACT_GROUPS
+    shown = sorted((r for r in results if r["pareto"] or not pareto_only),
+                   key=lambda r: (r["mem_bits"], r["dsp"], -r["accuracy"]))
+    front = sum(r["pareto"] for r in results)
+    print(f"{len(results)} configurations, {front} on the accuracy / memory / DSP Pareto front")
+    cols = [f"w:{g}" for g in weight_groups] + [f"a:{g}" for g in act_groups]
+    print("".join(f"{c:>8}" for c in cols)
+          + f"{'Accuracy':>10}{'Mem kbit':>10}{'M10K':>6}{'DSP':>6}{'fc_macs fit':>13}" + ("" if pareto_only else "  Pareto"))
+    for r in shown:
+        bits = ([r["weight_bits"][layers[0]] for layers in weight_groups.values()]
+                + [r["act_bits"][layers[0]] for layers in act_groups.values()])
+        print("".join(f"{b:>8}" for b in bits)
+              + f"{100 * r['accuracy']:>9.2f}%{r['mem_bits'] / 1024:>10.1f}{r['m10k']:>6}{r['dsp']:>6}{r['max_fc_macs']:>13}"
+              + ("" if pareto_only else ("       *" if r["pareto"] else "")))
+
+def _parse_bits(text):
+    """'2-8' or '4,6,8' -> tuple of widths."""
+    if "-" in text:
+        lo, hi = text.split("-")
+        return tuple(range(int(lo), int(hi) + 1))
+    return tuple(int(b) for b in text.split(","))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accuracy vs. weight/activation precision vs. FPGA resources")
+    parser.add_argument("checkpoint", nargs="?", default=None,
+                        help="float weights: checkpoints/<run>.npz or .pt (default: re-quantize the int8 ROM files)")
+    parser.add_argument("--weights", default=".", help="ROM directory used without a checkpoint")
+    parser.add_argument("--data", default=DATA_ROOT)
+    parser.add_argument("--weight-bits", type=_parse_bits, default=WEIGHT_BITS, metavar="2-8")
+    parser.add_argument("--act-bits", type=_parse_bits, default=ACT_BITS, metavar="4-8")
+    parser.add_argument("--per-layer", action="store_true",
+                        help="then search every layer's widths independently, one layer at a time")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="--per-layer: accuracy drop allowed against the best grouped config")
+    parser.add_argument("--rounding", choices=["nearest", "trunc"], default=ROUNDING)
+    parser.add_argument("--count", type=int, default=None, help="test images (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU)")
+    parser.add_argument("--all", action="store_true", help="list every configuration, not only the Pareto front")
+    parser.add_argument("--json", default=None, help="also write the results here")
+    args = parser.parse_args(argv)
+
+    if args.checkpoint is None:
+        float_weights = {l: w.astype(np.float32) for l, w in golden_model.load_weights(args.weights).items()}
+    elif args.checkpoint.endswith(".pt"):
+        import torch
+        float_weights = checkpoint.float_weights(torch.load(args.checkpoint, weights_only=False)["model"])
+    else:
+        float_weights, _ = checkpoint.load_export(args.checkpoint)
+
+    weight_groups, act_groups = WEIGHT_GROUPS, ACT_GROUPS
+    grid = list(configs(weight_groups, act_groups, args.weight_bits, args.act_bits))
+    calib_pixels, _ = hw_eval.load_mnist(args.data, train=True, count=calibrate.CALIB_IMAGES)
+    images, labels = hw_eval.load_mnist(args.data, train=False, count=args.count)
+    print(f"Sweeping {len(grid)} configurations on {len(labels)} test images "
+          f"({args.workers or os.cpu_count()} workers)")
+
+    results = sweep(float_weights, calib_pixels, images, labels, grid, args.workers, args.rounding)
+    print()
+    print_table(results, weight_groups, act_groups, pareto_only=not args.all)
+
+    if args.per_layer:
+        # Start from the most accurate grouped config, cheapest on ties
+        start = min(results, key=lambda r: (-r["accuracy"], r["mem_bits"], r["dsp"]))
+        print(f"\nPer-layer search from {_describe(start)} ({100 * start['accuracy']:.2f}%), "
+              f"tolerance {100 * args.tolerance:.2f}%")
+        best, results = per_layer_search(float_weights, calib_pixels, images, labels, start, args.weight_bits,
+                                         args.act_bits, args.tolerance, args.workers, args.rounding)
+        weight_groups = act_groups = {l: (l,) for l in golden_model.LAYERS}
+        print()
+        print_table(results, weight_groups, act_groups, pareto_only=not args.all)
+        print(f"\nChosen: {_describe(best)}: {100 * best['accuracy']:.2f}%, "
+              f"{best['mem_bits'] / 1024:.1f} kbit, {best['dsp']} DSP")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
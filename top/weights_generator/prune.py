@@ -0,0 +1,64 @@
+import torch
+import torch.nn as nn
+import checkpoint
+import sparse_fc
+
+# --- CONFIGURATION ---
+PRUNE_EPOCHS = 3
+PRUNE_LR = 0.0005
+PRUNE_LAYERS = sparse_fc.SPARSE_LAYERS   # the streaming FC layers a zero-skip engine can use
+
+# --- MASKS ---
+def magnitude_masks(model, sparsity, layers=PRUNE_LAYERS):
+    """{layer: keep-mask tensor}: each layer loses its `sparsity` smallest-magnitude weights."""
+    params = dict(model.named_parameters())
+    return {layer: torch.from_numpy(sparse_fc.magnitude_mask(
+                params[checkpoint.PARAM_NAMES[layer]].detach().cpu().numpy(), sparsity))
+            for layer in layers}
+
+def apply_masks(model, masks):
+    """Zeroes the pruned weights in place (after every optimizer step, so Adam cannot regrow them)."""
+    params = dict(model.named_parameters())
+    with torch.no_grad():
+        for layer, mask in masks.items():
+            params[checkpoint.PARAM_NAMES[layer]].mul_(mask)
+
+def sparsity_of(model, layers=PRUNE_LAYERS):
+    params = dict(model.named_parameters())
+    total = sum(params[checkpoint.PARAM_NAMES[l]].numel() for l in layers)
+    zeros = sum(int((params[checkpoint.PARAM_NAMES[l]] == 0).sum()) for l in layers)
+    return zeros / total
+
+# --- PRUNE + FINE-TUNE ---
+def finetune(model, sparsity, train_loader, test_loader, epochs=PRUNE_EPOCHS, lr=PRUNE_LR, layers=PRUNE_LAYERS):
+    """
+    Gradual magnitude pruning of a trained model: every epoch raises the
+    sparsity of `layers` towards `sparsity`, re-picks the masks on the
+    surviving weights and trains with the pruned weights held at zero.
+    Returns the final masks.
+    """
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    criterion = nn.CrossEntropyLoss()
+    masks = {}
+
+    for epoch in range(epochs):
+        masks = magnitude_masks(model, sparsity * (epoch + 1) / epochs, layers)
+        apply_masks(model, masks)
+        model.train()
+        for data, target in train_loader:
+            optimizer.zero_grad()
+            loss = criterion(model(data), target)
+            loss.backward()
+            optimizer.step()
+            apply_masks(model, masks)
+
+        correct = total = 0
+        model.eval()
+        with torch.no_grad():
+            for data, target in test_loader:
+                predicted = model(data).argmax(dim=1)
+                total += target.size(0)
+                correct += (predicted == target).sum().item()
+        print(f"Prune Epoch {epoch+1}/{epochs} | Sparsity {100 * sparsity_of(model, layers):.1f}% "
+              f"| Test Accuracy: {100 * correct / total:.2f}%")
+    return masks
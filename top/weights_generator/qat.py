@@ -0,0 +1,132 @@
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import golden_model
+import prune
+
+# --- CONFIGURATION ---
+QAT_EPOCHS = 2
+QAT_LR = 0.0002
+# The OUT layer produces int8-range logits; scale them back down before
+# CrossEntropy so the loss isn't saturated from the first step
+QAT_LOGIT_SCALE = 1.0 / 16
+# Input pixel mapping trained through: "mnist" = int(p * 127), what hw_eval
+# and mnist_mif.py feed; "camera" = v // 2 on the 8-bit value, camera.cpp's
+# '/ 2'. They differ by one for about half the values (v=128: 63 vs 64).
+PIXEL_MODES = ("mnist", "camera")
+QAT_PIXELS = "mnist"
+
+# --- STRAIGHT-THROUGH ROUNDING ---
+# Forward: the exact integer operation the hardware does.
+# Backward: identity, so gradients flow through the rounding step.
+class _FloorSTE(torch.autograd.Function):
+    @staticmethod
+    def forward(ctx, x):
+        return torch.floor(x)
+
+    @staticmethod
+    def backward(ctx, grad):
+        return grad
+
+class _TruncSTE(torch.autograd.Function):
+    @staticmethod
+    def forward(ctx, x):
+        return torch.trunc(x)
+
+    @staticmethod
+    def backward(ctx, grad):
+        return grad
+
+def fake_quant_weight(w, scale):
+    """int8 weights exactly as they are exported (calibrate.quantize_weights): int(w * scale), clamped."""
+    return torch.clamp(_TruncSTE.apply(w * scale), -128, 127)
+
+def fake_shift_relu_sat(acc, shift, relu=True):
+    """
+    acc >>> shift (arithmetic, i.e. floor, not rounding), then ReLU and
+    saturation at 127 (or [-128, 127] for the OUT layer). The clamp gives
+    zero gradient to saturated values, like the hardware gives zero signal.
+    """
+    return torch.clamp(_FloorSTE.apply(acc / (1 << shift)), 0 if relu else -128, 127)
+
+def fake_input_pixels(x, mode=QAT_PIXELS):
+    """
+    ToTensor [0, 1] -> FPGA pixels: int(p * 127) ("mnist", hw_eval /
+    mnist_mif.py) or floor(v / 2) of the 8-bit value v = p * 255
+    ("camera", camera.cpp).
+    """
+    if mode == "camera":
+        return _FloorSTE.apply(torch.round(x * 255) / 2)
+    if mode != "mnist":
+        raise ValueError(f"pixel mode must be one of {PIXEL_MODES}, not {mode!r}")
+    return _FloorSTE.apply(x * 127)
+
+# --- QAT MODEL ---
+class QATLeNet5(nn.Module):
+    """
+    Wraps a trained LeNet5 and runs it through the FPGA datapath: int8
+    weights at the per-layer export scale, integer activations, per-layer
+    shift + ReLU + saturate, and fc_streaming's dropped last product.
+    Every value stays an exact integer in float32 (the largest C5 sum is
+    below 2^24), so in eval mode the output matches golden_model bit for bit.
+    Training updates the wrapped model's float weights in place. pixels
+    picks the input mapping (PIXEL_MODES).
+    """
+    def __init__(self, model, scales, shifts, pixels=QAT_PIXELS):
+        super(QATLeNet5, self).__init__()
+        self.model = model
+        self.scales = dict(scales)
+        self.shifts = dict(shifts)
+        self.pixels = pixels
+
+    def _fc(self, x, layer, name, relu=True):
+        w = fake_quant_weight(layer.weight, self.scales[name])
+        if golden_model.FC_DROP_LAST_PRODUCT:
+            x, w = x[:, :-1], w[:, :-1]
+        return fake_shift_relu_sat(F.linear(x, w), self.shifts[name], relu)
+
+    def forward(self, x):
+        m = self.model
+        x = fake_input_pixels(x, self.pixels)
+        x = F.conv2d(x, fake_quant_weight(m.conv1.weight, self.scales["c1"]))
+        x = F.max_pool2d(fake_shift_relu_sat(x, self.shifts["c1"]), 2)
+        x = F.conv2d(x, fake_quant_weight(m.conv2.weight, self.scales["c2"]))
+        x = F.max_pool2d(fake_shift_relu_sat(x, self.shifts["c2"]), 2)
+        x = x.flatten(1)
+        x = self._fc(x, m.fc1, "c5")
+        x = self._fc(x, m.fc2, "f6")
+        return self._fc(x, m.fc3, "out", relu=False)
+
+def qat_loss(criterion, output, target):
+    return criterion(output * QAT_LOGIT_SCALE, target)
+
+def finetune(model, scales, shifts, train_loader, test_loader, epochs=QAT_EPOCHS, lr=QAT_LR, masks=None,
+             pixels=QAT_PIXELS):
+    """
+    Quantization-aware fine-tuning of a float-trained model. Returns the QAT
+    wrapper. masks (prune.finetune) keep pruned weights at zero; pixels
+    selects the input mapping the weights are tuned for.
+    """
+    qat_model = QATLeNet5(model, scales, shifts, pixels)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    criterion = nn.CrossEntropyLoss()
+
+    for epoch in range(epochs):
+        qat_model.train()
+        for data, target in train_loader:
+            optimizer.zero_grad()
+            loss = qat_loss(criterion, qat_model(data), target)
+            loss.backward()
+            optimizer.step()
+            if masks:
+                prune.apply_masks(model, masks)
+
+        correct = total = 0
+        qat_model.eval()
+        with torch.no_grad():
+            for data, target in test_loader:
+                predicted = qat_model(data).argmax(dim=1)
+                total += target.size(0)
+                correct += (predicted == target).sum().item()
+        print(f"QAT Epoch {epoch+1}/{epochs} | Int8 Test Accuracy: {100 * correct / total:.2f}%")
+    return qat_model
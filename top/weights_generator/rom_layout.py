@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import golden_model
+import memfmt
+import rom_manifest
+
+# --- CONFIGURATION ---
+LAYOUT_DIR = "banked_weights"
+DESCRIPTOR_FILE = "layout.json"
+LANE_BITS = 8            # one int8 weight per lane
+ROM_MODULE = "fc_weight_rom"   # one instance per bank, WIDTH = word_bits
+
+# --- LAYOUTS ---
+def parse(spec):
+    """'4x2' -> (4 banks, 2 lanes); '4' -> (4, 1)."""
+    banks, _, lanes = spec.lower().partition("x")
+    return int(banks), int(lanes or 1)
+
+def plan(layer, banks=1, lanes=1):
+    """
+    Descriptor of one layer's banked layout. Output neuron n lives in bank
+    n % banks at local slot n // banks; its inputs fill words_per_neuron
+    consecutive words, `lanes` inputs per word with input i in bits
+    [LANE_BITS * (i % lanes) +: LANE_BITS] of word slot * words_per_neuron
+    + i // lanes. Missing neurons / inputs are zero weights. All banks read
+    the same address each clock, so a banks x lanes engine computes
+    `banks` neurons with `lanes` MACs each.
+    """
+    outputs = golden_model.WEIGHT_SHAPES[layer][0]
+    inputs = int(np.prod(golden_model.WEIGHT_SHAPES[layer][1:]))
+    neurons_per_bank = -(-outputs // banks)
+    words_per_neuron = -(-inputs // lanes)
+    return {
+        "layer": layer,
+        "outputs": outputs,
+        "inputs": inputs,
+        "banks": banks,
+        "lanes": lanes,
+        "lane_bits": LANE_BITS,
+        "word_bits": LANE_BITS * lanes,
+        "neurons_per_bank": neurons_per_bank,
+        "words_per_neuron": words_per_neuron,
+        "depth": neurons_per_bank * words_per_neuron,
+        "files": [f"{LAYOUT_DIR}/{layer}_b{banks}x{lanes}_bank{b}.hex" for b in range(banks)],
+        "module": ROM_MODULE,
+    }
+
+def pack(weights, desc):
+    """(banks, depth, lanes) int8 ROM contents of a layer's weights, lane 0 = least significant."""
+    w = np.asarray(weights, dtype=np.int8).reshape(desc["outputs"], desc["inputs"])
+    padded = np.zeros((desc["neurons_per_bank"] * desc["banks"], desc["words_per_neuron"] * desc["lanes"]), np.int8)
+    padded[:w.shape[0], :w.shape[1]] = w
+    # (slot, bank, word, lane) -> (bank, slot, word, lane)
+    lanes = padded.reshape(desc["neurons_per_bank"], desc["banks"], desc["words_per_neuron"], desc["lanes"])
+    return lanes.transpose(1, 0, 2, 3).reshape(desc["banks"], desc["depth"], desc["lanes"])
+
+def encode(lanes):
+    """
+    $readmemh text of one bank: a word per line, highest lane first. Built
+    lane by lane, so words may be wider than the 64 bits memfmt packs into.
+    """
+    depth = len(lanes)
+    digits = memfmt.encode_words(lanes[:, ::-1].reshape(-1), LANE_BITS, upper=False).reshape(depth, -1)
+    return np.hstack([digits, np.full((depth, 1), ord("\n"), np.uint8)]).tobytes()
+
+def described(root="."):
+    """{layer: (banks, lanes)} of the layouts already written under root."""
+    return {layer: (d["banks"], d["lanes"]) for layer, d in load(root).items()}
+
+def write_layouts(weights, layouts, manifest):
+    """
+    Writes the bank files of every {layer: (banks, lanes)} layout through
+    `manifest` and the descriptor next to them. Layouts already in
+    layout.json are regenerated from `weights` as well, so no bank file
+    outlives the weights it was cut from; the files of a layer's previous
+    layout are deleted when it changes shape. Returns the descriptors.
+    """
+    old = load(manifest.root)
+    layouts = dict(described(manifest.root), **layouts)
+    if not layouts:
+        return {}
+    os.makedirs(os.path.join(manifest.root, LAYOUT_DIR), exist_ok=True)
+    descriptors = {}
+    for layer, (banks, lanes) in layouts.items():
+        desc = plan(layer, banks, lanes)
+        for name, bank in zip(desc["files"], pack(weights[layer], desc)):
+            manifest.write(name, encode(bank), layer, ROM_MODULE)
+        for name in set(old.get(layer, {}).get("files", [])) - set(desc["files"]):
+            manifest.remove(name)
+        descriptors[layer] = desc
+    path = os.path.join(manifest.root, LAYOUT_DIR, DESCRIPTOR_FILE)
+    rom_manifest.write_if_changed(path, (json.dumps(descriptors, indent=2) + "\n").encode())
+    return descriptors
+
+def load(root="."):
+    """{layer: descriptor} of the layouts written under root ({} if none)."""
+    path = os.path.join(root, LAYOUT_DIR, DESCRIPTOR_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+# --- VERIFICATION ---
+def read_banks(desc, root="."):
+    """(banks, depth, lanes) signed lanes parsed back from the bank files."""
+    banks = []
+    for name in desc["files"]:
+        with open(os.path.join(root, name)) as f:
+            words = bytes.fromhex("".join(f.read().split()))
+        banks.append(np.frombuffer(words, np.int8).reshape(-1, desc["lanes"])[:desc["depth"], ::-1])
+    return np.stack(banks).astype(np.int64)
+
+def gather(desc, banks):
+    """
+    Rebuilds the (outputs, inputs) weight matrix from bank words using only
+    the descriptor's addressing rule, one address computation per weight.
+    """
+    n = np.arange(desc["outputs"])[:, None]
+    i = np.arange(desc["inputs"])[None, :]
+    addr = (n // desc["banks"]) * desc["words_per_neuron"] + i // desc["lanes"]
+    return banks[n % desc["banks"], addr, i % desc["lanes"]]
+
+def engine_acc(x, desc, banks):
+    """
+    Accumulators of a banks x lanes engine stepping through the ROM: on
+    every clock all banks read the same address and each bank's MAC adds
+    its `lanes` products for the neuron in that slot. x: (N, inputs).
+    """
+    x = np.asarray(x, dtype=np.int64)
+    padded = np.zeros((len(x), desc["words_per_neuron"] * desc["lanes"]), np.int64)
+    padded[:, :x.shape[1]] = x
+    acc = np.zeros((len(x), desc["neurons_per_bank"] * desc["banks"]), np.int64)
+    for slot in range(desc["neurons_per_bank"]):
+        for word in range(desc["words_per_neuron"]):
+            data = banks[:, slot * desc["words_per_neuron"] + word]     # (banks, lanes)
+            for lane in range(desc["lanes"]):
+                acc[:, slot * desc["banks"]:(slot + 1) * desc["banks"]] += (
+                    padded[:, word * desc["lanes"] + lane, None] * data[None, :, lane])
+    return acc[:, :desc["outputs"]]
+
+def verify(root=".", weights=None, images=None):
+    """
+    Checks every described layout against the golden weights: addressing
+    (gather) and, for FC layers on `images`, the engine's accumulators
+    against golden_model.fc_acc on the same inputs. Returns a list of
+    problems (empty when everything matches).
+    """
+    weights = weights or golden_model.load_weights(root)
+    acts = golden_model.run_lenet(images, weights) if images is not None else None
+    inputs = {"c5": "s4", "f6": "c5", "out": "f6"}
+    problems = []
+    for layer, desc in load(root).items():
+        banks = read_banks(desc, root)
+        expected = np.asarray(weights[layer], dtype=np.int64).reshape(desc["outputs"], desc["inputs"])
+        bad = np.argwhere(gather(desc, banks) != expected)
+        if len(bad):
+            n, i = bad[0]
+            problems.append(f"{layer}: {len(bad)} weights misplaced, first neuron {n} input {i}")
+            continue
+        if acts is not None and layer in inputs:
+            x = acts[inputs[layer]].reshape(len(acts["pred"]), -1)
+            golden = golden_model.fc_acc(x, weights[layer], drop_last=False)
+            if not np.array_equal(engine_acc(x, desc, banks), golden):
+                problems.append(f"{layer}: engine accumulators differ from the golden model")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emit banked / interleaved weight ROMs for N-way parallel MAC engines")
+    parser.add_argument("layouts", nargs="*", metavar="LAYER=BANKSxLANES", help="e.g. c5=4x2 f6=1x8")
+    parser.add_argument("--weights", default=".", help="ROM directory (source weights and output root)")
+    parser.add_argument("--verify", action="store_true", help="check the described layouts against the golden model")
+    parser.add_argument("--images", type=int, default=100, help="test images for the engine check (0: addressing only)")
+    parser.add_argument("--data", default="./data")
+    args = parser.parse_args(argv)
+
+    weights = golden_model.load_weights(args.weights)
+    if args.layouts:
+        layouts = {}
+        for item in args.layouts:
+            layer, _, spec = item.partition("=")
+            if layer not in golden_model.LAYERS:
+                parser.error(f"unknown layer '{layer}'")
+            layouts[layer] = parse(spec)
+        manifest = rom_manifest.Manifest(args.weights)
+        for layer, desc in write_layouts(weights, layouts, manifest).items():
+            print(f"{layer}: {desc['banks']} banks x {desc['lanes']} lanes, "
+                  f"{desc['depth']} x {desc['word_bits']}-bit words per bank")
+        changed = manifest.save()
+        print(f"{len(changed)} bank files changed, descriptor {LAYOUT_DIR}/{DESCRIPTOR_FILE}")
+
+    if args.verify:
+        images = None
+        if args.images:
+            import hw_eval
+            images, _ = hw_eval.load_mnist(args.data, train=False, count=args.images)
+        problems = verify(args.weights, weights, images)
+        for p in problems:
+            print(f"FAIL {p}")
+        if problems:
+            return 1
+        print(f"All {len(load(args.weights))} layouts match the golden model.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+# --- CONFIGURATION ---
+MANIFEST_FILE = "rom_manifest.json"
+VERSION = 1
+
+# RTL module that $readmemh's each layer's ROM files
+ROM_MODULES = {
+    "c1": "layer1_weight_rom",
+    "c2": "layer2_weight_rom",
+    "c5": "fc_weight_rom",
+    "f6": "fc_weight_rom",
+    "out": "fc_weight_rom",
+}
+
+# --- ATOMIC WRITES ---
+def digest(payload):
+    return hashlib.sha256(payload).hexdigest()
+
+def write_if_changed(path, payload):
+    """
+    Writes `payload` to `path` unless the file already holds exactly these
+    bytes, so unchanged files keep their mtime (Quartus incremental
+    compilation and simulator caches key on it). The new content goes to a
+    temporary file that is renamed over the old one: readers never see a
+    half-written ROM. Returns True when the file was written.
+    """
+    if os.path.exists(path) and os.path.getsize(path) == len(payload):
+        with open(path, 'rb') as f:
+            if f.read() == payload:
+                return False
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp, path)
+    return True
+
+# --- MANIFEST ---
+class Manifest:
+    """
+    rom_manifest.json next to the ROM directories: the sha256 and size of
+    every ROM file, the layer and RTL module it feeds, and the export
+    generation in which its bytes last changed. Each export that goes
+    through write() is one generation; "changed" lists what it rewrote.
+    """
+    def __init__(self, root="."):
+        self.root = root
+        self.path = os.path.join(root, MANIFEST_FILE)
+        self.data = load(root)
+        self.generation = self.data["generation"] + 1
+        self.changed = []
+
+    def write(self, name, payload, layer=None, module=None):
+        """Content-checked write of the ROM file `name` (relative to root). Returns True if written."""
+        written = write_if_changed(os.path.join(self.root, name), payload)
+        key = name.replace(os.sep, "/")
+        entry = self.data["files"].get(key, {})
+        if written or entry.get("sha256") != digest(payload):
+            self.changed.append(key)
+            entry = {"generation": self.generation}
+        self.data["files"][key] = dict(entry, sha256=digest(payload), bytes=len(payload),
+                                       layer=layer, module=module or ROM_MODULES.get(layer))
+        return written
+
+    def remove(self, name):
+        """Deletes the ROM file `name` and its entry (a layout that was replaced)."""
+        key = name.replace(os.sep, "/")
+        try:
+            os.remove(os.path.join(self.root, name))
+        except FileNotFoundError:
+            pass
+        if self.data["files"].pop(key, None) is not None:
+            self.changed.append(key)
+
+    def save(self):
+        self.data.update(version=VERSION, generation=self.generation, changed=sorted(self.changed))
+        write_if_changed(self.path, (json.dumps(self.data, indent=2, sort_keys=True) + "\n").encode())
+        return self.changed
+
+def load(root="."):
+    """The manifest dict (an empty generation-0 manifest when there is none yet)."""
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"version": VERSION, "generation": 0, "changed": [], "files": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def changed_since(root=".", since=None):
+    """
+    ROM files changed after `since`: an export generation number (what a
+    build last consumed), the path of an older saved manifest (hashes are
+    compared), or None for the files the latest export rewrote.
+    """
+    current = load(root)
+    if since is None:
+        return list(current["changed"])
+    if isinstance(since, int) or str(since).isdigit():
+        return sorted(k for k, e in current["files"].items() if e["generation"] > int(since))
+    with open(since) as f:
+        old = json.load(f)["files"]
+    return sorted(k for k, e in current["files"].items() if old.get(k, {}).get("sha256") != e["sha256"])
+
+def verify(root="."):
+    """Files whose bytes on disk no longer match the manifest (edited by hand, or missing)."""
+    stale = []
+    for name, entry in load(root)["files"].items():
+        path = os.path.join(root, name)
+        if not os.path.exists(path):
+            stale.append(name)
+            continue
+        with open(path, 'rb') as f:
+            if digest(f.read()) != entry["sha256"]:
+                stale.append(name)
+    return stale
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the ROM manifest written by the weight export")
+    parser.add_argument("command", choices=["changed", "verify", "show"])
+    parser.add_argument("--root", default=".")
+    parser.add_argument("--since", default=None,
+                        help="changed: export generation number or an older rom_manifest.json (default: last export)")
+    parser.add_argument("--modules", action="store_true", help="changed: print the RTL modules to rebuild instead of files")
+    parser.add_argument("--sv-package", default=None,
+                        help="verify: parameter package whose accumulator widths must cover the ROMs (default: top/)")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        manifest = load(args.root)
+        print(f"Generation {manifest['generation']}, {len(manifest['files'])} ROM files")
+        for name, e in sorted(manifest["files"].items()):
+            print(f"  {name:<40} gen {e['generation']:<4} {e['bytes']:>6} B  {e['sha256'][:12]}  {e['module']}")
+        return 0
+    if args.command == "verify":
+        stale = verify(args.root)
+        for name in stale:
+            print(f"STALE {name}")
+        # The RTL truncates its accumulators to the package widths: they
+        # must still hold the worst case of the ROMs on disk
+        import acc_width
+        import calibrate
+        import golden_model
+        sv_package = args.sv_package or calibrate.SV_PACKAGE_FILE
+        short = acc_width.check(golden_model.load_weights(args.root), sv_package)
+        acc_width.print_check(short, sv_package)
+        return 1 if stale or short else 0
+
+    names = changed_since(args.root, args.since)
+    if args.modules:
+        files = load(args.root)["files"]
+        names = sorted({files[n]["module"] for n in names if files.get(n, {}).get("module")})
+    for name in names:
+        print(name)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
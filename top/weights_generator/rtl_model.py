@@ -0,0 +1,351 @@
+import sys
+import time
+import argparse
+import numpy as np
+import golden_model
+
+# --- CONFIGURATION ---
+# fc_streaming.sv state_t, in declaration order
+IDLE, LOAD, COMPUTING, DONE = range(4)
+STATE_NAMES = ("IDLE", "LOAD", "COMPUTING", "DONE")
+RESET_BYTE = -128        # maxpool_buffer resets row_buf and window to 8'h80
+RESET_CYCLES = 1
+BUBBLE = 0.0             # probability that data_valid_in is low on a stimulus cycle
+
+def _wrap(v, bits):
+    """Two's-complement wrap of int64 values to a `bits`-wide signed register."""
+    half = 1 << (bits - 1)
+    return ((np.asarray(v, dtype=np.int64) + half) & ((1 << bits) - 1)) - half
+
+def _as_mask(v, n):
+    return np.broadcast_to(np.asarray(v, dtype=bool), (n,))
+
+# --- FC_STREAMING ---
+class FcStreaming:
+    """
+    n independent fc_streaming instances sharing one weight ROM, stepped one
+    posedge at a time with the RTL's register semantics: every next value
+    is computed from the current registers, then all of them update at
+    once. The fc_weight_rom output q is a register too (one-cycle read
+    latency), so pixel_reg and weight_wire meet one cycle after the fetch,
+    and the clock that emits a neuron clears the accumulator instead of
+    adding its last product (golden_model.FC_DROP_LAST_PRODUCT).
+    """
+    def __init__(self, n, weights, shift, relu=True, acc_width=32):
+        weights = np.asarray(weights, dtype=np.int64)
+        self.num_outputs, self.num_inputs = weights.shape
+        self.rom = _wrap(weights.reshape(-1), 8)
+        self.num_words = len(self.rom)
+        self.addr_bits = max(1, int(np.ceil(np.log2(self.num_words))))
+        self.n = n
+        self.shift = shift
+        self.relu = relu
+        self.acc_width = acc_width
+        # input_ram is an M10K: not cleared by rst (power-up contents: 0)
+        self.ram = np.zeros((n, self.num_inputs), np.int64)
+        self.q = np.zeros(n, np.int64)
+        names = ("state", "wr_ptr", "rd_ptr", "weight_addr", "accumulator", "pixel_reg", "pipeline_valid",
+                 "acc_counter", "output_count", "data_valid_out", "data_out", "layer_done_reg")
+        self.regs = {name: np.zeros(n, np.int64) for name in names}
+        self.cycle = 0
+
+    def outputs(self):
+        r = self.regs
+        return r["data_out"], r["data_valid_out"].astype(bool), r["layer_done_reg"].astype(bool)
+
+    def step(self, data_in, data_valid_in, rst=False):
+        """One posedge. data_in / data_valid_in / rst: scalars or (n,) arrays."""
+        r = self.regs
+        nxt = {k: v.copy() for k, v in r.items()}
+        data_in = _wrap(np.broadcast_to(data_in, (self.n,)), 8)
+        valid = _as_mask(data_valid_in, self.n)
+        state = r["state"]
+
+        # fc_weight_rom: q <= mem[addr] on every clock, addr truncated to the port width.
+        # Out-of-range addresses read X in simulation; they are never consumed (0 here)
+        addr = r["weight_addr"] & ((1 << self.addr_bits) - 1)
+        q_next = np.where(addr < self.num_words, self.rom[np.minimum(addr, self.num_words - 1)], 0)
+
+        # IDLE / LOAD: capture into the ring buffer
+        write = valid & ((state == IDLE) | (state == LOAD))
+        rows = np.nonzero(write)[0]
+        self.ram[rows, r["wr_ptr"][rows]] = data_in[rows]
+        idle = write & (state == IDLE)
+        nxt["wr_ptr"][idle] = r["wr_ptr"][idle] + 1
+        nxt["state"][idle] = LOAD
+        load = write & (state == LOAD)
+        full = load & (r["wr_ptr"] == self.num_inputs - 1)
+        nxt["wr_ptr"][load & ~full] = r["wr_ptr"][load & ~full] + 1
+        nxt["state"][full] = COMPUTING
+        for k in ("wr_ptr", "rd_ptr", "weight_addr", "acc_counter", "output_count", "pipeline_valid", "accumulator"):
+            nxt[k][full] = 0
+
+        # COMPUTING: fetch, then multiply-accumulate what the last clock fetched
+        comp = state == COMPUTING
+        nxt["data_valid_out"][comp] = 0
+        nxt["pixel_reg"][comp] = self.ram[comp, r["rd_ptr"][comp]]
+        nxt["rd_ptr"][comp] = np.where(r["rd_ptr"][comp] == self.num_inputs - 1, 0, r["rd_ptr"][comp] + 1)
+        bump = comp & (r["weight_addr"] != self.num_words)
+        nxt["weight_addr"][bump] = r["weight_addr"][bump] + 1
+        nxt["pipeline_valid"][comp] = 1
+        mac = comp & (r["pipeline_valid"] == 1)
+        nxt["accumulator"][mac] = _wrap(r["accumulator"][mac] + r["pixel_reg"][mac] * self.q[mac], self.acc_width)
+        emit = mac & (r["acc_counter"] == self.num_inputs - 1)
+        nxt["acc_counter"][mac & ~emit] = r["acc_counter"][mac & ~emit] + 1
+        nxt["acc_counter"][emit] = 0
+        # scaled_acc_wire is the accumulator before this clock's product
+        scaled = r["accumulator"][emit] >> self.shift
+        nxt["data_out"][emit] = np.clip(scaled, 0 if self.relu else -128, 127)
+        nxt["data_valid_out"][emit] = 1
+        nxt["accumulator"][emit] = 0
+        last = emit & (r["output_count"] == self.num_outputs - 1)
+        nxt["state"][last] = DONE
+        nxt["output_count"][emit & ~last] = r["output_count"][emit & ~last] + 1
+
+        # DONE: one clock, then back to IDLE (layer_done_reg stays set until rst)
+        done = state == DONE
+        nxt["data_valid_out"][done] = 0
+        nxt["layer_done_reg"][done] = 1
+        nxt["state"][done] = IDLE
+        nxt["wr_ptr"][done] = 0
+        nxt["rd_ptr"][done] = 0
+
+        # Synchronous reset wins over everything but the ROM and the RAM
+        reset = _as_mask(rst, self.n)
+        for k in nxt:
+            nxt[k][reset] = 0
+
+        self.regs = nxt
+        self.q = q_next
+        self.cycle += 1
+        return self.outputs()
+
+    def run(self, data, valid, rst=None, trace=False):
+        """
+        Steps through a (T, n) stimulus. Returns the emitted outputs
+        {"outputs" (n, NUM_OUTPUTS), "valid_cycles" (n, NUM_OUTPUTS),
+        "done_cycle" (n,), -1 if never}, plus "trace" when asked: data_out,
+        data_valid_out, done and state after every clock edge, (T, n) each.
+        Cycle t is the edge that consumed stimulus row t.
+        """
+        steps = len(data)
+        rst = np.zeros(steps, bool) if rst is None else np.asarray(rst, dtype=bool)
+        events = []
+        done_cycle = np.full(self.n, -1, np.int64)
+        dense = {k: np.zeros((steps, self.n), t) for k, t in
+                 (("data_out", np.int8), ("data_valid_out", bool), ("done", bool), ("state", np.int8))} if trace else None
+        for t in range(steps):
+            out, dv, done = self.step(data[t], valid[t], rst[t])
+            hit = np.nonzero(dv)[0]
+            if len(hit):
+                events.append((np.full(len(hit), t), hit, out[hit]))
+            done_cycle[(done_cycle < 0) & done] = t
+            if trace:
+                dense["data_out"][t], dense["data_valid_out"][t], dense["done"][t] = out, dv, done
+                dense["state"][t] = self.regs["state"]
+        result = {"done_cycle": done_cycle}
+        result.update(_collect(events, self.n, self.num_outputs))
+        if trace:
+            result["trace"] = dense
+        return result
+
+def _collect(events, n, per_instance):
+    """Valid pulses, grouped per instance in cycle order -> (n, per_instance) values and cycles."""
+    if not events:
+        return {"outputs": np.zeros((n, 0), np.int64), "valid_cycles": np.zeros((n, 0), np.int64)}
+    cycles, inst, values = (np.concatenate(c) for c in zip(*events))
+    order = np.lexsort((cycles, inst))
+    counts = np.bincount(inst, minlength=n)
+    if not (counts == per_instance).all():
+        raise ValueError(f"instances emitted {counts.min()}..{counts.max()} outputs, expected {per_instance}")
+    return {"outputs": values[order].reshape(n, per_instance), "valid_cycles": cycles[order].reshape(n, per_instance)}
+
+def fc_stimulus(x, num_outputs, bubble=BUBBLE, rng=None, reset=RESET_CYCLES):
+    """
+    (data, valid, rst), each (T, n): `reset` clocks of rst, then every
+    instance streams its row of x (n, NUM_INPUTS), each cycle's valid low
+    with probability `bubble`, then idles long enough to finish.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    n, inputs = x.shape
+    rng = rng or np.random.default_rng(0)
+    # Cycle of each input per instance: cumulative count of bubble-free cycles
+    gaps = rng.geometric(1 - bubble, size=(n, inputs)) if bubble > 0 else np.ones((n, inputs), np.int64)
+    when = reset + np.cumsum(gaps, axis=1) - 1
+    steps = int(when.max()) + 1 + inputs * num_outputs + 4
+    data = np.zeros((steps, n), np.int64)
+    valid = np.zeros((steps, n), bool)
+    cols = np.broadcast_to(np.arange(n), (inputs, n)).T
+    data[when, cols] = x
+    valid[when, cols] = True
+    rst = np.zeros(steps, bool)
+    rst[:reset] = True
+    return data, valid, rst
+
+def fc_expected(x, weights, shift, relu=True, acc_width=32):
+    """What every instance must emit: golden_model's FC layer with the accumulator wrapped to acc_width."""
+    acc = golden_model.fc_acc(np.asarray(x), np.asarray(weights))
+    return np.clip(_wrap(acc, acc_width) >> shift, 0 if relu else -128, 127)
+
+# --- MAXPOOL_BUFFER ---
+class MaxpoolBuffer:
+    """
+    n maxpool_buffer instances: a LENGTH-deep row_buf shift register and the
+    2x2 window, both reset to 8'h80 and shifted only on data_valid_in.
+    line_out is row_buf[LENGTH-1] (combinational).
+    """
+    def __init__(self, n, length=28):
+        self.n = n
+        self.length = length
+        self.row_buf = np.full((n, length), RESET_BYTE, np.int64)
+        self.window = np.full((n, 2, 2), RESET_BYTE, np.int64)
+        self.cycle = 0
+
+    @property
+    def line_out(self):
+        return self.row_buf[:, -1]
+
+    def step(self, pixel_in, data_valid_in, rst=False):
+        """One posedge. Returns (line_out, window (n, 2, 2)) after it."""
+        pixel_in = _wrap(np.broadcast_to(pixel_in, (self.n,)), 8)
+        valid = _as_mask(data_valid_in, self.n)
+        reset = _as_mask(rst, self.n)
+        shift = valid & ~reset
+        taps = (pixel_in, self.row_buf[:, -1])          # taps[0], taps[1] before the edge
+        window = self.window.copy()
+        window[shift, :, 0] = self.window[shift, :, 1]
+        window[shift, 0, 1] = taps[1][shift]
+        window[shift, 1, 1] = taps[0][shift]
+        row_buf = self.row_buf.copy()
+        row_buf[shift, 1:] = self.row_buf[shift, :-1]
+        row_buf[shift, 0] = pixel_in[shift]
+        row_buf[reset] = RESET_BYTE
+        window[reset] = RESET_BYTE
+        self.row_buf, self.window = row_buf, window
+        self.cycle += 1
+        return self.line_out, self.window
+
+    def run(self, pixels, valid, rst=None, trace=False):
+        """
+        Steps through (T, n) pixels / valid. Returns "windows": the window
+        after each accepted pixel, (n, pixels per instance, 2, 2), and with
+        trace the dense (T, n) line_out and (T, n, 2, 2) window.
+        """
+        steps = len(pixels)
+        rst = np.zeros(steps, bool) if rst is None else np.asarray(rst, dtype=bool)
+        events = []
+        dense = {"line_out": np.zeros((steps, self.n), np.int8),
+                 "window": np.zeros((steps, self.n, 2, 2), np.int8)} if trace else None
+        for t in range(steps):
+            line, window = self.step(pixels[t], valid[t], rst[t])
+            hit = np.nonzero(np.asarray(valid[t], dtype=bool) & ~np.asarray(rst[t], dtype=bool))[0]
+            if len(hit):
+                events.append((np.full(len(hit), t), hit, window[hit]))
+            if trace:
+                dense["line_out"][t], dense["window"][t] = line, window
+        cycles, inst, windows = (np.concatenate(c) for c in zip(*events))
+        order = np.lexsort((cycles, inst))
+        per = len(inst) // self.n
+        result = {"windows": windows[order].reshape(self.n, per, 2, 2),
+                  "valid_cycles": cycles[order].reshape(self.n, per)}
+        if trace:
+            result["trace"] = dense
+        return result
+
+def stream_stimulus(maps, bubble=BUBBLE, rng=None, reset=RESET_CYCLES):
+    """(pixels, valid, rst) streaming every (H, W) map of `maps` (n, H, W) row-major, with bubbles."""
+    flat = np.asarray(maps, dtype=np.int64).reshape(len(maps), -1)
+    n, count = flat.shape
+    rng = rng or np.random.default_rng(0)
+    gaps = rng.geometric(1 - bubble, size=(n, count)) if bubble > 0 else np.ones((n, count), np.int64)
+    when = reset + np.cumsum(gaps, axis=1) - 1
+    steps = int(when.max()) + 1
+    pixels = np.zeros((steps, n), np.int64)
+    valid = np.zeros((steps, n), bool)
+    cols = np.broadcast_to(np.arange(n), (count, n)).T
+    pixels[when, cols] = flat
+    valid[when, cols] = True
+    rst = np.zeros(steps, bool)
+    rst[:reset] = True
+    return pixels, valid, rst
+
+def window_expected(maps, length):
+    """
+    Window after accepted pixel i of the stream s: [[s[i-L-1], s[i-L]],
+    [s[i-1], s[i]]], anything before the stream being the 8'h80 reset value.
+    """
+    flat = np.asarray(maps, dtype=np.int64).reshape(len(maps), -1)
+    s = np.pad(flat, ((0, 0), (length + 1, 0)), constant_values=RESET_BYTE)
+    i = np.arange(flat.shape[1]) + length + 1
+    return np.stack([np.stack([s[:, i - length - 1], s[:, i - length]], -1),
+                     np.stack([s[:, i - 1], s[:, i]], -1)], -2)
+
+# --- CLI ---
+FC_INPUTS = {"c5": "s4", "f6": "c5", "out": "f6"}
+POOL_INPUTS = {"c1": 28, "c2": 10}
+
+def main(argv=None):
+    import calibrate
+    import hw_eval
+    parser = argparse.ArgumentParser(description="Clock-stepped, vectorized models of fc_streaming and maxpool_buffer")
+    parser.add_argument("block", choices=["fc", "maxpool"])
+    parser.add_argument("--layer", default=None, help="fc: c5 / f6 / out (default f6); maxpool: c1 / c2 (default c1)")
+    parser.add_argument("--instances", type=int, default=1000, help="test images, one instance each")
+    parser.add_argument("--bubble", type=float, default=BUBBLE, help="probability of a data_valid_in gap per cycle")
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--data", default=hw_eval.DATA_ROOT)
+    parser.add_argument("--trace", default=None, help="save the dense per-cycle trace to this .npz")
+    args = parser.parse_args(argv)
+
+    weights = golden_model.load_weights(args.weights)
+    shifts = calibrate.load_shifts(args.weights)
+    images, _ = hw_eval.load_mnist(args.data, train=False, count=args.instances)
+    acts = golden_model.run_lenet(images, weights, shifts)
+    t0 = time.perf_counter()
+
+    if args.block == "fc":
+        layer = args.layer or "f6"
+        if layer not in FC_INPUTS:
+            parser.error(f"fc layers: {', '.join(FC_INPUTS)}")
+        acc_width = calibrate.load_params(args.weights).get("acc_widths", {}).get(layer, 32)
+        x = acts[FC_INPUTS[layer]].reshape(len(images), -1)
+        data, valid, rst = fc_stimulus(x, weights[layer].shape[0], args.bubble)
+        model = FcStreaming(len(x), weights[layer], shifts[layer], relu=layer != "out", acc_width=acc_width)
+        result = model.run(data, valid, rst, trace=bool(args.trace))
+        bad = np.nonzero((result["outputs"] != fc_expected(x, weights[layer], shifts[layer], layer != "out",
+                                                           acc_width)).any(axis=1))[0]
+        last_input = np.array([np.nonzero(valid[:, k])[0][-1] for k in range(len(x))])
+        latency = result["valid_cycles"][:, -1] - last_input
+        print(f"{layer.upper()}: {len(x)} instances, {len(data)} cycles, ACC_WIDTH {acc_width}")
+        print(f"  last input -> last data_valid_out: {latency.min()}..{latency.max()} cycles, "
+              f"done {int((result['done_cycle'] - result['valid_cycles'][:, -1]).max())} cycles later")
+    else:
+        layer = args.layer or "c1"
+        if layer not in POOL_INPUTS:
+            parser.error(f"maxpool layers: {', '.join(POOL_INPUTS)}")
+        length = POOL_INPUTS[layer]
+        # One instance per image, channel 0's map as maxpool_engine sees it
+        maps = acts[layer][:, 0]
+        pixels, valid, rst = stream_stimulus(maps, args.bubble)
+        model = MaxpoolBuffer(len(maps), length)
+        data = pixels
+        result = model.run(pixels, valid, rst, trace=bool(args.trace))
+        bad = np.nonzero((result["windows"] != window_expected(maps, length)).any(axis=(1, 2, 3)))[0]
+        pooled = result["windows"].reshape(len(maps), length, length, 2, 2)[:, 1::2, 1::2].max(axis=(3, 4))
+        bad = np.union1d(bad, np.nonzero((pooled != golden_model.maxpool2x2(maps[:, None])[:, 0])
+                                         .any(axis=(1, 2)))[0])
+        print(f"{layer.upper()} maxpool_buffer (LENGTH {length}): {len(maps)} instances, {len(pixels)} cycles")
+
+    elapsed = time.perf_counter() - t0
+    print(f"  {len(data) * model.n / elapsed / 1e6:.2f} M instance-cycles/s ({elapsed:.2f} s)")
+    if args.trace:
+        np.savez_compressed(args.trace, **result["trace"])
+        print(f"  Wrote {args.trace}")
+    if len(bad):
+        print(f"FAIL: {len(bad)} instances differ from the golden model, first {bad[0]}")
+        return 1
+    print("  All instances match the golden model.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import sys
+import json
+import time
+import argparse
+import itertools
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import golden_model
+import camera_pipeline as cam
+
+# --- CONFIGURATION ---
+WINDOW = golden_model.MAPSIZE     # 32x32 LeNet input
+STRIDE = 4                        # S2 and S4 each halve the map: windows 4 pixels apart share every feature
+CORE = 20                         # the MNIST digit box inside a window (28x28 digit, 20x20 ink, +2 pad)
+DIGIT_HEIGHT = 60                 # expected digit height in the camera crop, pixels; scaled to CORE
+PAD = 12                          # zero border so digits touching the crop edge still get centred windows
+SCORE_THRESH = 0.5
+NMS_IOU = 0.1                     # digit cores of neighbouring digits barely touch
+MIN_INK = 12                      # pixels of ink a window core needs to be a candidate at all
+MAX_COM_OFFSET = 3.0              # MNIST digits are centred by mass; off-centre windows see half a digit
+# int8 logits -> softmax temperature, the scale QAT trains the logits with (qat.QAT_LOGIT_SCALE)
+LOGIT_SCALE = 1.0 / 16
+
+# --- FRAME -> PIXEL MAP ---
+def frame_pixels(frame, box=cam.TARGET_BOX, digit_height=DIGIT_HEIGHT, pad=PAD):
+    """
+    The camera crop as one FPGA pixel map: camera.cpp's blur, inverted
+    threshold and glue dilation, scaled so a digit_height-tall digit spans
+    CORE pixels like an MNIST digit, then 0/127 ink and a zero border.
+    box=None uses the whole frame. Returns (pixels (H, W) int64, scale).
+    """
+    if box is not None:
+        x, y, w, h = box
+        if frame.shape[0] < y + h or frame.shape[1] < x + w:
+            raise ValueError(f"frame {frame.shape[1]}x{frame.shape[0]} does not contain the target box {box}")
+        frame = frame[y:y + h, x:x + w]
+    binary = cam.gaussian_blur5(cam.bgr_to_gray(frame)) <= cam.THRESH_VAL
+    binary = cam.dilate_rect(binary, max(1, cam.GLUE_AMOUNT))
+    scale = CORE / digit_height
+    h, w = binary.shape
+    small = cam.resize_area(binary.astype(np.uint8) * 255, max(1, round(w * scale)), max(1, round(h * scale)))
+    pixels = np.where(small > 127, 127, 0)
+    return np.pad(pixels, pad).astype(np.int64), scale
+
+# --- SHARED FEATURES + HEAD ---
+def feature_maps(pixels, weights, shifts=None):
+    """
+    C1 -> S2 -> C2 -> S4 over the whole pixel map at once. Every stride-4
+    window's S4 block is the 5x5 slice of this S4 map at (y/4, x/4), bit
+    for bit, because its pooling grids line up with the map's.
+    Returns S4 as (16, Hs, Ws) int8.
+    """
+    shifts = dict(golden_model.RTL_SHIFTS, **(shifts or {}))
+    # The pixel bus is signed 8-bit, as in golden_model.as_images
+    x = np.asarray(pixels, dtype=np.int64).astype(np.int8)[None, None]
+    for layer in ("c1", "c2"):
+        acc = golden_model.conv_acc(x, weights[layer])
+        c = golden_model.requantize(acc, shifts[layer])
+        h, w = c.shape[2] // 2 * 2, c.shape[3] // 2 * 2
+        x = golden_model.maxpool2x2(c[:, :, :h, :w])
+    return x[0]
+
+def head_logits(s4, weights, shifts=None):
+    """
+    C5 -> F6 -> OUT at every window position of the S4 map: (Hp, Wp, 10)
+    int8 logits; position (i, j) is the window at pixel (STRIDE*i, STRIDE*j).
+    """
+    shifts = dict(golden_model.RTL_SHIFTS, **(shifts or {}))
+    k = WINDOW // STRIDE - 3          # S4 side of one window (5)
+    # (16, Hp, Wp, 5, 5) -> (Hp * Wp, 400), channel-major like s4_ram
+    win = sliding_window_view(s4, (k, k), axis=(1, 2))
+    hp, wp = win.shape[1:3]
+    x = win.transpose(1, 2, 0, 3, 4).reshape(hp * wp, -1)
+    for layer in ("c5", "f6", "out"):
+        x = golden_model.requantize(golden_model.fc_acc(x, weights[layer]), shifts[layer], relu=layer != "out")
+    return x.reshape(hp, wp, -1)
+
+def window_stats(pixels, hp, wp):
+    """
+    Ink count and centre-of-mass offset of every window core, from
+    integral images: one cumsum each, no per-window work.
+    """
+    ink = (pixels > 0).astype(np.int64)
+    ys, xs = np.indices(ink.shape)
+
+    def box_sums(a):
+        s = np.pad(a.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+        y0 = STRIDE * np.arange(hp)[:, None] + (WINDOW - CORE) // 2
+        x0 = STRIDE * np.arange(wp)[None, :] + (WINDOW - CORE) // 2
+        return s[y0 + CORE, x0 + CORE] - s[y0, x0 + CORE] - s[y0 + CORE, x0] + s[y0, x0]
+
+    count = box_sums(ink)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cy = box_sums(ink * ys) / count
+        cx = box_sums(ink * xs) / count
+    centre_y = STRIDE * np.arange(hp)[:, None] + WINDOW / 2 - 0.5
+    centre_x = STRIDE * np.arange(wp)[None, :] + WINDOW / 2 - 0.5
+    return count, np.hypot(cy - centre_y, cx - centre_x)
+
+def heatmap(pixels, weights, shifts=None):
+    """
+    Digit heatmap of a pixel map: {"logits" (Hp, Wp, 10) int8, "prob"
+    softmax, "digit" argmax, "score" its probability, zero where the core
+    has too little or off-centre ink}.
+    """
+    logits = head_logits(feature_maps(pixels, weights, shifts), weights, shifts)
+    z = logits.astype(np.float64) * LOGIT_SCALE
+    prob = np.exp(z - z.max(axis=2, keepdims=True))
+    prob /= prob.sum(axis=2, keepdims=True)
+    count, offset = window_stats(pixels, *logits.shape[:2])
+    centred = (count >= MIN_INK) & (offset <= MAX_COM_OFFSET)
+    return {"logits": logits, "prob": prob, "digit": logits.argmax(axis=2),
+            "score": np.where(centred, prob.max(axis=2), 0.0)}
+
+# --- DETECTIONS ---
+def iou(a, b):
+    ix = max(0.0, min(a["x"] + a["w"], b["x"] + b["w"]) - max(a["x"], b["x"]))
+    iy = max(0.0, min(a["y"] + a["h"], b["y"] + b["h"]) - max(a["y"], b["y"]))
+    inter = ix * iy
+    return inter / (a["w"] * a["h"] + b["w"] * b["h"] - inter)
+
+def nms(detections, threshold=NMS_IOU):
+    """Greedy non-maximum suppression, class-agnostic: one digit per place."""
+    kept = []
+    for d in sorted(detections, key=lambda d: -d["score"]):
+        if all(iou(d, k) <= threshold for k in kept):
+            kept.append(d)
+    return kept
+
+def detect(heat, scale, box=cam.TARGET_BOX, pad=PAD, score_thresh=SCORE_THRESH, iou_thresh=NMS_IOU):
+    """
+    Heatmap peaks -> NMS'd detections with their digit core boxes in frame
+    coordinates, sorted left to right.
+    """
+    ox, oy = (box[0], box[1]) if box is not None else (0, 0)
+    off = (WINDOW - CORE) // 2
+    candidates = [{"digit": int(heat["digit"][i, j]), "score": float(heat["score"][i, j]),
+                   "x": ox + (STRIDE * j + off - pad) / scale, "y": oy + (STRIDE * i + off - pad) / scale,
+                   "w": CORE / scale, "h": CORE / scale}
+                  for i, j in zip(*np.nonzero(heat["score"] >= score_thresh))]
+    return sorted(nms(candidates, iou_thresh), key=lambda d: d["x"])
+
+def read_frame(frame, weights, shifts=None, box=cam.TARGET_BOX, digit_height=DIGIT_HEIGHT):
+    """One frame -> (digit string, detections, heatmap)."""
+    pixels, scale = frame_pixels(frame, box, digit_height)
+    heat = heatmap(pixels, weights, shifts)
+    dets = detect(heat, scale, box)
+    return "".join(str(d["digit"]) for d in dets), dets, heat
+
+# --- REFERENCE ---
+def windowed_logits(pixels, weights, shifts=None, positions=None):
+    """
+    The per-window way: cut every stride-4 32x32 window (or `positions`)
+    out of the map and run the whole network on each. Only for checking
+    head_logits and measuring what sharing saves.
+    """
+    hp = (pixels.shape[0] - WINDOW) // STRIDE + 1
+    wp = (pixels.shape[1] - WINDOW) // STRIDE + 1
+    positions = positions if positions is not None else list(itertools.product(range(hp), range(wp)))
+    crops = np.stack([pixels[STRIDE * i:STRIDE * i + WINDOW, STRIDE * j:STRIDE * j + WINDOW] for i, j in positions])
+    return golden_model.run_lenet(crops, weights, shifts)["out"], positions
+
+def check(pixels, weights, shifts=None):
+    """Mismatching positions between the shared-feature head and per-window inference."""
+    shared = head_logits(feature_maps(pixels, weights, shifts), weights, shifts)
+    positions = list(itertools.product(range(shared.shape[0]), range(shared.shape[1])))
+    ref, _ = windowed_logits(pixels, weights, shifts, positions)
+    return [p for p, r in zip(positions, ref) if not np.array_equal(shared[p], r)]
+
+def main(argv=None):
+    import calibrate
+    parser = argparse.ArgumentParser(description="Multi-digit sliding-window inference over the camera crop")
+    parser.add_argument("source", help="recording (.npy/.npz stack, image directory or image) or 'camera'")
+    parser.add_argument("--camera-index", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many frames")
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--full-frame", action="store_true", help="scan the whole frame, not the target box")
+    parser.add_argument("--digit-height", type=float, default=DIGIT_HEIGHT, help="digit height in the frame, pixels")
+    parser.add_argument("--check", action="store_true",
+                        help="verify every frame against per-window inference and time both")
+    parser.add_argument("--heatmaps", default=None, help="save the per-frame heatmaps to this .npz")
+    parser.add_argument("--detections", default=None, help="write the detections as JSON lines")
+    args = parser.parse_args(argv)
+
+    weights = golden_model.load_weights(args.weights)
+    shifts = calibrate.load_shifts(args.weights)
+    box = None if args.full_frame else cam.TARGET_BOX
+    frames = cam.camera_frames(args.camera_index) if args.source == "camera" else cam.recorded_frames(args.source)
+    if args.limit is not None:
+        frames = itertools.islice(frames, args.limit)
+
+    heatmaps, lines, elapsed, windowed, failures = {}, [], 0.0, 0.0, 0
+    for n, frame in enumerate(frames):
+        frame = np.asarray(frame)
+        t0 = time.perf_counter()
+        text, dets, heat = read_frame(frame, weights, shifts, box, args.digit_height)
+        elapsed += time.perf_counter() - t0
+        print(f"frame {n:5d}: '{text}'" + "".join(f"  {d['digit']}@({d['x']:.0f},{d['y']:.0f}) {d['score']:.2f}"
+                                                  for d in dets))
+        if args.check:
+            pixels, _ = frame_pixels(frame, box, args.digit_height)
+            t0 = time.perf_counter()
+            windowed_logits(pixels, weights, shifts)
+            windowed += time.perf_counter() - t0
+            bad = check(pixels, weights, shifts)
+            if bad:
+                failures += 1
+                print(f"  MISMATCH at {len(bad)} positions, first {bad[0]}")
+        if args.heatmaps:
+            heatmaps[f"frame_{n:05d}_score"] = heat["score"]
+            heatmaps[f"frame_{n:05d}_digit"] = heat["digit"]
+        lines.append({"frame": n, "text": text, "detections": dets})
+
+    if not lines:
+        print("No frames.")
+        return 1
+    print(f"\n{len(lines)} frames, {1000 * elapsed / len(lines):.2f} ms/frame ({len(lines) / elapsed:.1f} fps)")
+    if args.check:
+        print(f"Per-window inference: {1000 * windowed / len(lines):.2f} ms/frame "
+              f"({windowed / elapsed:.1f}x slower), {failures} frames mismatched")
+    if args.heatmaps:
+        np.savez_compressed(args.heatmaps, **heatmaps)
+        print(f"Wrote {args.heatmaps}")
+    if args.detections:
+        with open(args.detections, 'w') as f:
+            f.writelines(json.dumps(line) + "\n" for line in lines)
+        print(f"Wrote {args.detections}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
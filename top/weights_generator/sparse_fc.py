@@ -0,0 +1,179 @@
+import os
+import sys
+import argparse
+import numpy as np
+import golden_model
+import memfmt
+import perf_model
+
+# --- CONFIGURATION ---
+SPARSE_LAYERS = ("c5", "f6", "out")
+SPARSE_FILES = {l: f"fc_weights/{l}_weights_sparse.hex" for l in SPARSE_LAYERS}
+WEIGHT_BITS = 8
+
+# --- PRUNING ---
+def magnitude_mask(w, sparsity):
+    """
+    Keep-mask that zeroes the `sparsity` fraction of smallest-magnitude
+    weights of one layer (ties at the threshold are pruned too). Shared by
+    prune.py during training and --prune on exported ROMs.
+    """
+    w = np.asarray(w)
+    k = int(round(sparsity * w.size))
+    if k <= 0:
+        return np.ones(w.shape, bool)
+    threshold = np.partition(np.abs(w).ravel(), k - 1)[k - 1]
+    return np.abs(w) > threshold
+
+def prune_weights(weights, sparsity, layers=SPARSE_LAYERS):
+    """Int weights with each of `layers` magnitude-pruned to `sparsity` (no fine-tuning)."""
+    return {l: np.where(magnitude_mask(w, sparsity), w, 0).astype(w.dtype) if l in layers else w
+            for l, w in weights.items()}
+
+# --- COMPRESSED FORMAT ---
+def index_bits(inputs):
+    return max(1, int(np.ceil(np.log2(inputs))))
+
+def word_bits(inputs):
+    """{last, index, weight}: one stream word per nonzero weight."""
+    return 1 + index_bits(inputs) + WEIGHT_BITS
+
+def compress(w, drop_last=golden_model.FC_DROP_LAST_PRODUCT):
+    """
+    Zero-skip stream of one FC layer, neuron-major: an entry (index, weight)
+    per nonzero, "last" set on each neuron's final entry. A neuron without
+    nonzeros keeps one (0, 0) entry so it still emits an output. With
+    drop_last the weight of the last input is left out, exactly like
+    fc_streaming never adds that product.
+    """
+    w = np.asarray(w, dtype=np.int64)
+    inputs = w.shape[1]
+    if drop_last:
+        w = w[:, :-1]
+    keep = w != 0
+    empty = ~keep.any(axis=1)
+    keep[empty, 0] = True
+    neuron, index = np.nonzero(keep)
+    last = np.zeros(len(neuron), bool)
+    last[np.r_[np.flatnonzero(np.diff(neuron)), len(neuron) - 1]] = True
+    return {"index": index, "weight": w[neuron, index], "last": last,
+            "outputs": w.shape[0], "inputs": inputs}
+
+def encode(entries):
+    """Stream words {last, index, weight} as $readmemh text."""
+    inputs = entries["inputs"]
+    words = ((entries["last"].astype(np.int64) << (index_bits(inputs) + WEIGHT_BITS))
+             | (entries["index"] << WEIGHT_BITS) | (entries["weight"] & 0xFF))
+    return memfmt.encode_hex(words, word_bits(inputs), upper=False)
+
+def decode(words, outputs, inputs):
+    """Entries back from stream words (the inverse of encode)."""
+    words = np.asarray(words, dtype=np.int64)
+    weight = words & 0xFF
+    return {"index": (words >> WEIGHT_BITS) & ((1 << index_bits(inputs)) - 1),
+            "weight": (weight ^ 0x80) - 0x80,
+            "last": ((words >> (index_bits(inputs) + WEIGHT_BITS)) & 1).astype(bool),
+            "outputs": outputs, "inputs": inputs}
+
+def write_sparse(weights, manifest):
+    """Writes SPARSE_FILES through the ROM manifest. Returns {layer: entries}."""
+    sparse = {}
+    for layer in SPARSE_LAYERS:
+        sparse[layer] = compress(weights[layer])
+        manifest.write(SPARSE_FILES[layer], encode(sparse[layer]), layer)
+    return sparse
+
+def load_sparse(root="."):
+    sparse = {}
+    for layer in SPARSE_LAYERS:
+        outputs, inputs = golden_model.WEIGHT_SHAPES[layer]
+        words = memfmt.read_hex(os.path.join(root, SPARSE_FILES[layer]), word_bits(inputs))
+        sparse[layer] = decode(words, outputs, inputs)
+    return sparse
+
+# --- INTEGER REFERENCE ---
+def sparse_acc(x, entries):
+    """
+    What a zero-skip engine accumulates: walk the stream, add
+    x[index] * weight, emit at "last". x: (N, inputs) -> (N, outputs) int32.
+    """
+    products = np.asarray(x, dtype=np.int64)[:, entries["index"]] * entries["weight"]
+    starts = np.r_[0, np.flatnonzero(entries["last"])[:-1] + 1]
+    if len(starts) != entries["outputs"]:
+        raise ValueError(f"stream has {len(starts)} neurons, expected {entries['outputs']}")
+    return golden_model.to_int32(np.add.reduceat(products, starts, axis=1))
+
+def predict(images, weights, shifts, sparse, batch_size=golden_model.BATCH_SIZE):
+    """golden_model.predict with the FC layers running from the compressed streams."""
+    shifts = dict(golden_model.RTL_SHIFTS, **(shifts or {}))
+    preds = []
+    images = golden_model.as_images(images)
+    for i in range(0, len(images), batch_size):
+        x = images[i:i + batch_size, None]
+        for layer in ("c1", "c2"):
+            acc = golden_model.conv_acc(x, weights[layer])
+            x = golden_model.maxpool2x2(golden_model.requantize(acc, shifts[layer]))
+        x = x.reshape(len(x), -1)
+        for layer in SPARSE_LAYERS:
+            x = golden_model.requantize(sparse_acc(x, sparse[layer]), shifts[layer], relu=layer != "out")
+        preds.append(x.argmax(axis=1))
+    return np.concatenate(preds)
+
+def cycles(sparse, cfg=None):
+    """(dense, zero-skip) perf_model estimates; the sparse one streams one word per clock."""
+    dense = perf_model.estimate(cfg)
+    skip = perf_model.estimate(dict(cfg or {}, fc_sparse_words={l: len(e["index"]) for l, e in sparse.items()}))
+    return dense, skip
+
+def report(images, labels, weights, shifts, sparse):
+    dense_pred = golden_model.predict(images, weights, shifts)
+    sparse_pred = predict(images, weights, shifts, sparse)
+    dense, skip = cycles(sparse)
+    print(f"{'Layer':<6}{'Weights':>9}{'Nonzero':>9}{'Density':>9}{'Word':>6}{'Dense cyc':>11}{'Skip cyc':>10}")
+    for layer in SPARSE_LAYERS:
+        outputs, inputs = golden_model.WEIGHT_SHAPES[layer]
+        d = next(l["cycles"] for l in dense["layers"] if l["name"] == layer)
+        s = next(l["cycles"] for l in skip["layers"] if l["name"] == layer)
+        nonzero = int(np.count_nonzero(sparse[layer]["weight"]))
+        print(f"{layer.upper():<6}{outputs * inputs:>9}{nonzero:>9}{100 * nonzero / (outputs * inputs):>8.1f}%"
+              f"{word_bits(inputs):>6}{d:>11}{s:>10}")
+    labels = np.asarray(labels)
+    print(f"\nLatency: {dense['latency_cycles']} -> {skip['latency_cycles']} cycles/image "
+          f"({100 * (1 - skip['latency_cycles'] / dense['latency_cycles']):.1f}% fewer)")
+    print(f"Accuracy: dense {100 * (dense_pred == labels).mean():.2f}%, "
+          f"zero-skip {100 * (sparse_pred == labels).mean():.2f}% "
+          f"({int((dense_pred != sparse_pred).sum())} predictions differ)")
+    return {"dense": dense, "sparse": skip, "mismatches": int((dense_pred != sparse_pred).sum()),
+            "accuracy": float((sparse_pred == labels).mean())}
+
+def main(argv=None):
+    import calibrate
+    import hw_eval
+    import rom_manifest
+    parser = argparse.ArgumentParser(description="Zero-skip FC weight streams: export, integer reference, cycle savings")
+    parser.add_argument("--weights", default=".")
+    parser.add_argument("--data", default=hw_eval.DATA_ROOT)
+    parser.add_argument("--prune", type=float, default=None, metavar="SPARSITY",
+                        help="magnitude-prune the FC ROMs first (no fine-tuning; use the trainer's --prune for that)")
+    parser.add_argument("--write", action="store_true", help=f"write {', '.join(SPARSE_FILES.values())}")
+    args = parser.parse_args(argv)
+    if args.prune is not None and args.write:
+        parser.error("--write with --prune would not match the dense ROMs; prune in the trainer instead")
+
+    weights = golden_model.load_weights(args.weights)
+    shifts = calibrate.load_shifts(args.weights)
+    if args.prune is not None:
+        weights = prune_weights(weights, args.prune)
+    if args.write:
+        manifest = rom_manifest.Manifest(args.weights)
+        sparse = write_sparse(weights, manifest)
+        print(f"{len(manifest.save())} sparse ROM files changed")
+    else:
+        sparse = {l: compress(weights[l]) for l in SPARSE_LAYERS}
+
+    images, labels = hw_eval.load_test_set(args.data)
+    result = report(images, labels, weights, shifts, sparse)
+    return 1 if args.prune is None and result["mismatches"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Opt-in phase tracing. Code marks its phases with
+
+    with tracing.span("export", items=n_words):
+        ...
+
+and nothing is recorded unless tracing is enabled, by enable(path) or by
+setting WG_TRACE=trace.json in the environment (weights-generator --trace
+does the former). Each span records wall and CPU time, an item count
+(items/s in the summary) and the process's peak RSS. At exit the spans are
+written as Chrome-trace JSON (chrome://tracing, ui.perfetto.dev) and a
+per-phase summary is printed. Worker processes inherit WG_TRACE and hand
+their spans over with flush(); the parent merges them into one file.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import atexit
+import functools
+from contextlib import nullcontext
+try:
+    import resource           # POSIX only; without it peak RSS reads 0
+except ImportError:
+    resource = None
+
+# --- CONFIGURATION ---
+ENV_VAR = "WG_TRACE"
+OWNER_VAR = "WG_TRACE_PID"    # pid of the process that writes the merged trace
+SUMMARY_DEPTH = 3             # nesting levels shown in the text summary
+
+_path = None
+_events = []
+_stack = []
+_flushes = 0
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+# --- SPANS ---
+class Span:
+    """One timed phase. add() counts items processed inside it."""
+    def __init__(self, name, items=None, args=None):
+        self.name = name
+        self.items = items
+        self.args = args or {}
+
+    def add(self, items=1):
+        self.items = (self.items or 0) + items
+
+    def __enter__(self):
+        self.path = "/".join([s.name for s in _stack] + [self.name])
+        _stack.append(self)
+        self.rss0 = peak_rss_mb()
+        self.cpu0 = time.process_time_ns()
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = time.perf_counter_ns()
+        cpu = time.process_time_ns() - self.cpu0
+        rss = peak_rss_mb()
+        _stack.pop()
+        args = dict(self.args, path=self.path, cpu_ms=cpu / 1e6, peak_rss_mb=round(rss, 1),
+                    rss_growth_mb=round(rss - self.rss0, 1))
+        if self.items is not None:
+            args["items"] = self.items
+        if exc[0] is not None:
+            args["error"] = exc[0].__name__
+        # perf_counter is CLOCK_MONOTONIC on Linux, so spans of different processes line up
+        _events.append({"name": self.name, "ph": "X", "ts": self.t0 / 1e3, "dur": (t1 - self.t0) / 1e3,
+                        "pid": os.getpid(), "tid": 0, "args": args})
+        return False
+
+def enabled():
+    return _path is not None
+
+def span(name, items=None, **args):
+    """A Span when tracing is enabled, otherwise a no-op context manager."""
+    return Span(name, items, args) if _path is not None else nullcontext()
+
+def traced(name=None):
+    """Decorator: runs the function inside span(name or its __name__)."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            with span(name or fn.__name__):
+                return fn(*a, **kw)
+        return inner
+    return wrap
+
+def count(items=1):
+    """Adds items to the innermost open span (no-op when disabled)."""
+    if _stack:
+        _stack[-1].add(items)
+
+# --- OUTPUT ---
+def enable(path):
+    """Starts recording; the trace goes to `path` at exit. Child processes started afterwards record too."""
+    global _path
+    _path = path
+    os.environ[ENV_VAR] = path
+    os.environ.setdefault(OWNER_VAR, str(os.getpid()))
+
+def _is_owner():
+    return os.environ.get(OWNER_VAR) == str(os.getpid())
+
+def flush():
+    """
+    In a worker process: hands the finished spans to the parent through a
+    fragment file next to the trace. Call it at the end of each task, since
+    pool workers exit without running atexit handlers.
+    """
+    global _flushes
+    if _path is None or _is_owner() or not _events:
+        return
+    _flushes += 1
+    part = f"{_path}.{os.getpid()}.{_flushes}.part"
+    with open(part + ".tmp", 'w') as f:
+        json.dump(_events, f)
+    os.replace(part + ".tmp", part)
+    _events.clear()
+
+def _collect_parts():
+    merged = []
+    for part in sorted(glob.glob(glob.escape(_path) + ".*.part")):
+        with open(part) as f:
+            merged.extend(json.load(f))
+        os.remove(part)
+    return merged
+
+def summary(events):
+    """Per-phase totals, nested phases indented, as text. Pool workers' phases are listed after this process's."""
+    me = os.getpid()
+    phases = {}
+    for e in events:
+        key = (e["pid"] != me, e["args"]["path"])
+        p = phases.setdefault(key, {"n": 0, "wall": 0.0, "cpu": 0.0, "items": None, "rss": 0.0, "first": e["ts"]})
+        p["first"] = min(p["first"], e["ts"])
+        p["n"] += 1
+        p["wall"] += e["dur"] / 1e6
+        p["cpu"] += e["args"]["cpu_ms"] / 1e3
+        p["rss"] = max(p["rss"], e["args"]["peak_rss_mb"])
+        if "items" in e["args"]:
+            p["items"] = (p["items"] or 0) + e["args"]["items"]
+    # Shares are of this process's top-level time; worker spans overlap it, so they get none
+    total = sum(p["wall"] for (worker, path), p in phases.items() if not worker and "/" not in path) or 1.0
+    lines = [f"{'phase':<44}{'calls':>6}{'wall s':>9}{'cpu s':>9}{'share':>7}{'items/s':>11}{'peak MB':>9}"]
+
+    # Children right after their parent, siblings in order of first appearance
+    def order(key):
+        worker, path = key
+        parts = path.split("/")
+        return [worker] + [phases.get((worker, "/".join(parts[:i + 1])), {"first": 0})["first"]
+                           for i in range(len(parts))]
+    for (worker, path), p in sorted(phases.items(), key=lambda kv: order(kv[0])):
+        depth = path.count("/")
+        if depth >= SUMMARY_DEPTH:
+            continue
+        name = "  " * depth + path.rsplit("/", 1)[-1] + (" (workers)" if worker and not depth else "")
+        share = "-" if worker else f"{100 * p['wall'] / total:.1f}%"
+        rate = f"{p['items'] / p['wall']:.0f}" if p["items"] and p["wall"] > 0 else "-"
+        lines.append(f"{name[:43]:<44}{p['n']:>6}{p['wall']:>9.2f}{p['cpu']:>9.2f}{share:>7}{rate:>11}{p['rss']:>9.0f}")
+    return "\n".join(lines)
+
+def write(path=None):
+    """Writes everything recorded so far (plus worker fragments) as Chrome-trace JSON and prints the summary."""
+    path = path or _path
+    events = _events + _collect_parts()
+    events.sort(key=lambda e: e["ts"])
+    names = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+              "args": {"name": os.path.basename(sys.argv[0]) if pid == os.getpid() else f"worker {pid}"}}
+             for pid in sorted({e["pid"] for e in events})]
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": names + events, "displayTimeUnit": "ms"}, f)
+    print(f"\n--- Trace: {len(events)} spans -> {path} ---", file=sys.stderr)
+    print(summary(events), file=sys.stderr)
+
+def _at_exit():
+    if _path is None:
+        return
+    if _is_owner():
+        write()
+    else:
+        flush()
+
+def _after_fork():
+    # A forked worker starts with a copy of the parent's spans; drop them
+    _events.clear()
+    del _stack[:]
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
+atexit.register(_at_exit)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import struct
+import hashlib
+import argparse
+import numpy as np
+
+# --- CONFIGURATION ---
+BUNDLE_FILE = "lenet_weights.bin"
+MAGIC = b"LNWB"
+VERSION = 1
+ALIGN = 64
+
+# Header: magic, version, flags (unused), metadata length. The JSON metadata
+# follows, then the int8 payload, every tensor starting on an ALIGN boundary.
+HEADER = struct.Struct("<4sHHI")
+
+# Tensors as the ROMs see them: one row per ROM / bank / neuron
+BUNDLE_SHAPES = {
+    "c1": (6, 25),      # layer1_weight_rom, one row per CHANNEL_ID
+    "c2": (16, 150),    # layer2_rom_banked, one row per bank
+    "c5": (120, 400),   # fc_weight_rom, NUM_OUTPUTS x NUM_INPUTS
+    "f6": (84, 120),
+    "out": (10, 84),
+}
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+# --- WRITER ---
+def write_bundle(filename, weights, shifts):
+    """
+    Packs every layer's int8 weights plus the shift metadata into one file.
+    weights: dict layer -> int array (any shape with the BUNDLE_SHAPES size).
+    """
+    tensors, offset = {}, 0
+    payload = bytearray()
+    for layer, shape in BUNDLE_SHAPES.items():
+        data = np.asarray(weights[layer]).astype(np.int8).reshape(shape)
+        payload += bytes(offset - len(payload))
+        payload += data.tobytes()
+        tensors[layer] = {"offset": offset, "shape": list(shape), "dtype": "int8"}
+        offset = _align(len(payload))
+    payload += bytes(offset - len(payload))
+
+    meta = json.dumps({
+        "tensors": tensors,
+        "shifts": {k: int(v) for k, v in shifts.items()},
+        "payload_size": len(payload),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+    }).encode()
+    data_start = _align(HEADER.size + len(meta))
+
+    tmp = filename + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(meta)))
+        f.write(meta)
+        f.write(bytes(data_start - HEADER.size - len(meta)))
+        f.write(payload)
+    os.replace(tmp, filename)
+    print(f"Generated {filename} ({data_start + len(payload)} bytes).")
+
+# --- READER ---
+def load_bundle(filename, verify=True):
+    """
+    Maps the bundle read-only. Returns (tensors, meta) where every tensor is a
+    zero-copy view into one np.memmap, so concurrent worker processes share the
+    page-cached file instead of each holding a parsed copy.
+    """
+    with open(filename, 'rb') as f:
+        magic, version, _, meta_len = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a weight bundle")
+        if version != VERSION:
+            raise ValueError(f"{filename}: unsupported bundle version {version}")
+        meta = json.loads(f.read(meta_len))
+
+    data_start = _align(HEADER.size + meta_len)
+    payload = np.memmap(filename, dtype=np.int8, mode='r',
+                        offset=data_start, shape=(meta["payload_size"],))
+    if verify and hashlib.sha256(payload).hexdigest() != meta["sha256"]:
+        raise ValueError(f"{filename}: checksum mismatch")
+
+    tensors = {}
+    for layer, t in meta["tensors"].items():
+        size = int(np.prod(t["shape"]))
+        tensors[layer] = payload[t["offset"]:t["offset"] + size].reshape(t["shape"])
+    return tensors, meta
+
+def is_current(root, filename=BUNDLE_FILE):
+    """True when the bundle exists and is not older than any .hex it mirrors."""
+    import golden_model
+    path = os.path.join(root, filename)
+    if not os.path.exists(path):
+        return False
+    sources = [os.path.join(root, name)
+               for names in golden_model.WEIGHT_FILES.values() for name in names]
+    mtimes = [os.path.getmtime(src) for src in sources if os.path.exists(src)]
+    return os.path.getmtime(path) >= max(mtimes, default=0)
+
+def main(argv=None):
+    import golden_model
+    import calibrate
+    parser = argparse.ArgumentParser(description="Build or check the binary weight bundle from the .hex ROM files")
+    parser.add_argument("--weights", default=".", help="directory holding c1_weights/, c2_weights/, fc_weights/")
+    parser.add_argument("--check", action="store_true", help="verify an existing bundle against the .hex files")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(args.weights, BUNDLE_FILE)
+    hex_weights = golden_model.load_weights(args.weights, prefer_bundle=False)
+    if args.check:
+        tensors, meta = load_bundle(path)
+        bad = [l for l in golden_model.LAYERS
+               if not np.array_equal(tensors[l].reshape(-1), hex_weights[l].reshape(-1))]
+        print(f"{path}: v{VERSION}, shifts {meta['shifts']}, checksum OK")
+        if bad:
+            print(f"MISMATCH against .hex files in: {', '.join(bad)}")
+            return 1
+        print("Matches the .hex files.")
+        return 0
+
+    write_bundle(path, hex_weights, calibrate.load_shifts(args.weights))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,16 @@
-import torch
+import sys
+import argparse
 import torch.nn as nn
 import torch.optim as optim
-from torchvision import datasets, transforms
-from torch.utils.data import DataLoader
-import os
+import dataset_cache
+import golden_model
+import checkpoint
+import export_weights
+import tracing
+
+# --- CONFIGURATION ---
+EPOCHS = 1
+RUN_NAME = "lenet_global"   # checkpoints/lenet_global_epochNN.pt / .npz
 
 class LeNet5(nn.Module):
     def __init__(self):
@@ -32,74 +39,64 @@ class LeNet5(nn.Module):
         x = self.fc3(x)
         return x
 
-def to_hex(val):
-    val = max(-128, min(127, int(val)))
-    if val < 0: val = (1 << 8) + val
-    return f"{val:02x}"
-
-def train_model(model):
+def train_model(model, seed=checkpoint.SEED, resume=None):
     print("\n--- 1. Training (No Biases) ---")
+    checkpoint.seed_everything(seed)
     # Normalize to -1.0 to 1.0 to match signed 8-bit inputs
-    transform = transforms.Compose([
-        transforms.Resize((32, 32)),
-        transforms.ToTensor(),
-        transforms.Normalize((0.5,), (0.5,)) 
-    ])
-    
-    train_dataset = datasets.MNIST(root='./data', train=True, download=True, transform=transform)
-    train_loader = DataLoader(train_dataset, batch_size=64, shuffle=True)
+    with tracing.span("dataset"):
+        images, labels = dataset_cache.load('./data', train=True)
+        train_loader = dataset_cache.BatchLoader(images, labels, batch_size=64, shuffle=True,
+                                                 normalize=(0.5, 0.5))
     
     criterion = nn.CrossEntropyLoss()
     optimizer = optim.Adam(model.parameters(), lr=0.001)
+
+    start_epoch = 0
+    if resume:
+        start_epoch = checkpoint.resume(checkpoint.resolve(resume, RUN_NAME), model, optimizer)["epoch"]
     
-    model.train()
-    for batch_idx, (data, target) in enumerate(train_loader):
-        optimizer.zero_grad()
-        output = model(data)
-        loss = criterion(output, target)
-        loss.backward()
-        optimizer.step()
-        if batch_idx % 200 == 0: print(f"Batch {batch_idx} Loss: {loss.item():.4f}")
+    for epoch in range(start_epoch, EPOCHS):
+        with tracing.span("epoch", epoch=epoch + 1):
+            model.train()
+            with tracing.span("train_step", items=len(labels)):
+                for batch_idx, (data, target) in enumerate(train_loader):
+                    optimizer.zero_grad()
+                    output = model(data)
+                    loss = criterion(output, target)
+                    loss.backward()
+                    optimizer.step()
+                    if batch_idx % 200 == 0: print(f"Batch {batch_idx} Loss: {loss.item():.4f}")
+            with tracing.span("checkpoint"):
+                checkpoint.save(checkpoint.path_for(RUN_NAME, epoch + 1), model, optimizer, epoch + 1, seed,
+                                scheme="global")
 
 def extract_weights(model):
     print("\n--- 2. Extracting Weights ---")
-    os.makedirs("c1_weights", exist_ok=True)
-    os.makedirs("c2_weights", exist_ok=True)
-    os.makedirs("fc_weights", exist_ok=True)
-
-    global_max = 0
-    for param in model.parameters():
-        local_max = torch.max(torch.abs(param.data))
-        if local_max > global_max: global_max = local_max
-    
-    scale_factor = 127.0 / float(global_max)
-    print(f"Scale Factor: {scale_factor:.4f}")
-
-    # Extract C1
-    c1_weights = model.conv1.weight.data
-    for i in range(6):
-        with open(f"c1_weights/weights_c1_{i}.hex", "w") as f:
-            for val in c1_weights[i, 0].flatten():
-                f.write(to_hex(val * scale_factor) + "\n")
-
-    # Extract C2
-    c2_weights = model.conv2.weight.data
-    for i in range(16):
-        with open(f"c2_weights/weights_c2_{i}.hex", "w") as f:
-            for ch in range(6):
-                for val in c2_weights[i, ch].flatten():
-                    f.write(to_hex(val * scale_factor) + "\n")
-
-    # Extract FCs
-    for layer, name in [(model.fc1, "c5"), (model.fc2, "f6"), (model.fc3, "out")]:
-        with open(f"fc_weights/{name}_weights_flattened.hex", "w") as f:
-            for val in layer.weight.data.flatten():
-                f.write(to_hex(val * scale_factor) + "\n")
+    # One global scale (largest weight of the whole net -> 127) and the RTL
+    # default shifts; export_weights.py redoes this from the checkpoint
+    float_weights = checkpoint.float_weights(model)
+    scales = export_weights.global_scales(float_weights)
+    print(f"Scale Factor: {scales['c1']:.4f}")
+    export_weights.export(float_weights, scales, shifts=dict(golden_model.RTL_SHIFTS))
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train LeNet-5 (global weight scale) and export the FPGA weight ROMs")
+    parser.add_argument("--seed", type=int, default=checkpoint.SEED)
+    parser.add_argument("--resume", default=None, metavar="CKPT",
+                        help=f"continue from a .pt checkpoint, or 'latest' ({checkpoint.CHECKPOINT_DIR}/{RUN_NAME}_epochNN.pt)")
+    parser.add_argument("--export-only", default=None, metavar="CKPT",
+                        help="skip training: regenerate the ROM files from a checkpoint (see export_weights.py)")
+    parser.add_argument("--trace", default=None, metavar="JSON",
+                        help="record phase timings as Chrome-trace JSON and print a summary (tracing.py)")
+    args = parser.parse_args(argv)
+    if args.trace:
+        tracing.enable(args.trace)
+    if args.export_only:
+        return export_weights.main([args.export_only])
     model = LeNet5()
-    train_model(model)     
-    extract_weights(model) 
+    train_model(model, seed=args.seed, resume=args.resume)
+    extract_weights(model)
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
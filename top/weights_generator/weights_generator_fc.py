@@ -1,14 +1,25 @@
+import sys
+import argparse
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torchvision import datasets, transforms
-from torch.utils.data import DataLoader
-import os
-import math
+import dataset_cache
+import mnist_idx
+import hw_eval
+import calibrate
+import checkpoint
+import export_weights
+import qat
+import prune
+import sparse_fc
+import tracing
 
 # --- CONFIGURATION ---
 EPOCHS = 5  
 BATCH_SIZE = 64
+QAT = False        # Fine-tune through the simulated int8 datapath before export (--qat)
+PRUNE = 0.0        # FC sparsity for the zero-skip streams, 0 = dense (--prune)
+RUN_NAME = "lenet_fc"   # checkpoints/lenet_fc_epochNN.pt, final export checkpoints/lenet_fc.npz
 
 class LeNet5(nn.Module):
     def __init__(self):
@@ -38,119 +49,164 @@ class LeNet5(nn.Module):
         x = self.fc3(x)
         return x
 
-def to_hex(val):
-    # Clamp to ensure it fits in signed 8-bit
-    val = max(-128, min(127, int(val)))
-    if val < 0: val = (1 << 8) + val
-    return f"{val:02x}"
+def evaluate(model, test_loader):
+    """Float test accuracy plus the test images, labels and predictions it saw."""
+    correct = 0
+    total = 0
+    test_images, test_labels, float_preds = [], [], []
+    model.eval()
+    with tracing.span("test_accuracy", items=len(test_loader.labels)), torch.no_grad():
+        for data, target in test_loader:
+            outputs = model(data)
+            _, predicted = torch.max(outputs.data, 1)
+            total += target.size(0)
+            correct += (predicted == target).sum().item()
+            test_images.append(data)
+            test_labels.append(target)
+            float_preds.append(predicted)
+    return correct / total, torch.cat(test_images), torch.cat(test_labels), torch.cat(float_preds)
 
-def train_and_export():
-    print(f"\n--- 1. Training LeNet-5 (No Bias) for {EPOCHS} Epochs ---")
+def train_and_export(use_qat=QAT, seed=checkpoint.SEED, resume=None, checkpoint_every=checkpoint.CHECKPOINT_EVERY,
+                     sparsity=PRUNE, pixels=qat.QAT_PIXELS):
+    print(f"\n--- 1. Training LeNet-5 (No Bias) for {EPOCHS} Epochs (seed {seed}) ---")
+    checkpoint.seed_everything(seed)
     
-    transform = transforms.Compose([transforms.Resize((32, 32)), transforms.ToTensor()])
-    train_data = datasets.MNIST(root='./data', train=True, download=True, transform=transform)
-    test_data = datasets.MNIST(root='./data', train=False, download=True, transform=transform)
-    
-    train_loader = DataLoader(train_data, batch_size=BATCH_SIZE, shuffle=True)
-    test_loader = DataLoader(test_data, batch_size=1000, shuffle=False)
+    # 32x32 images come from the pre-resized cache (built on first run),
+    # so epochs cost the model, not PIL
+    with tracing.span("dataset"):
+        train_loader, test_loader = dataset_cache.loaders('./data', batch_size=BATCH_SIZE)
     
     model = LeNet5()
     optimizer = optim.Adam(model.parameters(), lr=0.001)
     criterion = nn.CrossEntropyLoss()
+
+    # Resuming restores the RNG too, so the run continues exactly as if it
+    # had never stopped
+    start_epoch = 0
+    if resume:
+        start_epoch = checkpoint.resume(checkpoint.resolve(resume, RUN_NAME), model, optimizer)["epoch"]
     
     # --- TRAINING LOOP ---
-    for epoch in range(EPOCHS):
-        model.train()
-        for batch_idx, (data, target) in enumerate(train_loader):
-            optimizer.zero_grad()
-            output = model(data)
-            loss = criterion(output, target)
-            loss.backward()
-            optimizer.step()
-            
-        # Quick accuracy check
-        correct = 0
-        total = 0
-        with torch.no_grad():
-            for data, target in test_loader:
-                outputs = model(data)
-                _, predicted = torch.max(outputs.data, 1)
-                total += target.size(0)
-                correct += (predicted == target).sum().item()
-        
-        print(f"Epoch {epoch+1}/{EPOCHS} | Test Accuracy: {100 * correct / total:.2f}%")
+    for epoch in range(start_epoch, EPOCHS):
+        with tracing.span("epoch", epoch=epoch + 1):
+            model.train()
+            with tracing.span("train_step", items=len(train_loader.labels)):
+                for batch_idx, (data, target) in enumerate(train_loader):
+                    optimizer.zero_grad()
+                    output = model(data)
+                    loss = criterion(output, target)
+                    loss.backward()
+                    optimizer.step()
+
+            # Quick accuracy check
+            accuracy, _, _, _ = evaluate(model, test_loader)
+            print(f"Epoch {epoch+1}/{EPOCHS} | Test Accuracy: {100 * accuracy:.2f}%")
+            if (epoch + 1) % checkpoint_every == 0 or epoch + 1 == EPOCHS:
+                with tracing.span("checkpoint"):
+                    checkpoint.save(checkpoint.path_for(RUN_NAME, epoch + 1), model, optimizer, epoch + 1, seed)
 
-    if (correct/total) < 0.90:
+    accuracy, test_images, test_labels, float_preds = evaluate(model, test_loader)
+    if accuracy < 0.90:
         print("\nWARNING: Accuracy is low. The generated weights might fail on '7'.")
 
-    # --- WEIGHT EXTRACTION ---
-    print("\n--- 2. Extracting Weights & Calculating Shifts ---")
-    os.makedirs("c1_weights", exist_ok=True)
-    os.makedirs("c2_weights", exist_ok=True)
-    os.makedirs("fc_weights", exist_ok=True)
-
-    # 1. Determine Global Scaling Factor for Weights
-    # We find the largest weight in the entire network to maximize dynamic range
-    max_val = 0
-    for param in model.parameters():
-        local_max = torch.max(torch.abs(param.data))
-        if local_max > max_val: max_val = local_max
-    
-    # Scale so the largest weight fits in -127 to +127
-    scale_factor = 127.0 / float(max_val) if max_val > 0 else 1.0
-    print(f"Max Weight: {max_val:.4f} -> Scale Factor: {scale_factor:.4f}")
-
-    # 2. Export Helper Function
-    def export_layer(data, filename):
-        with open(filename, "w") as f:
-            for val in data.flatten():
-                # Apply scaling before writing to Hex
-                f.write(to_hex(val * scale_factor) + "\n")
-
-    # Export C1
-    for i in range(6):
-        export_layer(model.conv1.weight.data[i, 0], f"c1_weights/weights_c1_{i}.hex")
-    
-    # Export C2 (Banked)
-    for i in range(16):
-        with open(f"c2_weights/weights_c2_{i}.hex", "w") as f:
-            for ch in range(6):
-                kernel = model.conv2.weight.data[i, ch].flatten()
-                for val in kernel:
-                    f.write(to_hex(val * scale_factor) + "\n")
-
-    # Export FC Layers
-    export_layer(model.fc1.weight.data, "fc_weights/c5_weights_flattened.hex")
-    export_layer(model.fc2.weight.data, "fc_weights/f6_weights_flattened.hex")
-    export_layer(model.fc3.weight.data, "fc_weights/out_weights_flattened.hex")
-
-    # --- CALCULATE IDEAL SHIFT (THE FIX) ---
-    # Logic: 
-    # HW_Mult = (SW_Input * 127) * (SW_Weight * Scale_Factor)
-    # HW_Mult = (SW_Input * SW_Weight) * (127 * Scale_Factor)
-    # 
-    # To get back to the 8-bit range (SW_Result * 127), we need:
-    # HW_Output = HW_Mult >> SHIFT
-    # 
-    # Ideally: HW_Output approx (SW_Result * 127)
-    # So: (SW_Result * 127) = [(SW_Result) * (127 * Scale_Factor)] / 2^SHIFT
-    # 
-    # Canceling terms: 
-    # 1 = Scale_Factor / 2^SHIFT
-    # 2^SHIFT = Scale_Factor
-    # SHIFT = log2(Scale_Factor)
-
-    ideal_shift = int(math.log2(scale_factor))
-    
-    # Safety clamp: Shift shouldn't be negative
-    if ideal_shift < 0: ideal_shift = 0
+    # --- PRUNING (optional) ---
+    # Gradually zero the smallest FC weights and let the rest compensate;
+    # the masks stay applied through QAT so the export keeps the zeros
+    masks = None
+    if sparsity:
+        print(f"\n--- 1a. Pruning FC Layers to {100 * sparsity:.0f}% Sparsity ---")
+        with tracing.span("prune"):
+            masks = prune.finetune(model, sparsity, train_loader, test_loader)
+        accuracy, test_images, test_labels, float_preds = evaluate(model, test_loader)
+
+    # Each layer gets its own weight scale (its own max -> 127) instead of
+    # one global scale
+    with tracing.span("scales"):
+        scales = calibrate.layer_scales(checkpoint.float_weights(model))
+        # Shifts are calibrated on the pixels the weights are tuned for
+        # (camera: camera.cpp's '/ 2' instead of the MNIST * 127 mapping)
+        to_pixels = mnist_idx.to_camera_pixels if pixels == "camera" else mnist_idx.to_fpga_pixels
+        calib_pixels = to_pixels(train_loader.images[:calibrate.CALIB_IMAGES])
+
+    # --- QUANTIZATION-AWARE FINE-TUNING (optional) ---
+    # Calibrate shifts on the float-trained weights, then keep scales and
+    # shifts fixed while the weights learn to live with int8 rounding,
+    # truncating shifts and saturation at 127
+    qat_shifts = {}
+    if use_qat:
+        print(f"\n--- 1b. Quantization-Aware Fine-Tuning for {qat.QAT_EPOCHS} Epochs ---")
+        with tracing.span("qat"):
+            qat_shifts, _ = calibrate.calibrate_shifts(
+                calib_pixels, calibrate.quantize_weights(checkpoint.float_weights(model), scales))
+            qat.finetune(model, scales, qat_shifts, train_loader, test_loader, masks=masks, pixels=pixels)
+
+    # The exported model, with the scales / fixed shifts it was exported
+    # with: export_weights.py can regenerate every file below from it
+    with tracing.span("checkpoint"):
+        final = checkpoint.save(checkpoint.path_for(RUN_NAME), model, optimizer, EPOCHS, seed,
+                                scheme="per_layer", scales=scales, fixed_shifts=qat_shifts, sparsity=sparsity,
+                                pixels=pixels)
+
+    # --- WEIGHT EXTRACTION + SHIFT CALIBRATION ---
+    # Per-layer scales; each layer's output shift is picked from the integer
+    # accumulators the exported weights produce on CALIB_IMAGES training
+    # images (QAT weights were trained for fixed shifts, so those are kept).
+    # Also writes lenet_params.json, lenet_params_pkg.sv and the bundle.
+    print("\n--- 2. Exporting Weights (Per-Layer Scales) and Calibrating Shifts ---")
+    weights, shifts = export_weights.export(checkpoint.float_weights(model), scales, calib_pixels,
+                                            fixed_shifts=qat_shifts, sparse=bool(sparsity))
+    print(f"Re-export without retraining: python export_weights.py {final[:-3]}.npz")
+
+    # --- HARDWARE ACCURACY CHECK ---
+    # Run the whole test set through the bit-accurate integer pipeline
+    # using the .hex files we just wrote
+    print("\n--- 3. Hardware Accuracy Check (int8 pipeline) ---")
+    # The loader's floats are the cached uint8 images / 255, so rounding
+    # recovers them exactly for mnist_idx's integer pixel mapping
+    test_pixels = mnist_idx.to_fpga_pixels(
+        test_images.mul(255).round().to(torch.uint8).numpy().reshape(-1, 32, 32))
+    with tracing.span("hw_eval", items=len(test_labels)):
+        report = hw_eval.evaluate(
+            test_pixels,
+            test_labels.numpy(),
+            weights,
+            shifts,
+            float_pred=float_preds.numpy())
+    hw_eval.print_report(report)
+
+    if report["hw_accuracy"] < hw_eval.MIN_HW_ACCURACY:
+        print("\nWARNING: Hardware accuracy is low even with calibrated shifts.")
+
+    if sparsity:
+        print("\n--- 4. Zero-Skip FC Streams ---")
+        with tracing.span("sparse_report"):
+            sparse_fc.report(test_pixels, test_labels.numpy(),
+                             weights, shifts, sparse_fc.load_sparse("."))
 
-    print("\n" + "="*40)
-    print(f"RECOMMENDED FPGA SETTINGS")
-    print("="*40)
-    print(f"Update 'fc_streaming' .SHIFT parameters in fpga_top_layer1.sv:")
-    print(f"   .SHIFT({ideal_shift})")
-    print("="*40)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train LeNet-5 and export the FPGA weight ROMs")
+    parser.add_argument("--qat", action="store_true", default=QAT,
+                        help="quantization-aware fine-tuning before export")
+    parser.add_argument("--qat-pixels", choices=qat.PIXEL_MODES, default=qat.QAT_PIXELS,
+                        help="input mapping to tune and calibrate for: mnist (p * 127) or camera (camera.cpp's v / 2)")
+    parser.add_argument("--seed", type=int, default=checkpoint.SEED)
+    parser.add_argument("--resume", default=None, metavar="CKPT",
+                        help=f"continue from a .pt checkpoint, or 'latest' ({checkpoint.CHECKPOINT_DIR}/{RUN_NAME}_epochNN.pt)")
+    parser.add_argument("--prune", type=float, default=PRUNE, metavar="SPARSITY",
+                        help="prune the FC layers to this sparsity (e.g. 0.7) and export zero-skip streams")
+    parser.add_argument("--checkpoint-every", type=int, default=checkpoint.CHECKPOINT_EVERY, metavar="EPOCHS")
+    parser.add_argument("--export-only", default=None, metavar="CKPT",
+                        help="skip training: regenerate the ROM files from a checkpoint (see export_weights.py)")
+    parser.add_argument("--trace", default=None, metavar="JSON",
+                        help="record phase timings as Chrome-trace JSON and print a summary (tracing.py)")
+    args = parser.parse_args(argv)
+    if args.trace:
+        tracing.enable(args.trace)
+    if args.export_only:
+        return export_weights.main([args.export_only])
+    train_and_export(use_qat=args.qat, seed=args.seed, resume=args.resume,
+                     checkpoint_every=args.checkpoint_every, sparsity=args.prune, pixels=args.qat_pixels)
+    return 0
 
 if __name__ == "__main__":
-    train_and_export()
\ No newline at end of file
+    sys.exit(main())